@@ -13,6 +13,10 @@ from .models.media_request import MediaRequest
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Response header carrying the BlurHash placeholder of the media, for clients to paint it while
+# the media loads
+PLACEHOLDER_HEADER = "X-Media-Placeholder"
+
 
 def extract_and_validate_event(event):
     """Extract and validate necessary parameters from the provided event."""
@@ -37,7 +41,7 @@ def extract_and_validate_event(event):
         "extension",
         optional=False,
         expected_type=str,
-        allowed_values=MediaFormatUtils.allowed_extensions(),
+        allowed_values=MediaFormatUtils.allowed_output_extensions(),
     )
 
     return filename, size, extension
@@ -62,9 +66,10 @@ def lambda_handler(event, context):
     # Extract and validate necessary event parameters
     filename, size, extension = extract_and_validate_event(event)
 
-    # Process the media request and retrieve the processed media URL
+    # Process the media request and retrieve the processed media URL and placeholder
     media_request = MediaRequest(processed_media_bucket, raw_media_bucket, media_domain_name)
-    url = media_request.process(filename, size, extension)
+    url, placeholder = media_request.process(filename, size, extension)
+    headers = {PLACEHOLDER_HEADER: placeholder} if placeholder else None
 
     # Log the completion of the Lambda invocation
     logger.info(
@@ -72,4 +77,4 @@ def lambda_handler(event, context):
             request_id=context.get("aws_request_id", ""),
         )
     )
-    return ApiBaseService.create_redirect(HTTPStatus.FOUND, url)
+    return ApiBaseService.create_redirect(HTTPStatus.FOUND, url, headers)
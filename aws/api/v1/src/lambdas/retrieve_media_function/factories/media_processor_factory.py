@@ -1,9 +1,11 @@
 import logging
+from typing import Optional
 
 from shared.constants.logging_messages import MediaMessages
 from shared.exceptions import UnsupportedMediaTypeError
 from shared.media.base import MediaFormatUtils, MediaType
 from shared.media.constants import Extension, Size
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 from ..processors.image_processor import ImageProcessor
 from ..processors.media_processor import MediaProcessor
@@ -23,6 +25,7 @@ class MediaProcessorFactory:
         extension: Extension,
         sizes: list[Size],
         username: str,
+        metadata: Optional[ObjectMetadata] = None,
     ) -> MediaProcessor:
         """
         Creates and returns an instance of the appropriate media processor based on the file type.
@@ -30,9 +33,9 @@ class MediaProcessorFactory:
         media_type = MediaFormatUtils.map_extension_to_media_type(extension)
 
         if media_type == MediaType.IMAGE:
-            return ImageProcessor(bucket, key, filename, extension, sizes, username)
+            return ImageProcessor(bucket, key, filename, extension, sizes, username, metadata)
         elif media_type == MediaType.VIDEO:
-            return VideoProcessor(bucket, key, filename, extension, sizes, username)
+            return VideoProcessor(bucket, key, filename, extension, sizes, username, metadata)
         else:
             logger.error(
                 MediaMessages.Error.UNSUPPORTED_MEDIA_TYPE.format(media_type=media_type.value)
@@ -1,11 +1,12 @@
 import logging
-from typing import Tuple
+from typing import Optional, Tuple
 
 from shared.exceptions import MissingRequiredRDSVariablesError, ObjectNotFoundError
 from shared.media.base import Extension, MediaFormatUtils, MediaSizeUtils, Size
 from shared.media.media_factory import MediaFactory
 from shared.services.aws.rds.rds_base_service import RdsBaseService
 from shared.services.aws.s3.s3_base_service import S3BaseService
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 from ..factories.media_processor_factory import MediaProcessorFactory
 
@@ -21,8 +22,13 @@ class MediaRequest:
         self.raw_media_bucket = raw_media_bucket
         self.domain_name = domain_name
 
-    def process(self, filename: str, size_str: str, extension_str: str) -> str:
-        """Processes the media and returns its URL."""
+    def process(
+        self, filename: str, size_str: str, extension_str: str
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Processes the media and returns its URL, with the placeholder stored with the processed
+        media when there is one.
+        """
         # validate inputs
         size = MediaSizeUtils.convert_str_to_size(size_str)
         extension = MediaFormatUtils.convert_str_to_extension(str(extension_str))
@@ -30,22 +36,28 @@ class MediaRequest:
         # construct processed key
         processed_key = self._construct_processed_key(filename, size.value, extension.value)
 
-        # checking if already processed
-        if self._check_object_exists(self.processed_media_bucket, processed_key):
+        # checking if already processed, the same HEAD gives the placeholder stored with it
+        processed_metadata = self._fetch_object_metadata(
+            bucket=self.processed_media_bucket, key=processed_key, required=False
+        )
+        if processed_metadata is not None:
             # get info to construct raw key
             username, content_type = self._fetch_media_info(filename)
             media = MediaFactory().create_media_from_content_type(content_type)
 
-            # check if exists in raw bucket
+            # check if exists in raw bucket, keeping its metadata for the processing function
             raw_key = self._construct_raw_key(filename, username, media.s3_prefix)
-            self._check_object_exists(bucket=self.raw_media_bucket, key=raw_key, required=True)
+            metadata = self._fetch_object_metadata(bucket=self.raw_media_bucket, key=raw_key)
 
             # process
-            processor = self._create_processor(filename, extension, username, raw_key, size)
+            processor = self._create_processor(
+                filename, extension, username, raw_key, size, metadata
+            )
             processor.process()
 
-        # return url
-        return self._construct_url(processed_key)
+        # return url and placeholder
+        placeholder = processed_metadata.placeholder if processed_metadata else None
+        return self._construct_url(processed_key), placeholder
 
     def _fetch_media_info(self, filename: str) -> Tuple[str, str]:
         try:
@@ -67,12 +79,13 @@ class MediaRequest:
             extension=extension,
         )
 
-    def _check_object_exists(self, bucket: str, key: str, required: bool = False) -> bool:
-        if not self.s3_service.object_exists(bucket=bucket, key=key):
-            if required:
-                raise ObjectNotFoundError(key=key, bucket=bucket)
-            return False
-        return True
+    def _fetch_object_metadata(
+        self, bucket: str, key: str, required: bool = True
+    ) -> Optional[ObjectMetadata]:
+        metadata = self.s3_service.get_object_metadata(bucket=bucket, key=key)
+        if metadata is None and required:
+            raise ObjectNotFoundError(key=key, bucket=bucket)
+        return metadata
 
     def _create_processor(
         self,
@@ -81,6 +94,7 @@ class MediaRequest:
         username: str,
         raw_key: str,
         size: Size,
+        metadata: Optional[ObjectMetadata] = None,
     ):
         return MediaProcessorFactory.create_processor(
             bucket=self.raw_media_bucket,
@@ -89,6 +103,7 @@ class MediaRequest:
             extension=extension,
             sizes=[size],
             username=username,
+            metadata=metadata,
         )
 
     def _construct_url(self, key: str) -> str:
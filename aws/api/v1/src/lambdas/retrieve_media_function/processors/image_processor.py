@@ -1,9 +1,10 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from shared.exceptions import MediaProcessingError
 from shared.media.constants import Extension, Size
 from shared.services.aws.lambdas.image_processing_service import ImageProcessingInvoker
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 from .media_processor import MediaProcessor
 
@@ -21,6 +22,7 @@ class ImageProcessor(MediaProcessor):
         extension: Extension,
         sizes: List[Size],
         username: str,
+        metadata: Optional[ObjectMetadata] = None,
     ):
         self.bucket = bucket
         self.key = key
@@ -28,6 +30,7 @@ class ImageProcessor(MediaProcessor):
         self.extension = extension
         self.sizes = sizes
         self.username = username
+        self.metadata = metadata
         self.image_processing_invoker = ImageProcessingInvoker()
 
     def process(self) -> dict:
@@ -38,6 +41,7 @@ class ImageProcessor(MediaProcessor):
                 self.filename,
                 self.extension,
                 self.sizes,
+                self.metadata,
             )
             return result
         except Exception as e:
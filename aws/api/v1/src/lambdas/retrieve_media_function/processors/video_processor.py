@@ -1,8 +1,9 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from shared.exceptions import FeatureNotImplementedError
 from shared.media.constants import Extension, Size
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 from .media_processor import MediaProcessor
 
@@ -23,6 +24,7 @@ class VideoProcessor(MediaProcessor):
         extension: Extension,
         sizes: List[Size],
         username: str,
+        metadata: Optional[ObjectMetadata] = None,
     ):
         self.bucket = bucket
         self.key = key
@@ -30,6 +32,7 @@ class VideoProcessor(MediaProcessor):
         self.extension = extension
         self.sizes = sizes
         self.username = username
+        self.metadata = metadata
         self.feature_name = FEATURE_NAME
 
     def process(self) -> dict:
@@ -0,0 +1,17 @@
+import pytest
+
+from shared.services.aws.client_provider import clear_clients
+
+
+@pytest.fixture(autouse=True)
+def aws_region(monkeypatch):
+    """Services create their boto3 clients when built, which needs a region even if unused."""
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+
+@pytest.fixture(autouse=True)
+def fresh_aws_clients():
+    """Clients are cached per process, so every test starts without any, like a new container."""
+    clear_clients()
+    yield
+    clear_clients()
@@ -4,6 +4,7 @@ from aws.api.v1.src.lambdas.retrieve_media_function.models.media_request import
     MediaRequest,
     ObjectNotFoundError,
 )
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 # Constants used in tests
 FILENAME = "test_file"
@@ -11,6 +12,7 @@ SIZE_STR = "SMALL"
 EXTENSION_STR = "jpg"
 MEDIA_INFO = ("username", "image/jpeg")
 MEDIA_URL = "https://test.com/test_file_SMALL.jpg"
+PLACEHOLDER = "LEHV6nWB2yk8pyo0adR*.7kCMdnj"
 
 
 @pytest.fixture
@@ -23,11 +25,17 @@ def mock_media_request(mocker):
     yield media_request
 
 
-def setup_mocks(mock_media_request, mocker, exists=False):
+def setup_mocks(mock_media_request, mocker, exists=False, placeholder=None):
+    processed_metadata = ObjectMetadata("image/jpeg", 1024, '"etag"', placeholder=placeholder)
+    raw_metadata = ObjectMetadata("image/jpeg", 4096, '"raw-etag"')
+
+    def fetch_object_metadata(bucket, key, required=True):
+        if bucket == "raw_bucket":
+            return raw_metadata
+        return processed_metadata if exists else None
+
     mocker.patch.object(
-        mock_media_request,
-        "_check_object_exists",
-        side_effect=[exists, True],
+        mock_media_request, "_fetch_object_metadata", side_effect=fetch_object_metadata
     )
     mocker.patch.object(
         mock_media_request.rds_service,
@@ -53,7 +61,7 @@ class TestMediaRequest:
 
         result = mock_media_request.process(FILENAME, SIZE_STR, EXTENSION_STR)
 
-        assert result == MEDIA_URL
+        assert result == (MEDIA_URL, None)
 
     def test_process_non_existing_processed_key_calls_create_processor(
         self, mock_media_request, mocker
@@ -66,16 +74,30 @@ class TestMediaRequest:
 
         result = mock_media_request.process(FILENAME, SIZE_STR, EXTENSION_STR)
 
-        assert result == MEDIA_URL
+        assert result == (MEDIA_URL, None)
 
+    def test_process_returns_placeholder_of_processed_media(self, mock_media_request, mocker):
+        """
+        Test that the placeholder stored with the processed media is returned with its URL,
+        from the HEAD request that checks it exists.
+        """
+        setup_mocks(mock_media_request, mocker, exists=True, placeholder=PLACEHOLDER)
+        mocker.patch.object(mock_media_request, "_create_processor")
+
+        result = mock_media_request.process(FILENAME, SIZE_STR, EXTENSION_STR)
+
+        assert result == (MEDIA_URL, PLACEHOLDER)
+        processed_head = mock_media_request._fetch_object_metadata.call_args_list[0]
+        assert processed_head.kwargs["bucket"] == "processed_bucket"
+        assert processed_head.kwargs["required"] is False
 
-class TestObjectCheck:
-    def test_check_object_exists_returns_false(self, mock_media_request, mocker):
-        mocker.patch.object(mock_media_request.s3_service, "object_exists", return_value=False)
-        result = mock_media_request._check_object_exists("bucket", "key")
-        assert not result
 
-    def test_check_object_exists_required_raises_exception(self, mock_media_request, mocker):
-        mocker.patch.object(mock_media_request.s3_service, "object_exists", return_value=False)
+class TestObjectCheck:
+    def test_fetch_object_metadata_missing_raises_exception(self, mock_media_request, mocker):
+        mocker.patch.object(mock_media_request.s3_service, "get_object_metadata", return_value=None)
         with pytest.raises(ObjectNotFoundError):
-            mock_media_request._check_object_exists("bucket", "key", required=True)
+            mock_media_request._fetch_object_metadata("bucket", "key")
+
+    def test_fetch_object_metadata_missing_not_required(self, mock_media_request, mocker):
+        mocker.patch.object(mock_media_request.s3_service, "get_object_metadata", return_value=None)
+        assert mock_media_request._fetch_object_metadata("bucket", "key", required=False) is None
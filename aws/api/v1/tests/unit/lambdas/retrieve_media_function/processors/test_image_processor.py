@@ -35,7 +35,7 @@ def test_process_successful_invocation(setup_processor):
     result = processor.process()
 
     mock_invoker.invoke_lambda_function.assert_called_once_with(
-        bucket, key, filename, extension, sizes
+        bucket, key, filename, extension, sizes, None
     )
     assert result == mock_result
 
@@ -55,5 +55,5 @@ def test_process_with_error(setup_processor):
         processor.process()
 
     mock_invoker.invoke_lambda_function.assert_called_once_with(
-        bucket, key, filename, extension, sizes
+        bucket, key, filename, extension, sizes, None
     )
@@ -3,7 +3,7 @@ from http import HTTPStatus
 
 import pytest
 
-from aws.api.v1.src.lambdas.retrieve_media_function.app import lambda_handler
+from aws.api.v1.src.lambdas.retrieve_media_function.app import PLACEHOLDER_HEADER, lambda_handler
 from shared.services.error_handler import AppError
 
 
@@ -42,7 +42,7 @@ def test_lambda_handler_success(mock_dependencies, event_and_context):
     mock_dependencies["env"].fetch_variable.return_value = "raw-media-bucket"
     mock_dependencies["validator"].get_path_parameter.return_value = "sample.jpg"
     mock_dependencies["validator"].get_query_string_parameter.side_effect = ["medium", "jpg"]
-    mock_dependencies["media_request"].process.return_value = "https://media-url"
+    mock_dependencies["media_request"].process.return_value = ("https://media-url", None)
 
     expected_response = {
         "statusCode": HTTPStatus.FOUND,
@@ -53,6 +53,22 @@ def test_lambda_handler_success(mock_dependencies, event_and_context):
     # Call the lambda handler and assert
     actual_response = lambda_handler(event, context)
     assert actual_response == expected_response
+    mock_dependencies["api_base"].create_redirect.assert_called_once_with(
+        HTTPStatus.FOUND, "https://media-url", None
+    )
+
+
+def test_lambda_handler_returns_placeholder(mock_dependencies, event_and_context):
+    event, context = event_and_context
+
+    mock_dependencies["validator"].get_query_string_parameter.side_effect = ["medium", "jpg"]
+    mock_dependencies["media_request"].process.return_value = ("https://media-url", "L00000fQ")
+
+    lambda_handler(event, context)
+
+    mock_dependencies["api_base"].create_redirect.assert_called_once_with(
+        HTTPStatus.FOUND, "https://media-url", {PLACEHOLDER_HEADER: "L00000fQ"}
+    )
 
 
 @pytest.mark.parametrize(
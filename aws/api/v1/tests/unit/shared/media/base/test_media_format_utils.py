@@ -50,12 +50,34 @@ def test_allowed_extensions_invalid(media_type):
         MediaFormatUtils.allowed_extensions(media_type)
 
 
+# ===================== TESTS: allowed_output_extensions =====================
+ALLOWED_OUTPUT_EXTENSIONS = [
+    (MediaType.IMAGE, {"jpeg", "png", "gif", "webp", "avif"}),
+    (MediaType.VIDEO, {"mp4", "mov", "avi"}),
+]
+
+
+@pytest.mark.parametrize("media_type, expected", ALLOWED_OUTPUT_EXTENSIONS)
+def test_allowed_output_extensions_valid(media_type, expected):
+    """Test variants are generated in the accepted formats and the output only ones."""
+    assert MediaFormatUtils.allowed_output_extensions(media_type) == expected
+
+
+@pytest.mark.parametrize("media_type", ALLOWED_EXTENSIONS_INVALID)
+def test_allowed_output_extensions_invalid(media_type):
+    """Test invalid media types for the allowed_output_extensions method."""
+    with pytest.raises(InvalidMediaTypeError):
+        MediaFormatUtils.allowed_output_extensions(media_type)
+
+
 # ===================== TESTS: is_extension_allowed =====================
 IS_EXTENSION_ALLOWED = [
     ("jpeg", MediaType.IMAGE, True),
     ("jpg", MediaType.IMAGE, True),
     ("jpg", None, True),
     ("jpeg", None, True),
+    ("webp", MediaType.IMAGE, False),
+    ("avif", None, False),
     ("mp4", MediaType.VIDEO, True),
     ("mp4", MediaType.IMAGE, False),
     ("mp4", None, True),
@@ -77,6 +99,8 @@ def test_is_extension_allowed(extension, media_type, expected):
 IS_CONTENT_TYPE_ALLOWED = [
     ("image/jpeg", MediaType.IMAGE, True),
     ("image/jpg", MediaType.IMAGE, False),
+    ("image/webp", MediaType.IMAGE, False),
+    ("image/avif", None, False),
     ("video/jpeg", MediaType.IMAGE, False),
     ("video/jpeg", None, False),
     ("/jpeg", None, False),
@@ -146,6 +170,7 @@ def test_get_extension_invalid_extension(media_type, extension):
 # ===================== TESTS: get_content_type =====================
 GET_CONTENT_TYPE_VALID = [
     (MediaType.IMAGE, Extension.JPEG, "image/jpeg"),
+    (MediaType.IMAGE, Extension.AVIF, "image/avif"),
     (MediaType.VIDEO, Extension.MP4, "video/mp4"),
 ]
 
@@ -174,6 +199,7 @@ def test_get_content_type_invalid_media_type(media_type, extension):
 # ===================== TESTS: map_extension_to_media_type =====================
 MAP_EXT_TO_MEDIA_VALID = [
     (Extension.JPEG, MediaType.IMAGE),
+    (Extension.WEBP, MediaType.IMAGE),
     (Extension.MP4, MediaType.VIDEO),
 ]
 
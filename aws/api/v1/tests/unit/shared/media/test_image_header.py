@@ -0,0 +1,108 @@
+import io
+import random
+
+import pytest
+from PIL import Image as PILImage
+
+from shared.media.image_header import ImageHeader, read_image_header
+
+# ===================== CONSTANTS =====================
+
+DIMENSIONS = (1234, 567)
+
+STILL_IMAGES = [
+    ("PNG", "RGB", {}),
+    ("PNG", "RGBA", {}),
+    ("PNG", "L", {}),
+    ("PNG", "P", {}),
+    ("JPEG", "RGB", {}),
+    ("JPEG", "L", {}),
+    ("JPEG", "CMYK", {}),
+    ("JPEG", "RGB", {"exif": b"Exif\0\0" + b"\0" * 60000}),
+    ("WEBP", "RGB", {}),
+    ("WEBP", "RGBA", {}),
+    ("WEBP", "RGB", {"lossless": True}),
+    ("GIF", "P", {}),
+]
+
+# ===================== FIXTURES =====================
+
+
+def encode(image_format, mode, **options):
+    buffer = io.BytesIO()
+    PILImage.new(mode, DIMENSIONS).save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def encode_animation(image_format, frames):
+    noise = random.Random(0)
+    images = [
+        PILImage.frombytes("L", (120, 80), noise.randbytes(120 * 80)).convert("RGB")
+        for _ in range(frames)
+    ]
+    buffer = io.BytesIO()
+    images[0].save(buffer, image_format, save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+# ===================== TESTS: read_image_header =====================
+
+
+@pytest.mark.parametrize("image_format, mode, options", STILL_IMAGES)
+def test_read_image_header(image_format, mode, options):
+    """Test the dimensions and mode of still images are read from their header."""
+    header = read_image_header(encode(image_format, mode, **options))
+
+    assert (header.width, header.height, header.mode, header.frames) == (*DIMENSIONS, mode, 1)
+
+
+@pytest.mark.parametrize(
+    "mode, options, strips",
+    [("RGB", {}, True), ("RGBA", {}, True), ("1", {}, True), ("P", {"bits": 4}, False)],
+)
+def test_read_image_header_strips(mode, options, strips):
+    """Test PNGs of 8 bits per channel, or 1 bit per pixel, are decodable in strips."""
+    assert read_image_header(encode("PNG", mode, **options)).strips is strips
+
+
+def test_read_image_header_no_strips_when_interlaced():
+    """Test interlaced PNGs are not decodable in strips, their rows are spread over 7 passes."""
+    data = bytearray(encode("PNG", "RGB"))
+    data[28] = 1
+
+    assert not read_image_header(bytes(data)).strips
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "WEBP"])
+def test_read_image_header_no_strips_for_other_formats(image_format):
+    """Test only PNGs are decodable in strips."""
+    assert not read_image_header(encode(image_format, "RGB")).strips
+
+
+@pytest.mark.parametrize("image_format", ["GIF", "PNG", "WEBP"])
+def test_read_image_header_counts_frames(image_format):
+    """Test the frames of animated GIF, PNG and WebP images are counted."""
+    assert read_image_header(encode_animation(image_format, 12)).frames == 12
+
+
+def test_read_image_header_extrapolates_gif_frames():
+    """Test GIF frames past the probed bytes are extrapolated from the size of the image."""
+    data = encode_animation("GIF", 30)
+
+    header = read_image_header(data[: len(data) // 3], len(data))
+
+    assert 25 <= header.frames <= 35
+
+
+@pytest.mark.parametrize("data", [b"", b"not an image", encode("JPEG", "RGB")[:20]])
+def test_read_image_header_unknown(data):
+    """Test unknown formats and truncated headers give no header."""
+    assert read_image_header(data) is None
+
+
+def test_image_header_payload():
+    """Test headers survive being passed in an event payload."""
+    header = ImageHeader(100, 50, "RGBA", 3, strips=True)
+
+    assert ImageHeader.from_payload(header.to_payload()) == header
+    assert header.pixel_bytes == 4
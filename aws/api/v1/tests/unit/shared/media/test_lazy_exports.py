@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import shared.media
+from shared.media import Extension, MediaFactory
+from shared.media.base import InvalidSizeError, VideoMedia
+from shared.media.constants import Extension as ConstantsExtension
+from shared.media.media_factory import MediaFactory as FactoryMediaFactory
+
+# ===================== TESTS: lazy_exports =====================
+
+
+def test_lazy_exports_resolve_submodule_names():
+    """Test names of submodules, and names they import, are re-exported by the package."""
+    assert Extension is ConstantsExtension
+    assert MediaFactory is FactoryMediaFactory
+    assert VideoMedia.__name__ == "VideoMedia"
+    assert issubclass(InvalidSizeError, Exception)
+
+
+def test_lazy_exports_unknown_name():
+    """Test looking up a name no submodule has raises AttributeError."""
+    with pytest.raises(AttributeError):
+        shared.media.NotAName
+
+
+def test_lazy_exports_dir():
+    """Test dir() lists the names of every submodule."""
+    assert {"Extension", "ImageMedia", "MediaFactory"} <= set(dir(shared.media))
+
+
+def test_lazy_exports_import_only_needed_submodules():
+    """Test importing constants from the package leaves the media classes unimported."""
+    script = (
+        "import sys\n"
+        "from shared.media import Extension, Size\n"
+        "print(' '.join(name for name in sys.modules if name.startswith('shared.media')))"
+    )
+    # The interpreter finds shared on the same path as the tests
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True
+    )
+
+    modules = set(result.stdout.split())
+    assert "shared.media.constants" in modules
+    assert "shared.media.media_factory" not in modules
+    assert "shared.media.base.image" not in modules
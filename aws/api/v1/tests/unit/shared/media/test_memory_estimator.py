@@ -0,0 +1,76 @@
+from shared.media.image_header import ImageHeader
+from shared.media.memory_estimator import (
+    MB,
+    RUNTIME_BYTES,
+    estimate_peak_memory,
+    estimate_tiled_memory,
+    function_memory_bytes,
+)
+
+# ===================== CONSTANTS =====================
+
+TARGETS = [(120, 120), (1080, 1080), (540, 540)]
+
+# ===================== TESTS: estimate_peak_memory =====================
+
+
+def test_estimate_still_image():
+    """Test stills count their decoded pixels and the largest variants alive at once."""
+    estimate = estimate_peak_memory(ImageHeader(4000, 3000, "RGB"), TARGETS, source_bytes=10)
+
+    assert estimate.decode_bytes == 4000 * 3000 * 4
+    assert estimate.variant_bytes == (1080 * 1080 + 540 * 540) * 4
+    assert estimate.output_bytes == 0
+    assert estimate.peak_bytes == (
+        10 + estimate.decode_bytes + estimate.variant_bytes + RUNTIME_BYTES
+    )
+
+
+def test_estimate_reduced_decode():
+    """Test reduced decodes count the reduced pixels, and the full decode when reduced after."""
+    header = ImageHeader(4000, 3000, "L")
+
+    draft = estimate_peak_memory(header, TARGETS, decoded_size=(1000, 750))
+    reduced = estimate_peak_memory(
+        header, TARGETS, decoded_size=(1000, 750), full_decode_first=True
+    )
+
+    assert draft.decode_bytes == 1000 * 750
+    assert reduced.decode_bytes == 1000 * 750 + 4000 * 3000
+
+
+def test_estimate_animation():
+    """Test animations count one frame at a time and every animated output."""
+    estimate = estimate_peak_memory(ImageHeader(500, 500, "P", frames=200), TARGETS)
+
+    assert estimate.decode_bytes == 2 * 500 * 500 * 4
+    assert estimate.output_bytes == sum(width * height for width, height in TARGETS) * 200
+
+
+def test_estimate_tiled():
+    """Test tiled resizes count a strip of the source and the rows resized to each target."""
+    header = ImageHeader(10000, 5000, "RGB")
+
+    streamed = estimate_tiled_memory(header, TARGETS, strip_rows=256)
+    decoded = estimate_tiled_memory(header, TARGETS)
+
+    assert streamed.decode_bytes == 2 * 10000 * 256 * 4
+    assert decoded.decode_bytes == 10000 * 5000 * 4
+    assert streamed.variant_bytes == decoded.variant_bytes
+    assert streamed.variant_bytes == sum(width * (5000 + height) * 4 for width, height in TARGETS)
+    assert streamed.peak_bytes < estimate_peak_memory(header, TARGETS).peak_bytes
+
+
+def test_estimate_fits():
+    """Test estimates fit in memory only with headroom left over."""
+    estimate = estimate_peak_memory(ImageHeader(100, 100, "RGB"), TARGETS)
+
+    assert estimate.fits(1024 * MB)
+    assert not estimate.fits(estimate.peak_bytes)
+
+
+def test_function_memory_bytes(monkeypatch):
+    """Test the memory of the function is read from the environment Lambda sets."""
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "3008")
+
+    assert function_memory_bytes() == 3008 * MB
@@ -56,6 +56,17 @@ class TestApiBaseService:
         assert response["statusCode"] == VALID_STATUS_CODE.value
         assert response["headers"]["Location"] == expected_location
 
+    def test_create_redirect_with_headers(self):
+        """Test other headers are added to the redirect without overriding its location."""
+        headers = {"X-Media-Placeholder": "L00000fQ", "Location": "/other/path"}
+        response = ApiBaseService.create_redirect(
+            VALID_STATUS_CODE, VALID_REDIRECT_LOCATION, headers
+        )
+        assert response["headers"] == {
+            "X-Media-Placeholder": "L00000fQ",
+            "Location": VALID_REDIRECT_LOCATION,
+        }
+
     @patch("shared.services.aws.api.api_base_service.logger.info")
     def test_create_redirect_logging(self, mock_logger_info):
         """Test that creating a redirect logs the correct information."""
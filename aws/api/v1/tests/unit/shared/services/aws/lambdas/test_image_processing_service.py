@@ -11,6 +11,7 @@ from shared.services.aws.lambdas.image_processing_service import (
     MediaProcessingError,
     Size,
 )
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 # ===================== CONSTANTS =====================
 MOCK_BUCKET = "test_bucket"
@@ -18,6 +19,7 @@ MOCK_KEY = "test_key"
 MOCK_FILENAME = "test_file"
 MOCK_EXTENSION = Extension.JPEG
 MOCK_SIZES = [Size.SMALL]
+MOCK_METADATA = ObjectMetadata(content_type="image/jpeg", size=2048, etag='"etag"')
 
 # Sample mock response payload
 MOCK_RESPONSE_PAYLOAD = {
@@ -64,11 +66,18 @@ class TestCreatePayload:
             "bucket": MOCK_BUCKET,
             "key": MOCK_KEY,
             "filename": MOCK_FILENAME,
-            "extension": MOCK_EXTENSION.value,
+            "extension": MOCK_EXTENSION.name,
             "sizes": [size.name for size in MOCK_SIZES],
         }
         assert payload == expected_payload
 
+    def test_create_payload_with_metadata(self, image_processing_invoker):
+        """Test the object metadata is carried in the payload when known."""
+        payload = image_processing_invoker._create_payload(
+            MOCK_BUCKET, MOCK_KEY, MOCK_FILENAME, MOCK_EXTENSION, MOCK_SIZES, MOCK_METADATA
+        )
+        assert payload["metadata"] == MOCK_METADATA.to_payload()
+
 
 class TestExtractPayloadFromResponse:
     def test_extract_payload_from_response(self, image_processing_invoker):
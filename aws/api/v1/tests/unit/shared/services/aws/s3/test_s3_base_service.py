@@ -59,6 +59,48 @@ def test_object_exists_error(mock_boto3_client):
         s3_service.object_exists(VALID_BUCKET, VALID_KEY)
 
 
+@patch("boto3.client")
+def test_get_object_metadata(mock_boto3_client):
+    """Test object metadata is captured from a single HEAD."""
+    mock_boto3_client.return_value.head_object.return_value = {
+        "ContentType": "image/jpeg",
+        "ContentLength": 2048,
+        "ETag": '"etag"',
+    }
+    s3_service = S3BaseService()
+
+    metadata = s3_service.get_object_metadata(VALID_BUCKET, VALID_KEY)
+
+    assert (metadata.content_type, metadata.size, metadata.etag) == ("image/jpeg", 2048, '"etag"')
+    mock_boto3_client.return_value.head_object.assert_called_once()
+
+
+@patch("boto3.client")
+def test_get_object_metadata_not_found(mock_boto3_client):
+    """Test object metadata is None for a missing object."""
+    mock_boto3_client.return_value.head_object.side_effect = ClientError(
+        CLIENT_ERROR_NOT_FOUND_RESPONSE, "head_object"
+    )
+    s3_service = S3BaseService()
+    assert s3_service.get_object_metadata(VALID_BUCKET, VALID_KEY) is None
+
+
+@patch("boto3.client")
+def test_find_missing_processed_media(mock_boto3_client):
+    """Test missing variants are found from a single listing of the file prefix."""
+    paginator = mock_boto3_client.return_value.get_paginator.return_value
+    paginator.paginate.return_value = [{"Contents": [{"Key": "testfile/small.jpg"}]}]
+    s3_service = S3BaseService()
+
+    missing = s3_service.find_missing_processed_media(
+        VALID_BUCKET, VALID_FILENAME, [("small", "jpg"), ("large", "jpg")]
+    )
+
+    assert missing == {("large", "jpg")}
+    paginator.paginate.assert_called_once_with(Bucket=VALID_BUCKET, Prefix="testfile/")
+    mock_boto3_client.return_value.head_object.assert_not_called()
+
+
 def test_construct_processed_media_key():
     """Test key generation for processed media."""
     s3_service = S3BaseService()
@@ -0,0 +1,57 @@
+from unittest.mock import Mock
+
+import pytest
+
+from shared.services.aws.s3.s3_key_listing import find_missing_keys, list_keys
+
+# ===================== CONSTANTS =====================
+
+BUCKET = "test-bucket"
+PREFIX = "testfile/"
+PAGES = [
+    {"Contents": [{"Key": "testfile/tiny.jpeg"}, {"Key": "testfile/small.jpeg"}]},
+    {"Contents": [{"Key": "testfile/tiny.webp"}]},
+    {"KeyCount": 0},
+]
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def s3_client():
+    client = Mock()
+    client.get_paginator.return_value.paginate.return_value = PAGES
+    return client
+
+
+# ===================== TESTS: list_keys =====================
+
+
+def test_list_keys_reads_every_page(s3_client):
+    """Test keys are collected from every page of the listing."""
+    keys = list_keys(s3_client, BUCKET, PREFIX)
+
+    assert keys == {"testfile/tiny.jpeg", "testfile/small.jpeg", "testfile/tiny.webp"}
+    s3_client.get_paginator.assert_called_once_with("list_objects_v2")
+    s3_client.get_paginator.return_value.paginate.assert_called_once_with(
+        Bucket=BUCKET, Prefix=PREFIX
+    )
+
+
+# ===================== TESTS: find_missing_keys =====================
+
+
+def test_find_missing_keys(s3_client):
+    """Test only the keys absent from the listing are returned."""
+    missing = find_missing_keys(
+        s3_client, BUCKET, PREFIX, ["testfile/tiny.jpeg", "testfile/huge.jpeg"]
+    )
+
+    assert missing == {"testfile/huge.jpeg"}
+    s3_client.head_object.assert_not_called()
+
+
+def test_find_missing_keys_outside_prefix(s3_client):
+    """Test keys the listing can't answer for are rejected."""
+    with pytest.raises(ValueError):
+        find_missing_keys(s3_client, BUCKET, PREFIX, ["otherfile/tiny.jpeg"])
@@ -0,0 +1,166 @@
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from shared.services.aws.s3.s3_multipart_upload import MIN_PART_SIZE, MultipartUploadWriter
+
+# ===================== CONSTANTS =====================
+
+VALID_BUCKET = "test-bucket"
+VALID_KEY = "test-key"
+VALID_CONTENT_TYPE = "image/png"
+VALID_UPLOAD_ID = "upload-id"
+
+PART_SIZE = MIN_PART_SIZE
+LAST_PART_SIZE = 1024
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def s3_client():
+    client = Mock()
+    client.create_multipart_upload.return_value = {"UploadId": VALID_UPLOAD_ID}
+    client.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+    return client
+
+
+def create_writer(s3_client, **kwargs):
+    return MultipartUploadWriter(
+        s3_client, VALID_BUCKET, VALID_KEY, VALID_CONTENT_TYPE, part_size=PART_SIZE, **kwargs
+    )
+
+
+# ===================== TESTS: MultipartUploadWriter =====================
+
+
+def test_small_object_uses_put_object(s3_client):
+    """Test an object smaller than one part is uploaded with a single put_object."""
+    with create_writer(s3_client) as writer:
+        writer.write(b"encoded")
+
+    s3_client.put_object.assert_called_once_with(
+        Bucket=VALID_BUCKET, Key=VALID_KEY, Body=b"encoded", ContentType=VALID_CONTENT_TYPE
+    )
+    s3_client.create_multipart_upload.assert_not_called()
+    assert writer.report.size == len(b"encoded")
+
+
+def test_metadata_is_stored_with_the_object(s3_client):
+    """Test user metadata is given to put_object and create_multipart_upload alike."""
+    metadata = {"placeholder": "L00000fQ"}
+    with create_writer(s3_client, metadata=metadata) as writer:
+        writer.write(b"encoded")
+    with create_writer(s3_client, metadata=metadata) as writer:
+        writer.write(bytes(PART_SIZE + LAST_PART_SIZE))
+
+    assert s3_client.put_object.call_args.kwargs["Metadata"] == metadata
+    assert s3_client.create_multipart_upload.call_args.kwargs["Metadata"] == metadata
+
+
+def test_large_object_uses_multipart_upload(s3_client):
+    """Test parts are uploaded as they are written and completed in order on close."""
+    with create_writer(s3_client, max_concurrency=2) as writer:
+        for _ in range(2):
+            writer.write(bytes(PART_SIZE))
+        writer.write(bytes(LAST_PART_SIZE))
+
+    part_sizes = sorted(
+        (call.kwargs["PartNumber"], len(call.kwargs["Body"]))
+        for call in s3_client.upload_part.call_args_list
+    )
+    assert part_sizes == [(1, PART_SIZE), (2, PART_SIZE), (3, LAST_PART_SIZE)]
+    s3_client.complete_multipart_upload.assert_called_once_with(
+        Bucket=VALID_BUCKET,
+        Key=VALID_KEY,
+        UploadId=VALID_UPLOAD_ID,
+        MultipartUpload={
+            "Parts": [{"PartNumber": number, "ETag": f"etag-{number}"} for number in (1, 2, 3)]
+        },
+    )
+    s3_client.put_object.assert_not_called()
+
+
+def test_report_has_part_timings(s3_client):
+    """Test the upload report has the size and timing of every part."""
+    with create_writer(s3_client) as writer:
+        writer.write(bytes(PART_SIZE + LAST_PART_SIZE))
+
+    assert [(part.part_number, part.size) for part in writer.report.parts] == [
+        (1, PART_SIZE),
+        (2, LAST_PART_SIZE),
+    ]
+    assert writer.report.size == PART_SIZE + LAST_PART_SIZE
+    assert all(part.seconds >= 0 for part in writer.report.parts)
+
+
+def test_failed_part_aborts_upload(s3_client, mocker):
+    """Test a part failing on every attempt aborts the multipart upload when closing."""
+    mocker.patch("shared.services.aws.s3.s3_multipart_upload.PART_RETRY_BACKOFF_SECONDS", 0)
+    s3_client.upload_part.side_effect = EndpointConnectionError(endpoint_url="s3")
+
+    with pytest.raises(EndpointConnectionError):
+        with create_writer(s3_client) as writer:
+            writer.write(bytes(PART_SIZE))
+
+    s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket=VALID_BUCKET, Key=VALID_KEY, UploadId=VALID_UPLOAD_ID
+    )
+    s3_client.complete_multipart_upload.assert_not_called()
+
+
+def test_encoder_error_aborts_upload(s3_client):
+    """Test an error raised while writing aborts the upload instead of completing it."""
+    with pytest.raises(RuntimeError):
+        with create_writer(s3_client) as writer:
+            writer.write(bytes(PART_SIZE))
+            raise RuntimeError("encoder failed")
+
+    s3_client.abort_multipart_upload.assert_called_once()
+    s3_client.complete_multipart_upload.assert_not_called()
+    s3_client.put_object.assert_not_called()
+
+
+def test_invalid_part_size(s3_client):
+    """Test parts smaller than the S3 minimum are rejected."""
+    with pytest.raises(ValueError):
+        MultipartUploadWriter(
+            s3_client, VALID_BUCKET, VALID_KEY, VALID_CONTENT_TYPE, part_size=MIN_PART_SIZE - 1
+        )
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ClientError({"Error": {"Code": "SlowDown"}}, "UploadPart"),
+        EndpointConnectionError(endpoint_url="https://s3"),
+    ],
+    ids=["throttled", "connection"],
+)
+def test_transient_part_failure_is_retried(s3_client, mocker, error):
+    """Test a part failing with a transient error is uploaded again from the bytes held."""
+    mocker.patch("shared.services.aws.s3.s3_multipart_upload.PART_RETRY_BACKOFF_SECONDS", 0)
+    upload_part = s3_client.upload_part.side_effect
+    s3_client.upload_part.side_effect = [error, upload_part(PartNumber=1)]
+
+    with create_writer(s3_client) as writer:
+        writer.write(bytes(PART_SIZE))
+
+    assert s3_client.upload_part.call_count == 2
+    s3_client.complete_multipart_upload.assert_called_once()
+    s3_client.abort_multipart_upload.assert_not_called()
+
+
+def test_permanent_part_failure_is_not_retried(s3_client):
+    """Test a part failing with a client error that won't go away aborts the upload at once."""
+    s3_client.upload_part.side_effect = ClientError(
+        {"Error": {"Code": "AccessDenied"}}, "UploadPart"
+    )
+
+    with pytest.raises(ClientError):
+        with create_writer(s3_client) as writer:
+            writer.write(bytes(PART_SIZE + LAST_PART_SIZE))
+
+    assert s3_client.upload_part.call_count == 1
+    s3_client.abort_multipart_upload.assert_called_once()
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+
+from shared.services.aws.s3.s3_object_metadata import PLACEHOLDER_METADATA_KEY, ObjectMetadata
+
+# ===================== CONSTANTS =====================
+
+VALID_CONTENT_TYPE = "image/jpeg"
+VALID_SIZE = 2048
+VALID_ETAG = '"etag"'
+VALID_LAST_MODIFIED = datetime(2023, 8, 21, 12, 0, tzinfo=timezone.utc)
+VALID_PLACEHOLDER = "LEHV6nWB2yk8pyo0adR*.7kCMdnj"
+
+HEAD_RESPONSE = {
+    "ContentType": VALID_CONTENT_TYPE,
+    "ContentLength": VALID_SIZE,
+    "ETag": VALID_ETAG,
+    "LastModified": VALID_LAST_MODIFIED,
+}
+
+# ===================== TESTS: ObjectMetadata =====================
+
+
+def test_from_head_response():
+    """Test metadata is captured from a HEAD response."""
+    metadata = ObjectMetadata.from_head_response(HEAD_RESPONSE)
+
+    assert metadata == ObjectMetadata(
+        VALID_CONTENT_TYPE, VALID_SIZE, VALID_ETAG, VALID_LAST_MODIFIED.isoformat()
+    )
+
+
+def test_from_head_response_with_placeholder():
+    """Test the placeholder is read from the user metadata of a HEAD response."""
+    response = {**HEAD_RESPONSE, "Metadata": {PLACEHOLDER_METADATA_KEY: VALID_PLACEHOLDER}}
+
+    assert ObjectMetadata.from_head_response(response).placeholder == VALID_PLACEHOLDER
+    assert ObjectMetadata.from_head_response(HEAD_RESPONSE).placeholder is None
+
+
+def test_payload_round_trip():
+    """Test metadata survives being carried in an invocation payload."""
+    metadata = ObjectMetadata.from_head_response(HEAD_RESPONSE)
+
+    assert ObjectMetadata.from_payload(metadata.to_payload()) == metadata
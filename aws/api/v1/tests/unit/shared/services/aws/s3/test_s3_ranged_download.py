@@ -0,0 +1,102 @@
+import io
+import re
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from shared.services.aws.s3.s3_ranged_download import RangedDownloader
+
+# ===================== CONSTANTS =====================
+
+VALID_BUCKET = "test-bucket"
+VALID_KEY = "test-key"
+VALID_ETAG = '"etag"'
+OBJECT_BYTES = bytes(range(256)) * 4
+RANGE_SIZE = 100
+
+INVALID_RANGE_RESPONSE = {"Error": {"Code": "InvalidRange"}}
+
+# ===================== FIXTURES =====================
+
+
+def get_object(Range=None, **kwargs):
+    """Serve OBJECT_BYTES like S3, honouring byte ranges."""
+    start, stop = map(int, re.match(r"bytes=(\d+)-(\d+)", Range).groups())
+    data = OBJECT_BYTES[start:][: stop - start + 1]
+    return {
+        "Body": io.BytesIO(data),
+        "ContentLength": len(data),
+        "ContentRange": f"bytes {start}-{start + len(data) - 1}/{len(OBJECT_BYTES)}",
+        "ETag": VALID_ETAG,
+    }
+
+
+@pytest.fixture
+def s3_client():
+    client = Mock()
+    client.get_object.side_effect = get_object
+    return client
+
+
+# ===================== TESTS: RangedDownloader =====================
+
+
+def test_split():
+    """Test the remaining bytes are split into inclusive ranges, the last one shorter."""
+    downloader = RangedDownloader(Mock(), range_size=RANGE_SIZE)
+
+    assert downloader.split(100, 350) == [(100, 199), (200, 299), (300, 349)]
+
+
+def test_read_into_downloads_every_range(s3_client):
+    """Test the object is reassembled from parallel ranges pinned to the first ETag."""
+    downloader = RangedDownloader(s3_client, range_size=RANGE_SIZE, max_concurrency=4)
+    buffer = bytearray(len(OBJECT_BYTES))
+
+    with downloader.open(VALID_BUCKET, VALID_KEY) as ranged_object:
+        assert ranged_object.size == len(OBJECT_BYTES)
+        ranged_object.read_into(buffer)
+
+    assert bytes(buffer) == OBJECT_BYTES
+    calls = s3_client.get_object.call_args_list
+    assert len(calls) == -(-len(OBJECT_BYTES) // RANGE_SIZE)
+    assert "IfMatch" not in calls[0].kwargs
+    assert all(call.kwargs["IfMatch"] == VALID_ETAG for call in calls[1:])
+
+
+def test_small_object_single_request(s3_client):
+    """Test an object no larger than one range is downloaded with the first request alone."""
+    downloader = RangedDownloader(s3_client, range_size=len(OBJECT_BYTES))
+    buffer = bytearray(len(OBJECT_BYTES))
+
+    with downloader.open(VALID_BUCKET, VALID_KEY) as ranged_object:
+        ranged_object.read_into(buffer)
+
+    assert bytes(buffer) == OBJECT_BYTES
+    s3_client.get_object.assert_called_once()
+
+
+def test_empty_object(s3_client):
+    """Test empty objects, which have no satisfiable range, are requested without one."""
+    s3_client.get_object.side_effect = [
+        ClientError(INVALID_RANGE_RESPONSE, "GetObject"),
+        {"Body": io.BytesIO(), "ContentLength": 0},
+    ]
+
+    with RangedDownloader(s3_client).open(VALID_BUCKET, VALID_KEY) as ranged_object:
+        assert ranged_object.size == 0
+        assert ranged_object.read_into(bytearray()) == 0
+
+
+def test_incomplete_range(s3_client):
+    """Test a range whose body ends early fails the download."""
+    s3_client.get_object.side_effect = lambda **kwargs: {
+        **get_object(**kwargs),
+        "Body": io.BytesIO(b"short"),
+    }
+    downloader = RangedDownloader(s3_client, range_size=RANGE_SIZE)
+
+    with pytest.raises(OSError):
+        with downloader.open(VALID_BUCKET, VALID_KEY) as ranged_object:
+            ranged_object.read_into(bytearray(len(OBJECT_BYTES)))
@@ -0,0 +1,36 @@
+from unittest.mock import patch
+
+from shared.services.aws.client_provider import CLIENT_CONFIG, clear_clients, get_client
+
+# ===================== TESTS: get_client =====================
+
+
+@patch("boto3.client")
+def test_get_client_creates_each_client_once(mock_boto3_client):
+    """Test every service client is created once and reused by later calls."""
+    assert get_client("s3") is get_client("s3")
+    get_client("lambda")
+
+    assert [call.args for call in mock_boto3_client.call_args_list] == [("s3",), ("lambda",)]
+
+
+@patch("boto3.client")
+def test_get_client_uses_tuned_config(mock_boto3_client):
+    """Test clients are created with a large connection pool, keep-alive and adaptive retries."""
+    get_client("s3")
+
+    config = mock_boto3_client.call_args.kwargs["config"]
+    assert config is CLIENT_CONFIG
+    assert config.max_pool_connections > 10
+    assert config.tcp_keepalive
+    assert config.retries["mode"] == "adaptive"
+
+
+@patch("boto3.client")
+def test_clear_clients(mock_boto3_client):
+    """Test clients are created again once cleared."""
+    get_client("s3")
+    clear_clients()
+    get_client("s3")
+
+    assert mock_boto3_client.call_count == 2
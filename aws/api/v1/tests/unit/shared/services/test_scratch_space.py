@@ -0,0 +1,91 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from shared.services.scratch_space import SCRATCH_PREFIX, ScratchSpace, sweep_scratch_space
+
+# ===================== CONSTANTS =====================
+
+BUDGET_BYTES = 1024
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    with ScratchSpace(budget_bytes=BUDGET_BYTES, root=tmp_path, headroom_bytes=0) as scratch:
+        yield scratch
+
+
+# ===================== TESTS: ScratchSpace =====================
+
+
+def test_reserve_creates_file_in_job_directory(scratch, tmp_path):
+    """Test reserved files are created in a directory of the job, with keys made flat."""
+    path = scratch.reserve("user/videos/video.mp4", 100)
+
+    assert path.exists()
+    assert path.parent == scratch.directory
+    assert path.parent.parent == tmp_path
+    assert path.name.endswith("user_videos_video.mp4")
+
+
+def test_bytes_in_use_follow_reservations_and_writes(scratch):
+    """Test files take their reservation until they outgrow it, and nothing once deleted."""
+    first = scratch.reserve("first", 100)
+    second = scratch.reserve("second", 10)
+    second.write_bytes(b"\0" * 50)
+
+    assert scratch.bytes_in_use == 150
+
+    first.unlink()
+    assert scratch.bytes_in_use == 50
+
+
+def test_reserve_over_budget(scratch):
+    """Test reservations taking the job over its budget are refused without creating a file."""
+    scratch.reserve("first", BUDGET_BYTES - 10)
+
+    with pytest.raises(ScratchSpace.BudgetExceeded):
+        scratch.reserve("second", 20)
+    assert len(list(scratch.directory.iterdir())) == 1
+
+
+def test_reserve_over_free_space(tmp_path):
+    """Test reservations larger than the free space of the volume are refused."""
+    with ScratchSpace(budget_bytes=2**62, root=tmp_path) as scratch:
+        with pytest.raises(ScratchSpace.BudgetExceeded):
+            scratch.reserve("huge", 2**61)
+
+
+def test_allocate_chooses_memory_or_disk(scratch):
+    """Test bodies fitting the memory limit are buffers and larger ones reserved files."""
+    assert isinstance(scratch.allocate("small", 10, memory_max_bytes=100), io.BytesIO)
+    assert isinstance(scratch.allocate("large", 200, memory_max_bytes=100), Path)
+    assert isinstance(scratch.allocate("disk", 10, memory_max_bytes=None), Path)
+    assert scratch.bytes_in_use == 210
+
+
+def test_close_removes_leftovers(tmp_path):
+    """Test closing the scratch space removes the files its consumers left behind."""
+    with ScratchSpace(root=tmp_path) as scratch:
+        scratch.reserve("leftover").write_bytes(b"data")
+
+    assert not scratch.directory.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+# ===================== TESTS: sweep_scratch_space =====================
+
+
+def test_sweep_removes_scratch_directories_only(tmp_path):
+    """Test sweeping removes leftover scratch directories and leaves other files alone."""
+    leftover = tmp_path / f"{SCRATCH_PREFIX}old"
+    leftover.mkdir()
+    (leftover / "video.mp4").write_bytes(b"\0" * 100)
+    other = tmp_path / "content-index.sqlite3"
+    other.write_bytes(b"index")
+
+    assert sweep_scratch_space(tmp_path) == 100
+    assert list(tmp_path.iterdir()) == [other]
@@ -0,0 +1,122 @@
+"""
+Benchmark the image processing execution backends (inline, thread pool, process pool) over
+source images of increasing pixel count. Every run decodes a JPEG source and resizes and
+encodes the full size ladder in every requested extension; uploads are replaced by a no-op so
+only CPU work is measured.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/bench_executor_backends.py --megapixels 0.5 2 12 24 --repeat 3
+    python aws/s3/benchmarks/bench_executor_backends.py --megapixels 12 --extensions jpeg webp
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "aws" / "s3" / "src" / "lambdas" / "image_processing_function"))
+
+from executors import (  # noqa: E402
+    ExecutionBackend,
+    available_cpus,
+    create_executor,
+    process_pool_supported,
+    select_backend,
+)
+from image_processor import ImageProcessor  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from PIL import ImageFilter  # noqa: E402
+from utils import release_image_source  # noqa: E402
+
+from shared.media import Extension, Size  # noqa: E402
+
+
+class NoopUploader:
+    """Stands in for ImageUploader, releasing each encoded variant without uploading it."""
+
+    def upload_image(self, body, processed_bucket, image_media, size, extension, metadata=None):
+        release_image_source(body)
+
+
+class BenchmarkMedia:
+    filename = "benchmark"
+
+
+def create_source(megapixels: float) -> bytes:
+    """Create a JPEG source with a 3:2 aspect ratio and some texture for the encoder."""
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    noise = PILImage.frombytes("L", (width // 8, height // 8), os.urandom(width * height // 64))
+    img = PILImage.merge(
+        "RGB", [noise, noise.rotate(180), noise.transpose(PILImage.Transpose.FLIP_LEFT_RIGHT)]
+    )
+    img = img.resize((width, height)).filter(ImageFilter.SMOOTH)
+
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def run_job(
+    source: bytes, backend: ExecutionBackend, workers: int, extensions: List[Extension]
+) -> float:
+    """Run one job through the given backend and return its duration in seconds."""
+    # The reduced decode is turned off so every backend processes the full resolution source
+    processor = ImageProcessor(in_memory=True)
+    processor.decode_planner.enabled = False
+    sizes = list(Size)
+
+    start = time.perf_counter()
+    with create_executor(backend, max_workers=workers) as executor:
+        processor.process_and_upload_images(
+            io.BytesIO(source),
+            BenchmarkMedia(),
+            "benchmark-bucket",
+            extensions,
+            sizes,
+            executor,
+            NoopUploader(),
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.5, 2, 12, 24])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=available_cpus())
+    parser.add_argument("--extensions", nargs="+", default=["jpeg"])
+    args = parser.parse_args()
+    extensions = [Extension(extension) for extension in args.extensions]
+
+    backends = [ExecutionBackend.INLINE, ExecutionBackend.THREAD]
+    if process_pool_supported():
+        backends.append(ExecutionBackend.PROCESS)
+
+    print(f"CPUs: {available_cpus()}, workers: {args.workers}, best of {args.repeat} runs")
+    print(f"Extensions: {', '.join(extension.value for extension in extensions)}")
+    header = f"{'MP':>6} " + " ".join(f"{b.value + ' (s)':>12}" for b in backends)
+    print(f"{header} {'fastest':>9} {'auto':>9}")
+
+    for megapixels in args.megapixels:
+        source = create_source(megapixels)
+        timings = {
+            backend: min(
+                run_job(source, backend, args.workers, extensions) for _ in range(args.repeat)
+            )
+            for backend in backends
+        }
+        fastest = min(timings, key=timings.__getitem__)
+        auto = select_backend(int(megapixels * 1_000_000), cpus=args.workers)
+        row = " ".join(f"{timings[backend]:>12.3f}" for backend in backends)
+        print(f"{megapixels:>6} {row} {fastest.value:>9} {auto.value:>9}")
+
+
+if __name__ == "__main__":
+    main()
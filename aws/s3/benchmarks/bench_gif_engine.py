@@ -0,0 +1,124 @@
+"""
+Compare resizing a long animated GIF by holding every resized frame in a list and saving it
+with Pillow, with writing it frame by frame through GifStreamWriter. Each approach runs in its
+own subprocess, so its peak RSS is measured on its own.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/bench_gif_engine.py --frames 120 --dimension 400
+"""
+
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+LAMBDA_DIR = ROOT / "aws" / "s3" / "src" / "lambdas" / "image_processing_function"
+sys.path.append(str(ROOT))
+sys.path.append(str(LAMBDA_DIR))
+
+from gif_engine import GifStreamWriter, build_global_palette, iter_frames  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from PIL import ImageDraw, ImageSequence  # noqa: E402
+
+TARGET_DIMENSIONS = [(2160, 2160), (1080, 1080), (540, 540), (270, 270), (120, 120)]
+
+
+def create_gif(path: Path, frames: int, dimension: int) -> None:
+    """A circle moving diagonally over a gradient."""
+    background = PILImage.linear_gradient("L").resize((dimension, dimension)).convert("RGB")
+
+    def frame(index: int) -> PILImage.Image:
+        img = background.copy()
+        offset = index * dimension // frames
+        ImageDraw.Draw(img).ellipse(
+            (offset, offset, offset + dimension // 4, offset + dimension // 4), fill=(250, 80, 0)
+        )
+        return img
+
+    first = frame(0)
+    first.save(
+        path,
+        "GIF",
+        save_all=True,
+        append_images=(frame(index) for index in range(1, frames)),
+        duration=40,
+        loop=0,
+    )
+
+
+def resize_with_lists(path: Path) -> list:
+    img = PILImage.open(path)
+    sizes = []
+    for dimensions in TARGET_DIMENSIONS:
+        frames = [frame.copy().resize(dimensions) for frame in ImageSequence.Iterator(img)]
+        buffer = io.BytesIO()
+        frames[0].save(buffer, "GIF", save_all=True, append_images=frames[1:])
+        sizes.append(buffer.tell())
+    return sizes
+
+
+def resize_with_engine(path: Path) -> list:
+    img = PILImage.open(path)
+    palette = build_global_palette(img)
+    buffers = [io.BytesIO() for _ in TARGET_DIMENSIONS]
+    writers = [
+        GifStreamWriter(buffer, dimensions, palette)
+        for buffer, dimensions in zip(buffers, TARGET_DIMENSIONS)
+    ]
+    for frame, duration in iter_frames(img):
+        for writer, dimensions in zip(writers, TARGET_DIMENSIONS):
+            writer.write_frame(frame.resize(dimensions), duration)
+    for writer in writers:
+        writer.close()
+    return [buffer.tell() for buffer in buffers]
+
+
+APPROACHES = {"lists": resize_with_lists, "engine": resize_with_engine}
+
+
+def run_approach(name: str, path: Path) -> None:
+    """Run one approach in this (child) process and print its measurements as JSON."""
+    start = time.perf_counter()
+    sizes = APPROACHES[name](path)
+    seconds = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": seconds, "peak_mib": peak_mib, "sizes": sizes}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--dimension", type=int, default=400)
+    parser.add_argument("--source", type=Path, default=Path("/tmp/bench_gif_engine.gif"))
+    parser.add_argument("--run", choices=APPROACHES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_approach(args.run, args.source)
+        return
+
+    create_gif(args.source, args.frames, args.dimension)
+    print(f"{args.frames} frames of {args.dimension}px, {args.source.stat().st_size / 1e6:.1f} MB")
+    for name in APPROACHES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--run", name, "--source", str(args.source)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output)
+        total_mb = sum(result["sizes"]) / 1e6
+        print(
+            f"  {name:>6}: {result['seconds']:.2f}s, peak RSS {result['peak_mib']:.0f} MiB, "
+            f"output {total_mb:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare the image backends (Pillow, pyvips, NumPy) over the IMAGE_DIMENSIONS size ladder. For
+every square JPEG source, each backend decodes it as planned for the whole ladder, then resizes
+the decoded image to every size with its resampling profile and encodes the variant as JPEG.
+The ladder row resizes every size as the processor does instead, through the cascade or the
+backend's own ladder. Backends whose dependency is missing here are left out.
+
+A 4320 pixel side divides by every ladder size, so the NumPy backend block averages all of
+them, while a 4000 pixel side leaves it fractional reductions only.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/bench_image_backends.py --sides 4320 4000 --repeat 3
+    python aws/s3/benchmarks/bench_image_backends.py --backends pillow numpy --tier fast
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "aws" / "s3" / "src" / "lambdas" / "image_processing_function"))
+
+from decode_planner import DecodePlanner  # noqa: E402
+from encoder_profiles import get_encoder_profile  # noqa: E402
+from image_backends import IMAGE_BACKENDS, ImageBackendType, backend_supported  # noqa: E402
+from image_processor import ImageProcessor  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from PIL import ImageFilter  # noqa: E402
+from resampling import ResamplingPolicy, ResamplingTier  # noqa: E402
+
+from shared.media import Extension, Size  # noqa: E402
+
+
+def create_source(side: int) -> bytes:
+    """Create a square JPEG source with some texture for the resamplers and the encoder."""
+    noise = PILImage.frombytes("L", (side // 8, side // 8), os.urandom((side // 8) ** 2))
+    img = PILImage.merge(
+        "RGB", [noise, noise.rotate(180), noise.transpose(PILImage.Transpose.FLIP_LEFT_RIGHT)]
+    )
+    img = img.resize((side, side)).filter(ImageFilter.SMOOTH)
+
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def best_of(repeat: int, fn, *args):
+    """Return the best duration over repeat runs of fn and its last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def encode_jpeg(backend, img: PILImage.Image, size: Size) -> None:
+    encoder = get_encoder_profile(Extension.JPEG, size)
+    backend.encode(img, io.BytesIO(), "JPEG", encoder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sides", type=int, nargs="+", default=[4320, 4000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--backends", nargs="+", default=[backend.value for backend in ImageBackendType]
+    )
+    parser.add_argument("--tier", default=ResamplingTier.BALANCED.value)
+    parser.add_argument("--no-reduced-decode", action="store_true")
+    args = parser.parse_args()
+
+    backends = []
+    for name in args.backends:
+        backend_type = ImageBackendType(name)
+        if backend_supported(backend_type):
+            backends.append(IMAGE_BACKENDS[backend_type]())
+        else:
+            print(f"Skipping {name}: its dependency is not installed")
+
+    planner = DecodePlanner(enabled=not args.no_reduced_decode)
+    resampling = ResamplingPolicy(args.tier)
+    sizes = list(Size)
+    print(f"Best of {args.repeat} runs, resampling {resampling}")
+    print("Sum adds up resizing every size from the decoded source and encoding it, ladder")
+    print("times resizing every size as the processor does, without encoding")
+
+    for side in args.sides:
+        source = create_source(side)
+        print(f"\nSource {side}x{side}, times in ms (decode, then resize + encode per size)")
+        print(f"{'size':<8}" + "".join(f"{str(backend):>20}" for backend in backends))
+
+        decoded = {}
+        row = f"{'decode':<8}"
+        for backend in backends:
+            seconds, (img, plan) = best_of(
+                args.repeat, backend.decode, io.BytesIO(source), sizes, planner
+            )
+            img.load()
+            decoded[backend] = img
+            row += f"{seconds * 1000:>11.1f} {plan.method.value:>8}"
+        print(row)
+
+        totals = {backend: 0.0 for backend in backends}
+        for size in sizes:
+            dimensions = ImageProcessor._get_dimensions(size)
+            profile = resampling.for_size(size)
+            row = f"{size.name:<8}"
+            for backend in backends:
+                resize_seconds, variant = best_of(
+                    args.repeat, backend.resize, decoded[backend], dimensions, profile
+                )
+                encode_seconds, _ = best_of(args.repeat, encode_jpeg, backend, variant, size)
+                totals[backend] += resize_seconds + encode_seconds
+                row += f"{resize_seconds * 1000:>11.1f} +{encode_seconds * 1000:>7.1f}"
+            print(row)
+        print(f"{'sum':<8}" + "".join(f"{totals[b] * 1000:>20.1f}" for b in backends))
+
+        row = f"{'ladder':<8}"
+        for backend in backends:
+            processor = ImageProcessor(resampling=resampling, backend=backend)
+            seconds, _ = best_of(
+                args.repeat,
+                lambda img: list(processor._resize_cascade(img, sizes)),
+                decoded[backend],
+            )
+            row += f"{seconds * 1000:>20.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Measure the cold start import cost of every Lambda entry point and fail when one is over its
+budget. Each handler module is imported in a fresh interpreter with -X importtime, so nothing
+is cached between runs; the best of the runs is compared with the budget, and the packages
+that import time is spent in are listed so a regression points at its cause.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/bench_import_time.py
+    python aws/s3/benchmarks/bench_import_time.py --handlers image_processing_function --top 10
+    python aws/s3/benchmarks/bench_import_time.py --repeat 5 --scale 1.5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[3]
+S3_LAMBDAS = ROOT / "aws" / "s3" / "src" / "lambdas"
+API_SRC = ROOT / "aws" / "api" / "v1" / "src"
+
+# Written to stderr right before the handler is imported, so the imports of the interpreter
+# start up itself are left out of the breakdown
+MARKER = "--- handler import ---"
+
+IMPORT_SCRIPT = (
+    "import sys, time\n"
+    f"sys.stderr.write({MARKER!r} + '\\n'); sys.stderr.flush()\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+@dataclass(frozen=True)
+class EntryPoint:
+    name: str
+    directory: Path
+    module: str
+    # Import time the handler may spend, in milliseconds. boto3 alone costs most of 300 ms.
+    budget_ms: float
+
+
+# Handlers creating their client at import time also load its service model then, which is
+# reported as import time of the handler itself
+CLIENT_AT_IMPORT_BUDGET_MS = 900
+
+
+ENTRY_POINTS = [
+    EntryPoint("image_processing_function", S3_LAMBDAS / "image_processing_function", "app", 600),
+    EntryPoint(
+        "media_processing_dispatcher", S3_LAMBDAS / "media_processing_dispatcher", "app", 500
+    ),
+    EntryPoint(
+        "record_media_metadata_function", S3_LAMBDAS / "record_media_metadata_function", "app", 150
+    ),
+    EntryPoint(
+        "gif_generator_function",
+        S3_LAMBDAS / "gif_generator_function",
+        "app",
+        CLIENT_AT_IMPORT_BUDGET_MS,
+    ),
+    EntryPoint(
+        "thumbnail_generator_function",
+        S3_LAMBDAS / "thumbnail_generator_function",
+        "app",
+        CLIENT_AT_IMPORT_BUDGET_MS,
+    ),
+    EntryPoint(
+        "video_processing_function",
+        S3_LAMBDAS / "video_processing_function",
+        "app",
+        CLIENT_AT_IMPORT_BUDGET_MS,
+    ),
+    EntryPoint("upload_media_function", API_SRC / "lambdas" / "upload_media_function", "app", 500),
+    # Its modules import each other relatively, so it is imported as a package
+    EntryPoint("retrieve_media_function", API_SRC, "lambdas.retrieve_media_function.app", 500),
+]
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Return the self import time of every top level package after the marker, in ms."""
+    lines = stderr.splitlines()
+    start = lines.index(MARKER) + 1 if MARKER in lines else 0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in lines[start:]:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.partition(":")[2].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+    return packages
+
+
+def import_handler(entry_point: EntryPoint) -> Tuple[float, Dict[str, float]]:
+    """Import a handler in a fresh interpreter and return its import time and breakdown, in ms."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    # Handlers creating clients at import time need a region, as they have in Lambda
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(module=entry_point.module)],
+        cwd=entry_point.directory,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1]) * 1000, parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--handlers", nargs="+", default=[e.name for e in ENTRY_POINTS])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=3, help="packages listed per handler")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplies every budget, for slower machines"
+    )
+    args = parser.parse_args()
+    entry_points = [e for e in ENTRY_POINTS if e.name in args.handlers]
+
+    print(f"Python {sys.version.split()[0]}, best of {args.repeat} runs, budget x{args.scale}")
+    print(f"{'handler':<32} {'import (ms)':>12} {'budget (ms)':>12}  heaviest packages")
+
+    failures: List[str] = []
+    for entry_point in entry_points:
+        budget = entry_point.budget_ms * args.scale
+        try:
+            runs = [import_handler(entry_point) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            failures.append(entry_point.name)
+            print(f"{entry_point.name:<32} {'failed':>12} {budget:>12.0f}  {e}")
+            continue
+
+        duration, packages = min(runs, key=lambda run: run[0])
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]
+        breakdown = ", ".join(f"{name} {ms:.0f}" for name, ms in heaviest)
+        status = "" if duration <= budget else "  OVER BUDGET"
+        if status:
+            failures.append(entry_point.name)
+        print(f"{entry_point.name:<32} {duration:>12.1f} {budget:>12.0f}  {breakdown}{status}")
+
+    if failures:
+        print(f"Over budget or failed to import: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Report the resize time and quality of every resampling tier for every size. Quality is the
+SSIM of each variant against a plain Lanczos resize of the same source, so 1.0 means
+indistinguishable from the reference. Requires numpy.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/bench_resampling_tiers.py --megapixels 12 --repeat 3
+    python aws/s3/benchmarks/bench_resampling_tiers.py --source photo.jpg
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "aws" / "s3" / "src" / "lambdas" / "image_processing_function"))
+
+import numpy as np  # noqa: E402
+from image_processor import ImageProcessor  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from PIL import ImageDraw, ImageFilter  # noqa: E402
+from resampling import LANCZOS, RESAMPLING_TIERS, ResamplingTier  # noqa: E402
+
+from shared.media import Size  # noqa: E402
+
+# SSIM constants for 8 bit images, computed over SSIM_WINDOW x SSIM_WINDOW windows
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+SSIM_WINDOW = 7
+
+
+def create_source(megapixels: float) -> PILImage.Image:
+    """A 3:2 image with fine texture and sharp edges, where resampling filters differ most."""
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    noise = PILImage.frombytes("L", (width // 4, height // 4), os.urandom(width * height // 16))
+    img = PILImage.merge(
+        "RGB", [noise, noise.rotate(180), noise.transpose(PILImage.Transpose.FLIP_LEFT_RIGHT)]
+    )
+    img = img.resize((width, height)).filter(ImageFilter.SMOOTH)
+
+    draw = ImageDraw.Draw(img)
+    for x in range(0, width, max(width // 60, 1)):
+        draw.line((x, 0, width - x, height), fill=(255, 255, 255), width=3)
+    return img
+
+
+def window_mean(values: np.ndarray) -> np.ndarray:
+    """Mean of every SSIM_WINDOW x SSIM_WINDOW window, through a summed-area table."""
+    table = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    n = SSIM_WINDOW
+    sums = table[n:, n:] - table[:-n, n:] - table[n:, :-n] + table[:-n, :-n]
+    return sums / (n * n)
+
+
+def ssim(img: PILImage.Image, reference: PILImage.Image) -> float:
+    """Mean structural similarity of the luma of two images of the same size."""
+    x = np.asarray(img.convert("L"), dtype=np.float64)
+    y = np.asarray(reference.convert("L"), dtype=np.float64)
+
+    mean_x, mean_y = window_mean(x), window_mean(y)
+    var_x = window_mean(x * x) - mean_x**2
+    var_y = window_mean(y * y) - mean_y**2
+    covariance = window_mean(x * y) - mean_x * mean_y
+
+    numerator = (2 * mean_x * mean_y + SSIM_C1) * (2 * covariance + SSIM_C2)
+    denominator = (mean_x**2 + mean_y**2 + SSIM_C1) * (var_x + var_y + SSIM_C2)
+    return float((numerator / denominator).mean())
+
+
+def time_resize(profile, img: PILImage.Image, dimensions, repeat: int):
+    """Return the best resize time over repeat runs and the resized variant."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        variant = profile.resize(img, dimensions)
+        best = min(best, time.perf_counter() - start)
+    return best, variant
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--source", type=Path, help="an image to use instead of a synthetic one")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    img = (
+        PILImage.open(args.source).convert("RGB") if args.source else create_source(args.megapixels)
+    )
+    img.load()
+    print(f"Source {img.width}x{img.height}, best of {args.repeat}, resized from the source")
+
+    references = {size: LANCZOS.resize(img, ImageProcessor._get_dimensions(size)) for size in Size}
+
+    print(f"{'tier':<10}{'size':<8}{'profile':<16}{'time':>10}{'ssim':>8}")
+    for tier in ResamplingTier:
+        total = 0.0
+        for size in Size:
+            profile = RESAMPLING_TIERS[tier][size]
+            seconds, variant = time_resize(
+                profile, img, ImageProcessor._get_dimensions(size), args.repeat
+            )
+            total += seconds
+            quality = ssim(variant, references[size])
+            print(
+                f"{tier.value:<10}{size.name:<8}{str(profile):<16}"
+                f"{seconds * 1000:>8.1f}ms{quality:>8.4f}"
+            )
+        print(f"{tier.value:<10}{'total':<24}{total * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare encoding a variant before uploading it with encoding it straight into a multipart
+upload. S3 is simulated by a client sleeping for every uploaded byte, so the streamed job
+should take about max(encode, upload) and the sequential one their sum.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/bench_streaming_upload.py --dimension 2160 --mbps 100
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from typing import BinaryIO, cast
+
+ROOT = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT))
+
+from PIL import Image as PILImage  # noqa: E402
+
+from shared.services.aws.s3.s3_multipart_upload import (  # noqa: E402
+    MIB,
+    MIN_PART_SIZE,
+    MultipartUploadWriter,
+)
+
+
+class SimulatedS3Client:
+    """Implements the S3 calls used by the benchmark, sleeping to simulate the transfer."""
+
+    def __init__(self, mbps: float):
+        self.seconds_per_byte = 8 / (mbps * 1_000_000)
+
+    def _transfer(self, body: bytes) -> None:
+        time.sleep(len(body) * self.seconds_per_byte)
+
+    def put_object(self, Body, **kwargs):
+        self._transfer(Body)
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "benchmark"}
+
+    def upload_part(self, Body, PartNumber, **kwargs):
+        self._transfer(Body)
+        return {"ETag": str(PartNumber)}
+
+    def complete_multipart_upload(self, **kwargs):
+        pass
+
+    def abort_multipart_upload(self, **kwargs):
+        pass
+
+
+def create_variant(dimension: int) -> PILImage.Image:
+    noise = PILImage.frombytes("RGB", (dimension // 4,) * 2, os.urandom(3 * (dimension // 4) ** 2))
+    return noise.resize((dimension, dimension))
+
+
+def encode_png(img: PILImage.Image) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def encode_then_upload(client, img: PILImage.Image) -> float:
+    start = time.perf_counter()
+    client.put_object(Body=encode_png(img))
+    return time.perf_counter() - start
+
+
+def stream_upload(client, img: PILImage.Image, part_size: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    writer = MultipartUploadWriter(
+        client, "bucket", "key", "image/png", part_size=part_size, max_concurrency=concurrency
+    )
+    with writer:
+        img.save(cast(BinaryIO, writer), "PNG")
+    elapsed = time.perf_counter() - start
+    for part in writer.report.parts:
+        print(f"    part {part.part_number}: {part.size / MIB:.1f} MiB in {part.seconds:.3f}s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dimension", type=int, default=2160)
+    parser.add_argument("--mbps", type=float, default=100.0)
+    parser.add_argument("--part-size", type=int, default=MIN_PART_SIZE)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    client = SimulatedS3Client(args.mbps)
+    img = create_variant(args.dimension)
+
+    encode_start = time.perf_counter()
+    encoded_size = len(encode_png(img))
+    encode_seconds = time.perf_counter() - encode_start
+    upload_seconds = encoded_size * client.seconds_per_byte
+
+    print(f"{args.dimension}px PNG, {encoded_size / MIB:.1f} MiB at {args.mbps} Mbps")
+    print(f"  encode: {encode_seconds:.3f}s, upload: {upload_seconds:.3f}s")
+    print(f"  encode then upload: {encode_then_upload(client, img):.3f}s")
+    print("  streamed:")
+    streamed_seconds = stream_upload(client, img, args.part_size, args.concurrency)
+    print(f"  streamed total: {streamed_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
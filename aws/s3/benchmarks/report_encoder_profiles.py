@@ -0,0 +1,96 @@
+"""
+Run a corpus of images through the encoder profiles of every extension and size, and print
+the encode time and output bytes of each profile against Pillow's default settings.
+
+Usage (from the repository root):
+
+    python aws/s3/benchmarks/report_encoder_profiles.py --corpus path/to/images
+    python aws/s3/benchmarks/report_encoder_profiles.py --extensions jpeg
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "aws" / "s3" / "src" / "lambdas" / "image_processing_function"))
+
+from encoder_profiles import DEFAULT_PROFILE, get_encoder_profile  # noqa: E402
+from image_processor import ImageProcessor  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from PIL import ImageFilter  # noqa: E402
+from resampling import ResamplingPolicy  # noqa: E402
+
+from shared.media import Extension, Size  # noqa: E402
+
+
+def synthetic_corpus(count: int = 3):
+    """Smooth, photo-like images, used when no corpus is given."""
+    for index in range(count):
+        noise = PILImage.frombytes("L", (96, 64), os.urandom(96 * 64))
+        img = PILImage.merge(
+            "RGB", [noise, noise.rotate(180), noise.transpose(PILImage.Transpose(index % 2))]
+        )
+        yield f"synthetic-{index}", img.resize((3000, 2000)).filter(ImageFilter.SMOOTH_MORE)
+
+
+def load_corpus(corpus: Path):
+    for path in sorted(corpus.iterdir()):
+        try:
+            with PILImage.open(path) as img:
+                yield path.name, img.convert("RGB")
+        except (OSError, ValueError):
+            continue
+
+
+def encode(profile, img: PILImage.Image, extension: Extension):
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    profile.save(img, buffer, extension.value.upper())
+    return time.perf_counter() - start, buffer.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", type=Path, help="a directory of images")
+    parser.add_argument("--extensions", nargs="+", default=["jpeg", "png"])
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    extensions = [Extension(extension) for extension in args.extensions]
+    resampling = ResamplingPolicy()
+
+    # (extension, size) -> [default seconds, default bytes, profile seconds, profile bytes]
+    totals = defaultdict(lambda: [0.0, 0, 0.0, 0])
+    images = 0
+    for name, img in corpus:
+        images += 1
+        for size in Size:
+            variant = resampling.for_size(size).resize(img, ImageProcessor._get_dimensions(size))
+            for extension in extensions:
+                profile = get_encoder_profile(extension, size)
+                row = totals[extension, size]
+                for offset, encoder in ((0, DEFAULT_PROFILE), (2, profile)):
+                    seconds, size_bytes = encode(encoder, variant, extension)
+                    row[offset] += seconds
+                    row[offset + 1] += size_bytes
+
+    print(f"{images} images, totals per extension and size")
+    print(f"{'format':<7}{'size':<8}{'default':>18}{'profile':>18}{'bytes':>9}  profile options")
+    for (extension, size), (d_seconds, d_bytes, p_seconds, p_bytes) in totals.items():
+        saving = 100 * (1 - p_bytes / d_bytes) if d_bytes else 0.0
+        print(
+            f"{extension.value:<7}{size.name:<8}"
+            f"{d_bytes / 1024:>9.0f}KB {d_seconds * 1000:>5.0f}ms"
+            f"{p_bytes / 1024:>9.0f}KB {p_seconds * 1000:>5.0f}ms"
+            f"{-saving:>+8.1f}%  {get_encoder_profile(extension, size)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,46 @@
 import json
 import os
 
-import boto3
 from botocore.exceptions import NoCredentialsError
-from moviepy.editor import VideoFileClip, concatenate_videoclips
 
 from shared.media import Extension
+from shared.services.aws.client_provider import get_client
+from shared.services.scratch_space import ScratchSpace, sweep_scratch_space
 
-s3_client = boto3.client("s3")
-lambda_client = boto3.client("lambda")
+s3_client = get_client("s3")
+lambda_client = get_client("lambda")
 
 
 def lambda_handler(event, context):
+    # moviepy pulls in numpy and imageio, so it is only imported once there is a video to cut
+    from moviepy.editor import VideoFileClip, concatenate_videoclips
+
     key = event["key"]
     raw_media_bucket = event["bucket"]
 
-    local_file_path = "/tmp/" + key  # Lambda can write to the /tmp directory
-    output_path = "/tmp/output.gif"
-
-    # Download the file from S3 to the local filesystem
-    s3_client.download_file(raw_media_bucket, key, local_file_path)
-
-    clip = VideoFileClip(local_file_path)
-    duration = clip.duration
-    frame_times = list(range(0, int(duration), int(duration / 24)))  # 24 frames
-
-    clips = [clip.subclip(t, t + 1) for t in frame_times]
-    final_clip = concatenate_videoclips(clips)
-    final_clip.write_gif(output_path, fps=24)
-
-    # Upload the processed GIF file to S3
+    # Files of invocations that timed out are still in /tmp of a warm container
+    sweep_scratch_space()
     processed_media_bucket = os.getenv("PROCESSED_MEDIA_BUCKET")
-    try:
-        s3_client.upload_file(output_path, processed_media_bucket, key)
-    except NoCredentialsError:
-        return {"Error": "S3 Access Denied"}
+    with ScratchSpace() as scratch:
+        local_file_path = str(scratch.reserve(key))
+        output_path = str(scratch.reserve("output.gif"))
+
+        # Download the file from S3 to the local filesystem
+        s3_client.download_file(raw_media_bucket, key, local_file_path)
+
+        clip = VideoFileClip(local_file_path)
+        duration = clip.duration
+        frame_times = list(range(0, int(duration), int(duration / 24)))  # 24 frames
+
+        clips = [clip.subclip(t, t + 1) for t in frame_times]
+        final_clip = concatenate_videoclips(clips)
+        final_clip.write_gif(output_path, fps=24)
+
+        # Upload the processed GIF file to S3
+        try:
+            s3_client.upload_file(output_path, processed_media_bucket, key)
+        except NoCredentialsError:
+            return {"Error": "S3 Access Denied"}
 
     # Trigger the ImageProcessingFunction
     lambda_client.invoke(
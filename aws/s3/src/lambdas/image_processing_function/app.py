@@ -1,12 +1,16 @@
+import json
 import logging
 import os
+from functools import lru_cache
 from http import HTTPStatus
 
-import boto3
-from aws_image_service import AWSImageProcessingService
+from aws_image_service import AWSImageProcessingService, ImageJob, JobResult
 from exceptions import EnvironmentVariableNotFound, ValidationError
 
 from shared.media import Extension, Size
+from shared.services.aws.client_provider import get_client
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
+from shared.services.scratch_space import sweep_scratch_space
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -17,43 +21,194 @@ def validate_event(event):
     """
     Validate the event object for required keys
     :param event: dict
-    :return: Tuple[str, str, str, str, list]
+    :return: Tuple[str, str, str, list, list, Optional[ObjectMetadata]]
     """
     bucket = event.get("bucket")
     key = event.get("key")
     filename = event.get("filename")
-    extension = event.get("extension")
+    # Several extensions are generated from one decode; a single "extension" is still accepted
+    extensions = event.get("extensions") or [event.get("extension")]
     sizes = event.get("sizes")
 
-    ValidationError.check_required_fields(
-        event, ["bucket", "key", "filename", "extension", "sizes"]
-    )
-    ValidationError.check_value(extension, Extension._member_names_, "extension")
+    ValidationError.check_required_fields(event, ["bucket", "key", "filename", "sizes"])
+    ValidationError.check_subset(extensions, Extension._member_names_, "extensions")
     ValidationError.check_subset(sizes, Size._member_names_, "sizes")
     ValidationError.check_non_empty_list(sizes, "sizes")
 
-    return bucket, key, filename, Extension[extension], [Size[size] for size in sizes]
+    return (
+        bucket,
+        key,
+        filename,
+        [Extension[extension] for extension in extensions],
+        [Size[size] for size in sizes],
+        parse_metadata(event.get("metadata")),
+    )
+
+
+def parse_metadata(metadata):
+    """
+    Parse the optional object metadata captured by the dispatcher
+    :param metadata: dict or None
+    :return: Optional[ObjectMetadata]
+    """
+    if metadata is None:
+        return None
+
+    try:
+        return ObjectMetadata.from_payload(metadata)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValidationError(f"metadata is invalid: {e}")
+
+
+@lru_cache(maxsize=None)
+def get_service(processed_bucket):
+    """
+    Create the processing service once per execution environment so warm invocations reuse it,
+    along with the shared S3 client.
+    :param processed_bucket: str
+    :return: AWSImageProcessingService
+    """
+    return AWSImageProcessingService(get_client("s3"), processed_bucket)
+
+
+def handle_batch(jobs, processed_bucket):
+    """
+    Process a list of jobs, each shaped like a single job event, in one invocation. Invalid jobs
+    are reported without stopping the others.
+    :param jobs: list
+    :param processed_bucket: str
+    :return: dict with the status of the batch and the results of every job, in order
+    """
+    if not isinstance(jobs, list) or not jobs:
+        return {"statusCode": HTTPStatus.BAD_REQUEST, "body": "jobs must be a non-empty list"}
+
+    results = [None] * len(jobs)
+    valid = []
+    for index, job in enumerate(jobs):
+        try:
+            if not isinstance(job, dict):
+                raise ValidationError("every job must be an object")
+            valid.append((index, ImageJob(*validate_event(job))))
+        except ValidationError as e:
+            logger.error("Validation Error in job %s: %s", index, e)
+            filename = job.get("filename") if isinstance(job, dict) else None
+            results[index] = {
+                "filename": filename,
+                "statusCode": HTTPStatus.BAD_REQUEST,
+                "body": str(e),
+            }
+
+    service = get_service(processed_bucket)
+    job_results = service.process_batch([job for _, job in valid]) if valid else []
+    for (index, _), result in zip(valid, job_results):
+        results[index] = format_job_result(result)
+
+    succeeded = sum(result["statusCode"] == HTTPStatus.OK for result in results)
+    return {
+        "statusCode": HTTPStatus.OK if succeeded == len(jobs) else HTTPStatus.MULTI_STATUS,
+        "body": f"{succeeded} of {len(jobs)} jobs processed.",
+        "results": results,
+    }
+
+
+def format_job_result(result: JobResult):
+    """
+    Format the result of a job like the response of a single job invocation
+    :param result: JobResult
+    :return: dict
+    """
+    if result.succeeded:
+        return {"filename": result.filename, "statusCode": HTTPStatus.OK, "body": "Processed."}
+    return {
+        "filename": result.filename,
+        "statusCode": HTTPStatus.INTERNAL_SERVER_ERROR,
+        "body": result.error,
+    }
+
+
+def is_sqs_event(event):
+    """
+    Check whether the event is a batch of SQS messages
+    :param event: dict
+    :return: bool
+    """
+    records = event.get("Records") or []
+    return bool(records) and all(record.get("eventSource") == "aws:sqs" for record in records)
+
+
+def parse_message(record):
+    """
+    Parse the job carried by the body of an SQS message
+    :param record: dict
+    :return: ImageJob
+    """
+    try:
+        job = json.loads(record["body"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValidationError(f"message body is not a JSON job: {e}")
+    if not isinstance(job, dict):
+        raise ValidationError("message body must be a job object")
+    return ImageJob(*validate_event(job))
+
+
+def sqs_handler(event, context):
+    """
+    Process a batch of SQS messages, each carrying the payload of a single job, concurrently.
+    Only the messages of failed jobs are reported in batchItemFailures, so SQS retries those
+    alone. Invalid messages would fail again, so they are logged and not retried.
+    :param event: dict
+    :param context: LambdaContext
+    :return: dict
+    """
+    processed_bucket = os.getenv("PROCESSED_MEDIA_BUCKET", "media.bluecollarverse.com-processed")
+
+    message_ids = []
+    jobs = []
+    for record in event["Records"]:
+        try:
+            jobs.append(parse_message(record))
+            message_ids.append(record["messageId"])
+        except ValidationError as e:
+            logger.error("Dropping invalid message %s: %s", record.get("messageId"), e)
+
+    results = get_service(processed_bucket).process_batch(jobs) if jobs else []
+    failures = [
+        {"itemIdentifier": message_id}
+        for message_id, result in zip(message_ids, results)
+        if not result.succeeded
+    ]
+    logger.info(f"Processed {len(results) - len(failures)} of {len(event['Records'])} messages")
+    return {"batchItemFailures": failures}
 
 
 def lambda_handler(event, context):
     logger.info(event)
+    # Files of invocations that timed out are still in /tmp of a warm container
+    sweep_scratch_space()
 
     processed_bucket = os.getenv("PROCESSED_MEDIA_BUCKET", "media.bluecollarverse.com-processed")
     if processed_bucket is None:
         logger.error(EnvironmentVariableNotFound.ENV_ERROR_MSG.format("PROCESSED_MEDIA_BUCKET"))
         return {"statusCode": HTTPStatus.INTERNAL_SERVER_ERROR, "body": "Internal Server Error"}
 
+    # The function is also subscribed to the image processing queue
+    if is_sqs_event(event):
+        return sqs_handler(event, context)
+
+    # Bulk imports and backfills send many jobs per invocation
+    if "jobs" in event:
+        return handle_batch(event["jobs"], processed_bucket)
+
     try:
-        bucket, key, filename, extension, sizes = validate_event(event)
+        bucket, key, filename, extensions, sizes, metadata = validate_event(event)
     except ValidationError as e:
         logger.error("Validation Error: %s", e)
         return {"statusCode": HTTPStatus.BAD_REQUEST, "body": str(e)}
 
-    s3_client = boto3.client("s3")
-    service = AWSImageProcessingService(s3_client, processed_bucket)
+    service = get_service(processed_bucket)
 
     try:
-        service.process_image(bucket, key, filename, extension, sizes)
+        service.process_image(bucket, key, filename, extensions, sizes, metadata)
     except Exception as e:
         logger.error("Unexpected error: %s", e)
         return {"statusCode": HTTPStatus.INTERNAL_SERVER_ERROR, "body": "Internal Server Error"}
@@ -1,33 +1,107 @@
+import concurrent.futures
 import logging
-from typing import List
+from dataclasses import dataclass
+from typing import List, Optional
 
 from botocore.client import BaseClient
+from content_index import create_content_index
 from exceptions import ValidationError
+from executors import ExecutionBackend, create_executor
 from image_media import ImageMedia
 from image_service import ImageService
+from utils import get_env_int
 
 from shared.media import Extension, Size
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Jobs of a batch processed at the same time. Their resize and encode work shares one executor,
+# so this bounds the images held in memory rather than the CPU use.
+BATCH_MAX_CONCURRENCY = get_env_int("BATCH_MAX_CONCURRENCY", default=4)
+
+
+@dataclass(frozen=True)
+class ImageJob:
+    """One image to process, as validated from an event."""
+
+    bucket: str
+    key: str
+    filename: str
+    extensions: List[Extension]
+    sizes: List[Size]
+    metadata: Optional[ObjectMetadata] = None
+
+
+@dataclass(frozen=True)
+class JobResult:
+    """The outcome of a job of a batch."""
+
+    filename: str
+    succeeded: bool
+    error: Optional[str] = None
+
 
 class AWSImageProcessingService:
     def __init__(self, s3_client: BaseClient, processed_bucket: str):
         self.s3_client = s3_client
         self.processed_bucket = processed_bucket
-        self.image_service = ImageService(self.s3_client)
+        self.image_service = ImageService(self.s3_client, create_content_index(self.s3_client))
 
     def process_image(
-        self, bucket: str, key: str, filename: str, extension: Extension, sizes: List[Size]
-    ):
+        self,
+        bucket: str,
+        key: str,
+        filename: str,
+        extensions: List[Extension],
+        sizes: List[Size],
+        metadata: Optional[ObjectMetadata] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> bool:
         # Validate required fields, formats and sizes
-        required_fields = ["bucket", "key", "filename", "format", "sizes"]
+        required_fields = ["bucket", "key", "filename", "extensions", "sizes"]
         ValidationError.check_required_fields(locals(), required_fields)
-        ValidationError.check_value(extension, Extension, "extension")
+        ValidationError.check_subset(extensions, Extension, "extensions")
         ValidationError.check_subset(sizes, Size, "sizes")
 
         # Create image media object for further processing
-        image = ImageMedia(self.s3_client, bucket, key, filename)
+        image = ImageMedia(self.s3_client, bucket, key, filename, metadata)
+
+        return self.image_service.process_images(
+            image, self.processed_bucket, extensions, sizes, executor
+        )
+
+    def process_batch(
+        self, jobs: List[ImageJob], max_concurrency: int = BATCH_MAX_CONCURRENCY
+    ) -> List[JobResult]:
+        """
+        Process a batch of jobs, at most max_concurrency at a time, returning their results in
+        order. Every job resizes and encodes on one shared thread pool, so a batch never runs
+        more CPU bound tasks than a single job would.
+        """
+        with create_executor(ExecutionBackend.THREAD) as cpu_executor:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_concurrency, thread_name_prefix="job"
+            ) as job_executor:
+                futures = [
+                    job_executor.submit(self._process_job, job, cpu_executor) for job in jobs
+                ]
+                return [future.result() for future in futures]
 
-        self.image_service.process_images(image, self.processed_bucket, extension, sizes)
+    def _process_job(self, job: ImageJob, executor: concurrent.futures.Executor) -> JobResult:
+        try:
+            succeeded = self.process_image(
+                job.bucket,
+                job.key,
+                job.filename,
+                job.extensions,
+                job.sizes,
+                job.metadata,
+                executor,
+            )
+        except Exception as e:
+            logger.exception(f"Job of image: {job.filename} failed: {e}")
+            return JobResult(job.filename, succeeded=False, error=str(e))
+        error = None if succeeded else "Processing failed"
+        return JobResult(job.filename, succeeded=succeeded, error=error)
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, FrozenSet, Iterable, Optional
+
+from botocore.exceptions import ClientError
+from utils import TEMP_DIR, ImageSource, Variant
+
+from shared.media import Extension, Size
+
+logger = logging.getLogger(__name__)
+
+# Chunk size the SHA-256 of images spilled to disk is computed in
+HASH_CHUNK_SIZE = 1024 * 1024
+
+NO_SUCH_KEY = "NoSuchKey"
+
+
+class ContentIndexBackend(Enum):
+    """Where the index of processed content is kept."""
+
+    S3 = "s3"
+    SQLITE = "sqlite"
+    NONE = "none"
+
+
+CONTENT_INDEX_BACKEND = os.getenv("CONTENT_INDEX_BACKEND", ContentIndexBackend.S3.value)
+
+# Bucket of the S3 backend, which is off without one. It is private, unlike the processed
+# bucket served through the CDN, as the index maps content hashes to the keys of raw images.
+CONTENT_INDEX_BUCKET = os.getenv("CONTENT_INDEX_BUCKET")
+
+# Prefix of the index entries in the bucket, for the S3 backend
+CONTENT_INDEX_PREFIX = os.getenv("CONTENT_INDEX_PREFIX", "content-index/")
+
+# Database file of the SQLite backend, local to the execution environment
+CONTENT_INDEX_PATH = os.getenv("CONTENT_INDEX_PATH", str(TEMP_DIR / "content-index.sqlite3"))
+
+
+@dataclass(frozen=True)
+class ContentRecord:
+    """The filename content was processed under, and the variants processed for it."""
+
+    filename: str
+    variants: FrozenSet[Variant]
+
+    def covers(self, variants: Iterable[Variant]) -> bool:
+        return self.variants.issuperset(variants)
+
+    def to_json(self) -> str:
+        variants = sorted([size.name, extension.name] for size, extension in self.variants)
+        return json.dumps({"filename": self.filename, "variants": variants})
+
+    @classmethod
+    def from_json(cls, value: str) -> "ContentRecord":
+        record = json.loads(value)
+        return cls(
+            filename=record["filename"],
+            variants=frozenset(
+                (Size[size], Extension[extension]) for size, extension in record["variants"]
+            ),
+        )
+
+
+def content_key_from_etag(etag: str) -> Optional[str]:
+    """
+    Return the content key of an object from its ETag, which is the MD5 of the content for
+    objects uploaded in a single part. Multipart ETags depend on the part size, not only on the
+    content, so they give no key.
+    """
+    etag = etag.strip('"')
+    if not etag or "-" in etag:
+        return None
+    return f"md5:{etag}"
+
+
+def content_key_from_source(source: ImageSource) -> str:
+    """Return the content key of a downloaded image, from the SHA-256 of its bytes."""
+    digest = hashlib.sha256()
+    if isinstance(source, Path):
+        with source.open("rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        with source.getbuffer() as view:
+            digest.update(view)
+    return f"sha256:{digest.hexdigest()}"
+
+
+class ContentIndex(ABC):
+    """Maps the content key of raw images to the variants already processed from them."""
+
+    @abstractmethod
+    def get(self, content_key: str) -> Optional[ContentRecord]:
+        """Return the record of processed content, or None if it was never processed."""
+
+    @abstractmethod
+    def put(self, content_key: str, record: ContentRecord) -> None:
+        """Record the variants processed from content, replacing any previous record."""
+
+    @abstractmethod
+    def delete(self, content_key: str) -> None:
+        """Forget processed content, e.g. when its variants no longer exist."""
+
+
+class S3ContentIndex(ContentIndex):
+    """Keeps one small JSON object per processed content in a bucket, under a prefix."""
+
+    def __init__(self, s3_client: Any, bucket: str, prefix: str = CONTENT_INDEX_PREFIX):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def get(self, content_key: str) -> Optional[ContentRecord]:
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket, Key=self._key(content_key))
+        except ClientError as e:
+            if e.response["Error"]["Code"] == NO_SUCH_KEY:
+                return None
+            raise
+        return ContentRecord.from_json(response["Body"].read().decode())
+
+    def put(self, content_key: str, record: ContentRecord) -> None:
+        self.s3_client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(content_key),
+            Body=record.to_json().encode(),
+            ContentType="application/json",
+        )
+
+    def delete(self, content_key: str) -> None:
+        self.s3_client.delete_object(Bucket=self.bucket, Key=self._key(content_key))
+
+    def _key(self, content_key: str) -> str:
+        algorithm, _, digest = content_key.partition(":")
+        return f"{self.prefix}{algorithm}/{digest}.json"
+
+
+class SQLiteContentIndex(ContentIndex):
+    """
+    Keeps the index in a local SQLite database. It is only shared by the invocations of one
+    execution environment, so it stands in for the S3 index in tests and local runs.
+    """
+
+    def __init__(self, path: str = CONTENT_INDEX_PATH):
+        # Only the stand-in backend needs sqlite3, so it isn't imported by every cold start
+        import sqlite3
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS content_index "
+                "(content_key TEXT PRIMARY KEY, record TEXT NOT NULL)"
+            )
+
+    def get(self, content_key: str) -> Optional[ContentRecord]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT record FROM content_index WHERE content_key = ?", (content_key,)
+            ).fetchone()
+        return ContentRecord.from_json(row[0]) if row else None
+
+    def put(self, content_key: str, record: ContentRecord) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO content_index (content_key, record) VALUES (?, ?)",
+                (content_key, record.to_json()),
+            )
+
+    def delete(self, content_key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM content_index WHERE content_key = ?", (content_key,)
+            )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def create_content_index(
+    s3_client: Any,
+    bucket: Optional[str] = CONTENT_INDEX_BUCKET,
+    backend: str = CONTENT_INDEX_BACKEND,
+) -> Optional[ContentIndex]:
+    """Create the content index, or None when deduplication is off."""
+    index_backend = ContentIndexBackend(backend.strip().lower())
+    if index_backend is ContentIndexBackend.S3:
+        if not bucket:
+            logger.warning("No content index bucket is set, processed content isn't deduplicated")
+            return None
+        return S3ContentIndex(s3_client, bucket)
+    if index_backend is ContentIndexBackend.SQLITE:
+        return SQLiteContentIndex()
+    return None
@@ -0,0 +1,106 @@
+import logging
+from dataclasses import dataclass
+from enum import Enum
+from typing import List, Tuple
+
+from PIL import Image as PILImage
+from strip_reader import can_decode_strips
+from utils import get_env_flag
+
+from shared.media import AspectRatio, Size
+from shared.media.constants import IMAGE_DIMENSIONS
+
+logger = logging.getLogger(__name__)
+
+REDUCED_DECODE_ENABLED = get_env_flag("REDUCED_DECODE_ENABLED", default=True)
+
+# Scale denominators supported by libjpeg DCT scaling, largest first.
+DECODE_SCALES = (8, 4, 2)
+
+# Same idea as `reducing_gap` in PIL's Image.thumbnail: the reduced image must stay at least this
+# many times larger than the largest target, so the final resample keeps its quality.
+REDUCING_GAP = 2.0
+
+# Modes supported by Image.reduce() for formats without DCT scaling.
+REDUCIBLE_MODES = {"L", "LA", "RGB", "RGBA", "CMYK", "I", "F"}
+
+
+class DecodeMethod(Enum):
+    """Ways of decoding a source image."""
+
+    FULL = "full"
+    DRAFT = "draft"
+    REDUCE = "reduce"
+    # Rows decoded a strip at a time, never holding the whole image
+    STRIPS = "strips"
+
+
+@dataclass(frozen=True)
+class DecodePlan:
+    method: DecodeMethod
+    scale: int
+    source_size: Tuple[int, int]
+    decoded_size: Tuple[int, int]
+
+    def __str__(self):
+        return f"{self.method.value} 1/{self.scale} {self.source_size} -> {self.decoded_size}"
+
+
+class DecodePlanner:
+    """
+    Plans how to decode a source image given the sizes it will be resized to. When every target
+    is much smaller than the source, JPEGs are decoded at 1/2, 1/4 or 1/8 scale through libjpeg
+    DCT scaling (Image.draft) and other formats are reduced right after decoding (Image.reduce).
+    """
+
+    def __init__(self, enabled: bool = REDUCED_DECODE_ENABLED, reducing_gap: float = REDUCING_GAP):
+        self.enabled = enabled
+        self.reducing_gap = reducing_gap
+
+    def plan(self, img: PILImage.Image, sizes: List[Size], strips: bool = False) -> DecodePlan:
+        """
+        Choose a decode scale using the image header only, before any pixels are decoded. With
+        strips, images whose rows can be decoded a strip at a time are planned so.
+        """
+        if strips and can_decode_strips(img):
+            return DecodePlan(DecodeMethod.STRIPS, 1, img.size, img.size)
+
+        method = self._get_method(img)
+        scale = self._get_scale(img.size, sizes) if method != DecodeMethod.FULL else 1
+        if scale == 1:
+            method = DecodeMethod.FULL
+
+        decoded_size = (-(-img.width // scale), -(-img.height // scale))
+        return DecodePlan(method, scale, img.size, decoded_size)
+
+    def decode(self, img: PILImage.Image, plan: DecodePlan) -> PILImage.Image:
+        """Decode the image following the plan and return the decoded image."""
+        if plan.method == DecodeMethod.DRAFT:
+            img.draft(img.mode, (img.width // plan.scale, img.height // plan.scale))
+
+        img.load()
+
+        if plan.method == DecodeMethod.REDUCE:
+            return img.reduce(plan.scale)
+        return img
+
+    def _get_method(self, img: PILImage.Image) -> DecodeMethod:
+        if not self.enabled or getattr(img, "is_animated", False):
+            return DecodeMethod.FULL
+        if img.format == "JPEG":
+            return DecodeMethod.DRAFT
+        if img.mode in REDUCIBLE_MODES:
+            return DecodeMethod.REDUCE
+        return DecodeMethod.FULL
+
+    def _get_scale(self, source_size: Tuple[int, int], sizes: List[Size]) -> int:
+        """Return the largest scale keeping the source above every target times reducing_gap."""
+        dimensions = [IMAGE_DIMENSIONS[AspectRatio.AR_1_BY_1][size] for size in sizes]
+        min_width = max(dimension.width for dimension in dimensions) * self.reducing_gap
+        min_height = max(dimension.height for dimension in dimensions) * self.reducing_gap
+
+        source_width, source_height = source_size
+        for scale in DECODE_SCALES:
+            if source_width // scale >= min_width and source_height // scale >= min_height:
+                return scale
+        return 1
@@ -46,3 +46,9 @@ class EnvironmentVariableNotFound(Exception):
 
     def __init__(self, variable):
         super().__init__(self.ENV_ERROR_MSG.format(variable))
+
+
+class ImageTooLargeError(Exception):
+    """Raised when an image would take more memory or pixels to process than allowed."""
+
+    pass
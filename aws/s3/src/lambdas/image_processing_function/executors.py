@@ -0,0 +1,193 @@
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import os
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple, cast
+
+from encoder_profiles import EncoderProfile
+from image_backends import ImageBackend
+from PIL import Image as PILImage
+from resampling import ResamplingProfile
+from utils import get_env_int
+
+from shared.media import Extension
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutionBackend(Enum):
+    """Backends used to run the resize and encode work of an image job."""
+
+    INLINE = "inline"
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+def available_cpus() -> int:
+    """Return the number of CPUs this process is allowed to run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# "auto" picks the backend per job from its pixel count, otherwise one of ExecutionBackend values
+EXECUTION_BACKEND = os.getenv("EXECUTION_BACKEND", "auto")
+MAX_WORKERS = get_env_int("MAX_WORKERS", default=available_cpus())
+
+# Jobs below INLINE_MAX_PIXELS are cheaper to run inline than to hand over to a pool, and jobs
+# from PROCESS_MIN_PIXELS upwards are worth spreading over processes when several CPUs exist.
+INLINE_MAX_PIXELS = get_env_int("INLINE_MAX_PIXELS", default=1_000_000)
+PROCESS_MIN_PIXELS = get_env_int("PROCESS_MIN_PIXELS", default=12_000_000)
+
+# Modes Image.frombuffer() can map without copying. RGB is shared as RGBX, which is also how
+# Pillow lays out RGB pixels internally.
+ZERO_COPY_MODES = {"L", "RGBX", "RGBA", "CMYK", "I", "F"}
+
+
+class InlineExecutor(concurrent.futures.Executor):
+    """Executor running every task in the calling thread as soon as it is submitted."""
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+@lru_cache(maxsize=None)
+def process_pool_supported() -> bool:
+    """
+    Check whether process pools and shared memory work here. AWS Lambda provides no /dev/shm, so
+    both semaphores and shared memory blocks fail to be created there.
+    """
+    try:
+        multiprocessing.Lock()
+        block = shared_memory.SharedMemory(create=True, size=1)
+        block.close()
+        block.unlink()
+        return True
+    except OSError as e:
+        logger.warning(f"Process pool backend is not supported: {e}")
+        return False
+
+
+def select_backend(
+    pixel_count: int,
+    requested: str = EXECUTION_BACKEND,
+    cpus: Optional[int] = None,
+) -> ExecutionBackend:
+    """Select the execution backend for a job with the given decoded pixel count."""
+    cpus = cpus or available_cpus()
+
+    if requested != "auto":
+        backend = ExecutionBackend(requested)
+    elif pixel_count < INLINE_MAX_PIXELS:
+        backend = ExecutionBackend.INLINE
+    elif pixel_count >= PROCESS_MIN_PIXELS and cpus > 1:
+        backend = ExecutionBackend.PROCESS
+    else:
+        backend = ExecutionBackend.THREAD
+
+    if backend == ExecutionBackend.PROCESS and not process_pool_supported():
+        backend = ExecutionBackend.THREAD
+
+    logger.info(f"Selected {backend.value} backend for {pixel_count} pixels on {cpus} CPUs")
+    return backend
+
+
+def create_executor(
+    backend: ExecutionBackend, max_workers: int = MAX_WORKERS
+) -> concurrent.futures.Executor:
+    """Create the executor running the CPU bound work of a job for a backend."""
+    if backend == ExecutionBackend.INLINE:
+        return InlineExecutor()
+    if backend == ExecutionBackend.PROCESS:
+        return concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+
+@dataclass(frozen=True)
+class SharedImageHandle:
+    """Picklable reference to decoded pixels placed in shared memory."""
+
+    name: str
+    mode: str
+    size: Tuple[int, int]
+
+
+class SharedImage:
+    """
+    Decoded pixels copied once into a shared memory block, so process pool workers can map them
+    instead of receiving a pickled copy of the image.
+    """
+
+    def __init__(self, img: PILImage.Image):
+        if img.mode == "RGB":
+            img = img.convert("RGBX")
+        elif img.mode not in ZERO_COPY_MODES:
+            img = img.convert("RGBA")
+
+        data = img.tobytes()
+        self._block = shared_memory.SharedMemory(create=True, size=len(data))
+        _get_buffer(self._block)[: len(data)] = data
+        self.handle = SharedImageHandle(self._block.name, img.mode, img.size)
+
+    def close(self) -> None:
+        self._block.close()
+        self._block.unlink()
+
+    def __enter__(self) -> "SharedImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def resize_and_encode_shared(
+    handle: SharedImageHandle,
+    dimensions: Tuple[int, int],
+    resampling: ResamplingProfile,
+    encoders: List[Tuple[Extension, EncoderProfile]],
+    backend: Optional[ImageBackend] = None,
+) -> Dict[Extension, bytes]:
+    """
+    Process pool task: resize the shared source image once and return the variant encoded in
+    every requested format, with the given image backend or Pillow.
+    """
+    backend = backend or ImageBackend()
+    block = shared_memory.SharedMemory(name=handle.name)
+    try:
+        variant = backend.resize(_open_shared(handle, block), dimensions, resampling)
+    finally:
+        block.close()
+
+    if variant.mode == "RGBX":
+        variant = variant.convert("RGB")
+
+    encoded = {}
+    for extension, encoder in encoders:
+        buffer = io.BytesIO()
+        backend.encode(variant, buffer, extension.value.upper(), encoder)
+        encoded[extension] = buffer.getvalue()
+    return encoded
+
+
+def _open_shared(handle: SharedImageHandle, block: shared_memory.SharedMemory) -> PILImage.Image:
+    """Map the shared pixels as a read-only image, without copying them."""
+    # Pillow maps any buffer, though its annotations only name bytes, which would be a copy
+    buffer = cast(bytes, _get_buffer(block))
+    return PILImage.frombuffer(handle.mode, handle.size, buffer, "raw", handle.mode, 0, 1)
+
+
+def _get_buffer(block: shared_memory.SharedMemory) -> memoryview:
+    """Return the memory of a block just created or attached, only None once it is closed."""
+    buffer = block.buf
+    assert buffer is not None, f"Shared memory block {block.name} is closed"
+    return buffer
@@ -0,0 +1,128 @@
+import io
+import logging
+import struct
+from typing import Optional, Tuple
+
+from PIL import Image as PILImage
+from utils import get_env_flag
+
+from shared.media.image_header import read_image_header
+
+logger = logging.getLogger(__name__)
+
+# Upload previews of the smallest variants of JPEGs from the thumbnail embedded in their EXIF
+# data, when it is large enough, before the whole image is downloaded and decoded. Off by
+# default, as cameras may leave the thumbnail stale or without the orientation applied.
+EXIF_THUMBNAIL_ENABLED = get_env_flag("EXIF_THUMBNAIL_ENABLED", default=False)
+
+# How far the aspect ratio of a thumbnail may be from the image's. Cameras whose sensor has
+# another aspect ratio than their 160x120 thumbnails pad them with black bars, which this rejects.
+ASPECT_RATIO_TOLERANCE = 0.02
+
+EXIF_HEADER = b"Exif\x00\x00"
+APP1_MARKER = 0xE1
+# Start of scan, the image data follows and no more metadata segments
+SOS_MARKER = 0xDA
+
+# Tags of IFD1, the directory describing the thumbnail
+COMPRESSION_TAG = 0x0103
+THUMBNAIL_OFFSET_TAG = 0x0201
+THUMBNAIL_LENGTH_TAG = 0x0202
+JPEG_COMPRESSION = 6
+
+
+def find_exif_thumbnail(data: bytes) -> Optional[bytes]:
+    """
+    Return the JPEG thumbnail embedded in the EXIF segment of a JPEG, from its first bytes, or
+    None when it has none or the thumbnail doesn't fit in data.
+    """
+    tiff = _find_exif_segment(data)
+    if tiff is None:
+        return None
+    try:
+        return _read_thumbnail(tiff)
+    except (struct.error, IndexError):
+        return None
+
+
+def open_exif_thumbnail(data: bytes, dimensions: Tuple[int, int]) -> Optional[PILImage.Image]:
+    """
+    Decode the EXIF thumbnail of a JPEG from its first bytes, when it can stand in for the image
+    to resize it to the dimensions: it covers them without upscaling, has the aspect ratio of
+    the image, so it is neither padded nor rotated against it, and the mode of the image.
+    Neither the image nor its thumbnail is rotated by its EXIF orientation, so they match.
+    """
+    header = read_image_header(data)
+    thumbnail_data = find_exif_thumbnail(data)
+    if header is None or thumbnail_data is None:
+        return None
+
+    thumbnail = PILImage.open(io.BytesIO(thumbnail_data))
+    thumbnail.load()
+    width, height = thumbnail.size
+    if width < dimensions[0] or height < dimensions[1]:
+        logger.info(f"EXIF thumbnail {width}x{height} is smaller than {dimensions}")
+        return None
+    if abs(width * header.height / (height * header.width) - 1) > ASPECT_RATIO_TOLERANCE:
+        logger.info(
+            f"EXIF thumbnail {width}x{height} doesn't match the image "
+            f"{header.width}x{header.height}"
+        )
+        return None
+    if thumbnail.mode != header.mode:
+        logger.info(f"EXIF thumbnail mode {thumbnail.mode} differs from the image {header.mode}")
+        return None
+    return thumbnail
+
+
+def _find_exif_segment(data: bytes) -> Optional[bytes]:
+    """Return the TIFF structure of the EXIF segment, which follows the start of image."""
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == SOS_MARKER:
+            return None
+        end = offset + 2 + struct.unpack_from(">H", data, offset + 2)[0]
+        if marker == APP1_MARKER and data.startswith(EXIF_HEADER, offset + 4):
+            tiff = offset + 4 + len(EXIF_HEADER)
+            return data[tiff:end]
+        offset = end
+    return None
+
+
+def _read_thumbnail(tiff: bytes) -> Optional[bytes]:
+    """Follow IFD0 to IFD1 and slice the thumbnail it points to out of the TIFF structure."""
+    byte_order = {b"II": "<", b"MM": ">"}.get(tiff[:2])
+    if byte_order is None:
+        return None
+    ifd0 = struct.unpack_from(f"{byte_order}I", tiff, 4)[0]
+    entries = struct.unpack_from(f"{byte_order}H", tiff, ifd0)[0]
+    ifd1 = struct.unpack_from(f"{byte_order}I", tiff, ifd0 + 2 + entries * 12)[0]
+    if not ifd1:
+        return None
+
+    tags = {}
+    for index in range(struct.unpack_from(f"{byte_order}H", tiff, ifd1)[0]):
+        entry = ifd1 + 2 + index * 12
+        tag, field_type = struct.unpack_from(f"{byte_order}HH", tiff, entry)
+        # Values of one SHORT or LONG are stored in the entry itself
+        value_format = "H" if field_type == 3 else "I"
+        tags[tag] = struct.unpack_from(f"{byte_order}{value_format}", tiff, entry + 8)[0]
+    if tags.get(COMPRESSION_TAG, JPEG_COMPRESSION) != JPEG_COMPRESSION:
+        return None
+
+    start, length = tags.get(THUMBNAIL_OFFSET_TAG), tags.get(THUMBNAIL_LENGTH_TAG)
+    if start is None or not length:
+        return None
+    end = start + length
+    thumbnail = tiff[start:end]
+    if len(thumbnail) < length or not thumbnail.startswith(b"\xff\xd8"):
+        return None
+    return thumbnail
@@ -0,0 +1,133 @@
+import struct
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from PIL import GifImagePlugin
+from PIL import Image as PILImage
+from PIL import ImageChops, ImageSequence
+
+# Frames sampled across the animation to build its global palette
+PALETTE_SAMPLE_FRAMES = 8
+PALETTE_SAMPLE_SIZE = (64, 64)
+
+# The palette holds 255 colors, the last index is reserved for transparent pixels
+PALETTE_COLORS = 255
+TRANSPARENT_INDEX = 255
+ALPHA_THRESHOLD = 128
+
+DEFAULT_DURATION = 100
+
+# GIF disposal methods: keep the frame in place, or clear it to the background
+DISPOSAL_NONE = 1
+DISPOSAL_BACKGROUND = 2
+
+
+def has_transparency(img: PILImage.Image) -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+
+
+def iter_frames(img: PILImage.Image) -> Iterator[Tuple[PILImage.Image, int]]:
+    """
+    Yield every frame of an animation with its duration in milliseconds. Pillow decodes one
+    frame at a time and composites it onto the canvas, so each frame is the full picture.
+    """
+    mode = "RGBA" if has_transparency(img) else "RGB"
+    for frame in ImageSequence.Iterator(img):
+        yield frame.convert(mode), frame.info.get("duration", DEFAULT_DURATION)
+
+
+def build_global_palette(img: PILImage.Image, sample_frames: int = PALETTE_SAMPLE_FRAMES):
+    """
+    Build a single palette for every frame and size of an animation, from thumbnails of frames
+    sampled evenly across it. Only the sampled frames are decoded at this point.
+    """
+    n_frames = getattr(img, "n_frames", 1)
+    indexes = sorted({i * n_frames // sample_frames for i in range(min(sample_frames, n_frames))})
+
+    width, height = PALETTE_SAMPLE_SIZE
+    mosaic = PILImage.new("RGB", (width * len(indexes), height))
+    for position, index in enumerate(indexes):
+        img.seek(index)
+        mosaic.paste(img.convert("RGB").resize(PALETTE_SAMPLE_SIZE), (position * width, 0))
+    img.seek(0)
+
+    return mosaic.quantize(colors=PALETTE_COLORS, method=PILImage.Quantize.MEDIANCUT)
+
+
+class GifStreamWriter:
+    """
+    Writes an animated GIF frame by frame into a file object, so only the current and previous
+    frames are held in memory. Every frame is mapped onto the same global palette. Opaque
+    frames are cropped to the region that changed since the previous frame.
+    """
+
+    def __init__(
+        self,
+        fp: BinaryIO,
+        size: Tuple[int, int],
+        palette: PILImage.Image,
+        transparency: bool = False,
+        loop: int = 0,
+    ):
+        self.fp = fp
+        self.size = size
+        self.palette = self._as_palette(palette)
+        self.transparency = transparency
+        self.frames = 0
+        self._previous: Optional[PILImage.Image] = None
+        self._write_header(loop)
+
+    def write_frame(self, frame: PILImage.Image, duration: int) -> None:
+        """Quantize a frame (RGB or RGBA, at the size of the GIF) and append it."""
+        indexed = frame.convert("RGB").quantize(palette=self.palette, dither=PILImage.Dither.NONE)
+
+        params = {"duration": duration}
+        offset = (0, 0)
+        if self.transparency:
+            # Frames are full pictures, so clear each one before drawing the next
+            mask = frame.getchannel("A").point(lambda alpha: 255 if alpha < ALPHA_THRESHOLD else 0)
+            indexed.paste(TRANSPARENT_INDEX, mask=mask)
+            params.update(transparency=TRANSPARENT_INDEX, disposal=DISPOSAL_BACKGROUND)
+            region = indexed
+        else:
+            params.update(disposal=DISPOSAL_NONE)
+            region, offset = self._crop_to_changes(indexed)
+
+        for chunk in GifImagePlugin.getdata(region, offset, **params):
+            self.fp.write(chunk)
+
+        self._previous = indexed
+        self.frames += 1
+
+    def close(self) -> None:
+        self.fp.write(b";")
+        self._previous = None
+
+    def _crop_to_changes(self, indexed: PILImage.Image) -> Tuple[PILImage.Image, Tuple[int, int]]:
+        if self._previous is None:
+            return indexed, (0, 0)
+
+        # Unchanged frames still need a (one pixel) image to carry their duration
+        bbox = ImageChops.difference(self._previous, indexed).getbbox() or (0, 0, 1, 1)
+        return indexed.crop(bbox), (bbox[0], bbox[1])
+
+    @staticmethod
+    def _as_palette(palette: PILImage.Image) -> PILImage.Image:
+        """
+        Return the palette image as is, or its colours quantized when it has no palette, such
+        as P images whose palette was dropped and images of any other mode.
+        """
+        if palette.mode == "P" and palette.palette is not None and palette.getpalette():
+            return palette
+        return palette.convert("RGB").quantize(
+            colors=PALETTE_COLORS, method=PILImage.Quantize.MEDIANCUT
+        )
+
+    def _write_header(self, loop: int) -> None:
+        colors = (self.palette.getpalette() or [])[: PALETTE_COLORS * 3]
+        palette_bytes = bytes(colors).ljust(256 * 3, b"\0")
+
+        width, height = self.size
+        self.fp.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0xF7, 0, 0))
+        self.fp.write(palette_bytes)
+        # NETSCAPE2.0 application extension, for the loop count
+        self.fp.write(b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\0")
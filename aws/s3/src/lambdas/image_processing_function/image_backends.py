@@ -0,0 +1,300 @@
+import io
+import logging
+import os
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+
+from decode_planner import DecodeMethod, DecodePlan, DecodePlanner
+from encoder_profiles import EncoderProfile
+from PIL import Image as PILImage
+from resampling import Resampling, ResamplingProfile
+from utils import ImageSource
+
+from shared.media import Size
+from shared.media.image_header import ImageHeader
+
+logger = logging.getLogger(__name__)
+
+
+class ImageBackendType(Enum):
+    """Engines an image job can decode, resize and encode its images with."""
+
+    PILLOW = "pillow"
+    VIPS = "vips"
+    NUMPY = "numpy"
+
+
+# One of ImageBackendType values, backends whose dependency is missing fall back to Pillow
+IMAGE_BACKEND = os.getenv("IMAGE_BACKEND", ImageBackendType.PILLOW.value)
+
+# Modes pyvips and NumPy take as plain 8 bit bands, anything else is left to Pillow
+BAND_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+ALPHA_MODES = {"LA", "RGBA"}
+
+# libvips kernels of the Pillow filters it has, Box and Hamming are left to Pillow
+VIPS_KERNELS = {
+    Resampling.NEAREST: "nearest",
+    Resampling.BILINEAR: "linear",
+    Resampling.BICUBIC: "cubic",
+    Resampling.LANCZOS: "lanczos3",
+}
+
+# Formats libvips decodes the first frame of, animations and others are decoded by Pillow
+VIPS_FORMATS = {"JPEG", "PNG", "WEBP"}
+
+
+class ImageBackend:
+    """
+    Decodes, resizes and encodes the images of a job. Images travel between the steps of the
+    pipeline as Pillow images whatever the backend, so GIF animations, strips and process pools
+    work with every backend. This one does everything with Pillow, the others replace the steps
+    they are faster at and leave the rest to it.
+    """
+
+    type = ImageBackendType.PILLOW
+
+    def metadata(self, source: ImageSource) -> ImageHeader:
+        """Read the size, mode and frame count of the source, without decoding any pixels."""
+        with PILImage.open(source) as img:
+            header = ImageHeader(img.width, img.height, img.mode, getattr(img, "n_frames", 1))
+        _rewind(source)
+        return header
+
+    def decode(
+        self, source: ImageSource, sizes: List[Size], planner: DecodePlanner
+    ) -> Tuple[PILImage.Image, DecodePlan]:
+        """Decode the source at the scale the planner chooses for the sizes."""
+        img = PILImage.open(source)
+        plan = planner.plan(img, sizes)
+        return planner.decode(img, plan), plan
+
+    def resize(
+        self, img: PILImage.Image, dimensions: Tuple[int, int], profile: ResamplingProfile
+    ) -> PILImage.Image:
+        return profile.resize(img, dimensions)
+
+    def resize_ladder(
+        self, img: PILImage.Image, targets: List[Tuple[Tuple[int, int], ResamplingProfile]]
+    ) -> Optional[Iterator[PILImage.Image]]:
+        """
+        Return the variants of the image for every target, largest first, when the backend
+        resizes a whole ladder at once, or None to have each resized on its own.
+        """
+        return None
+
+    def encode(
+        self,
+        img: PILImage.Image,
+        destination: Union[Path, BinaryIO],
+        image_format: str,
+        encoder: EncoderProfile,
+    ) -> None:
+        encoder.save(img, destination, image_format)
+
+    def __str__(self):
+        return self.type.value
+
+
+class VipsBackend(ImageBackend):
+    """
+    Decodes stills with libvips, reading the file sequentially and shrinking JPEGs on load, and
+    resizes with its kernels, which take far less memory and time than Pillow on large images.
+    Encoding stays with Pillow so encoder profiles apply unchanged. Requires pyvips and libvips.
+    """
+
+    type = ImageBackendType.VIPS
+
+    def metadata(self, source: ImageSource) -> ImageHeader:
+        image = self._open(source)
+        frames = image.get("n-pages") if image.get_typeof("n-pages") else 1
+        return ImageHeader(image.width, image.height, _vips_mode(image), frames)
+
+    def decode(
+        self, source: ImageSource, sizes: List[Size], planner: DecodePlanner
+    ) -> Tuple[PILImage.Image, DecodePlan]:
+        with PILImage.open(source) as img:
+            plan = planner.plan(img, sizes)
+            image_format = img.format
+            animated = getattr(img, "is_animated", False)
+        _rewind(source)
+        if animated or image_format not in VIPS_FORMATS:
+            return super().decode(source, sizes, planner)
+
+        # The planner's DCT scaling, done by libjpeg on load
+        options = {"shrink": plan.scale} if plan.method is DecodeMethod.DRAFT else {}
+        image = self._open(source, access="sequential", **options)
+        if plan.method is DecodeMethod.REDUCE:
+            image = image.shrink(plan.scale, plan.scale)
+        return _vips_to_pil(image), plan
+
+    def resize(
+        self, img: PILImage.Image, dimensions: Tuple[int, int], profile: ResamplingProfile
+    ) -> PILImage.Image:
+        profile = profile.for_source(img.size, dimensions)
+        kernel = VIPS_KERNELS.get(profile.filter)
+        if kernel is None or img.mode not in BAND_MODES.values():
+            return super().resize(img, dimensions, profile)
+
+        pyvips = _import_pyvips()
+        image = pyvips.Image.new_from_memory(
+            img.tobytes(), img.width, img.height, len(img.getbands()), "uchar"
+        )
+        # Like Pillow, resample colours weighted by their alpha so transparent pixels don't bleed
+        if img.mode in ALPHA_MODES:
+            image = image.premultiply()
+        options = {"kernel": kernel, "vscale": dimensions[1] / img.height}
+        if profile.reducing_gap is not None:
+            options["gap"] = profile.reducing_gap
+        image = image.resize(dimensions[0] / img.width, **options)
+        if img.mode in ALPHA_MODES:
+            image = image.unpremultiply()
+        return _vips_to_pil(image)
+
+    @staticmethod
+    def _open(source: ImageSource, **options):
+        """Open the source with libvips, which reads its header only until pixels are needed."""
+        pyvips = _import_pyvips()
+        if isinstance(source, io.BytesIO):
+            return pyvips.Image.new_from_buffer(source.getvalue(), "", **options)
+        return pyvips.Image.new_from_file(str(source), **options)
+
+
+class NumpyBackend(ImageBackend):
+    """
+    Resizes reductions by integer factors, which the ladder sizes mostly are on square sources,
+    with a box average of the pixel blocks computed by NumPy, whatever the filter of the size.
+    Whole ladders are resized from a pyramid of 2x2 averages instead. Other resizes, modes and
+    every decode and encode are left to Pillow. Requires numpy.
+    """
+
+    type = ImageBackendType.NUMPY
+
+    def resize(
+        self, img: PILImage.Image, dimensions: Tuple[int, int], profile: ResamplingProfile
+    ) -> PILImage.Image:
+        factors = get_integer_factors(img.size, dimensions)
+        if factors is None or img.mode not in BAND_MODES.values():
+            return super().resize(img, dimensions, profile)
+        return block_average(img, factors)
+
+    def resize_ladder(
+        self, img: PILImage.Image, targets: List[Tuple[Tuple[int, int], ResamplingProfile]]
+    ) -> Optional[Iterator[PILImage.Image]]:
+        """Resize the whole ladder from one pyramid of 2x2 block averages."""
+        from numpy_ladder import LADDER_MODES, iter_ladder
+
+        if img.mode not in LADDER_MODES:
+            return None
+        return iter_ladder(img, targets)
+
+
+IMAGE_BACKENDS = {
+    ImageBackendType.PILLOW: ImageBackend,
+    ImageBackendType.VIPS: VipsBackend,
+    ImageBackendType.NUMPY: NumpyBackend,
+}
+
+# Modules each backend needs on top of Pillow
+BACKEND_MODULES = {ImageBackendType.VIPS: "pyvips", ImageBackendType.NUMPY: "numpy"}
+
+
+@lru_cache(maxsize=None)
+def backend_supported(backend: ImageBackendType) -> bool:
+    """Check whether the modules a backend needs can be imported here."""
+    module = BACKEND_MODULES.get(backend)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except (ImportError, OSError) as e:
+        # pyvips raises OSError when libvips itself is missing
+        logger.warning(f"Image backend {backend.value} is not supported: {e}")
+        return False
+
+
+def create_image_backend(requested: str = IMAGE_BACKEND) -> ImageBackend:
+    """Create the image backend requested, or the Pillow one when it isn't supported here."""
+    backend = ImageBackendType(requested.strip().lower())
+    if not backend_supported(backend):
+        backend = ImageBackendType.PILLOW
+    return IMAGE_BACKENDS[backend]()
+
+
+def get_integer_factors(
+    source_size: Tuple[int, int], dimensions: Tuple[int, int]
+) -> Optional[Tuple[int, int]]:
+    """Return the factors a source reduces to the dimensions by, when both are integers."""
+    (source_width, source_height), (width, height) = source_size, dimensions
+    if source_width % width or source_height % height:
+        return None
+    factors = (source_width // width, source_height // height)
+    return factors if factors != (1, 1) else None
+
+
+def block_average(img: PILImage.Image, factors: Tuple[int, int]) -> PILImage.Image:
+    """
+    Average every factor_x x factor_y block of pixels of an 8 bit image, rounding half up.
+    Colours of images with alpha are weighted by it, as Pillow resamples them.
+    """
+    import numpy as np
+
+    factor_x, factor_y = factors
+    count = factor_x * factor_y
+    bands = len(img.getbands())
+    pixels = np.asarray(img).reshape(img.height, img.width, bands)
+    # Sums of colours weighted by alpha reach 255 * 255 per pixel
+    dtype = np.uint32 if count * 255 * 255 < 2**32 else np.uint64
+
+    def block_sums(values):
+        # Adding strided slices runs over contiguous memory, which is several times faster
+        # than summing the axes of a reshaped array
+        rows = values[0::factor_y].astype(dtype)
+        for offset in range(1, factor_y):
+            rows += values[offset::factor_y]
+        sums = rows[:, 0::factor_x].copy()
+        for offset in range(1, factor_x):
+            sums += rows[:, offset::factor_x]
+        return sums
+
+    if img.mode in ALPHA_MODES:
+        alpha = pixels[..., -1:]
+        alpha_sums = block_sums(alpha)
+        colour_sums = block_sums(pixels[..., :-1] * alpha.astype(dtype))
+        colours = (colour_sums + alpha_sums // 2) // np.maximum(alpha_sums, 1)
+        averaged = np.concatenate([colours, (alpha_sums + count // 2) // count], axis=-1)
+    else:
+        averaged = (block_sums(pixels) + count // 2) // count
+
+    averaged = averaged.astype(np.uint8)
+    return PILImage.fromarray(averaged[..., 0] if bands == 1 else averaged)
+
+
+def _rewind(source: ImageSource) -> None:
+    if isinstance(source, io.BytesIO):
+        source.seek(0)
+
+
+def _import_pyvips():
+    # pyvips loads libvips on import, so it is only imported by jobs using the backend
+    import pyvips
+
+    return pyvips
+
+
+def _vips_mode(image) -> str:
+    return BAND_MODES.get(image.bands, "RGB")
+
+
+def _vips_to_pil(image) -> PILImage.Image:
+    """Hand an image over from libvips to Pillow as 8 bit sRGB or greyscale bands."""
+    if image.interpretation not in ("srgb", "b-w") or image.bands not in BAND_MODES:
+        image = image.colourspace("srgb")
+    if image.format != "uchar":
+        image = image.cast("uchar")
+    mode = BAND_MODES[image.bands]
+    return PILImage.frombuffer(
+        mode, (image.width, image.height), image.write_to_memory(), "raw", mode, 0, 1
+    )
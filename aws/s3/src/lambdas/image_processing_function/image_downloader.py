@@ -1,11 +1,22 @@
+import io
 import logging
+import mmap
 from pathlib import Path
+from typing import Optional
 
 from botocore.client import BaseClient
-from botocore.exceptions import BotoCoreError
+from botocore.exceptions import BotoCoreError, ClientError
 from image_media import ImageMedia
 from s3_utils import download_file_from_s3
-from utils import create_temp_path
+from utils import (
+    IN_MEMORY_MAX_BYTES,
+    IN_MEMORY_PIPELINE_ENABLED,
+    ImageSource,
+    release_image_source,
+)
+
+from shared.services.aws.s3.s3_ranged_download import RangedDownloader, RangedObject
+from shared.services.scratch_space import ScratchSpace
 
 # from contextlib import contextmanager
 # from typing import Generator
@@ -13,23 +24,124 @@ from utils import create_temp_path
 
 logger = logging.getLogger(__name__)
 
+PRECONDITION_FAILED = "PreconditionFailed"
+
 
 class ImageDownloader:
     """
     A class to handle downloading images from an S3 bucket.
     """
 
-    def __init__(self, s3_client: BaseClient):
+    def __init__(
+        self,
+        s3_client: BaseClient,
+        in_memory: bool = IN_MEMORY_PIPELINE_ENABLED,
+        max_in_memory_bytes: int = IN_MEMORY_MAX_BYTES,
+        ranged_downloader: Optional[RangedDownloader] = None,
+    ):
         """
-        Initialize the image downloader with an S3 client.
+        Initialize the image downloader with an S3 client. In memory mode the object is
+        downloaded as parallel byte ranges into a buffer, or into a memory mapped scratch file
+        when it is larger than max_in_memory_bytes.
         """
         self.s3_client = s3_client
+        self.ranged_downloader = ranged_downloader or RangedDownloader(s3_client)
+        self.in_memory = in_memory
+        self.max_in_memory_bytes = max_in_memory_bytes
 
-    def download_image(self, image_media: ImageMedia) -> Path:
+    def download_image(self, image_media: ImageMedia, scratch: ScratchSpace) -> ImageSource:
         """
-        Download the image from the S3 bucket.
+        Download the image from the S3 bucket, into memory or into a file of the scratch space.
         """
-        download_path = create_temp_path(image_media.filename, image_media.extension)
+        if not self.in_memory:
+            return self._download_to_file(image_media, scratch)
+
+        try:
+            try:
+                return self._download_ranges(image_media, scratch)
+            except ClientError as e:
+                if e.response["Error"]["Code"] != PRECONDITION_FAILED:
+                    raise
+                # Only re-fetch the metadata when the image no longer matches its ETag
+                logger.warning(f"Image: {image_media.filename} changed, refreshing its metadata")
+                image_media.refresh_metadata()
+                return self._download_ranges(image_media, scratch)
+        except BotoCoreError as e:
+            logger.error(f"Failed to download image: {image_media.filename}, due to: {e}")
+            raise
+
+    def read_head(self, image_media: ImageMedia, size: int) -> bytes:
+        """
+        Read the first bytes of the image with a single ranged GET, pinned to the ETag of its
+        metadata. Images smaller than size are read whole.
+        """
+        conditions = {"IfMatch": image_media.etag} if image_media.etag else {}
+        response = self.s3_client.get_object(
+            Bucket=image_media.bucket,
+            Key=image_media.key,
+            Range=f"bytes=0-{size - 1}",
+            **conditions,
+        )
+        body = response["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def _download_ranges(self, image_media: ImageMedia, scratch: ScratchSpace) -> ImageSource:
+        """
+        Download the image in byte ranges, pinned to the ETag of its metadata.
+        """
+        with self.ranged_downloader.open(
+            image_media.bucket, image_media.key, etag=image_media.etag
+        ) as ranged_object:
+            body = scratch.allocate(
+                self._get_scratch_name(image_media), ranged_object.size, self.max_in_memory_bytes
+            )
+            if isinstance(body, Path):
+                return self._read_into_file(image_media, ranged_object, body)
+            return self._read_into_memory(image_media, ranged_object, body)
+
+    def _read_into_memory(
+        self, image_media: ImageMedia, ranged_object: RangedObject, buffer: io.BytesIO
+    ) -> io.BytesIO:
+        """
+        Download the object ranges into a buffer preallocated to the object size.
+        """
+        if ranged_object.size:
+            # Writing the last byte grows the buffer to its final size in a single allocation
+            buffer.seek(ranged_object.size - 1)
+            buffer.write(b"\0")
+        with buffer.getbuffer() as view:
+            ranged_object.read_into(view)
+        buffer.seek(0)
+        logger.info(
+            f"Downloaded image: {image_media.filename} into memory ({ranged_object.size} bytes)"
+        )
+        return buffer
+
+    def _read_into_file(
+        self, image_media: ImageMedia, ranged_object: RangedObject, download_path: Path
+    ) -> Path:
+        """
+        Download the object ranges into a scratch file mapped in memory, for large objects.
+        """
+        try:
+            with download_path.open("w+b") as file:
+                file.truncate(ranged_object.size)
+                if ranged_object.size:
+                    with mmap.mmap(file.fileno(), ranged_object.size) as mapped:
+                        ranged_object.read_into(mapped)
+        except Exception:
+            download_path.unlink(missing_ok=True)
+            raise
+        logger.info(f"Downloaded image: {download_path}")
+        return download_path
+
+    def _download_to_file(self, image_media: ImageMedia, scratch: ScratchSpace) -> Path:
+        download_path = scratch.reserve(
+            self._get_scratch_name(image_media), image_media.metadata.size
+        )
         try:
             download_file_from_s3(
                 self.s3_client,
@@ -43,13 +155,17 @@ class ImageDownloader:
             logger.error(f"Failed to download image: {image_media.filename}, due to: {e}")
             raise
 
-    def cleanup(self, path: Path) -> None:
+    @staticmethod
+    def _get_scratch_name(image_media: ImageMedia) -> str:
+        return f"{image_media.filename}.{image_media.extension}"
+
+    def cleanup(self, source: ImageSource) -> None:
         """
-        Cleanup the temporary downloaded image file.
+        Cleanup the downloaded image, deleting the scratch file if it was spilled to disk.
         """
         try:
-            path.unlink(missing_ok=True)
-            logger.info(f"Cleaned up image file: {path}")
+            release_image_source(source)
+            logger.info(f"Cleaned up image: {source}")
         except Exception as e:
-            logger.error(f"Failed to cleanup image file: {path}, due to: {e}")
+            logger.error(f"Failed to cleanup image: {source}, due to: {e}")
             raise
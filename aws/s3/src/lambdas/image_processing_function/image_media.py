@@ -1,28 +1,55 @@
 import logging
+from typing import Optional
 
 from botocore.client import BaseClient
 from botocore.exceptions import BotoCoreError
-from utils import get_content_type, get_extension_from_content_type
+from utils import get_extension_from_content_type, get_object_metadata
+
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class ImageMedia:
-    def __init__(self, s3_client: BaseClient, bucket: str, key: str, filename: str):
+    def __init__(
+        self,
+        s3_client: BaseClient,
+        bucket: str,
+        key: str,
+        filename: str,
+        metadata: Optional[ObjectMetadata] = None,
+    ):
+        """
+        The metadata captured by the dispatcher is trusted when given, otherwise the image is
+        HEADed once to get it.
+        """
         self.s3_client = s3_client
         self.bucket = bucket
         self.key = key
         self.filename = filename
-        self.content_type = self._get_content_type()
+        self._set_metadata(metadata or self._get_metadata())
+
+    @property
+    def etag(self) -> str:
+        return self.metadata.etag
+
+    def refresh_metadata(self) -> ObjectMetadata:
+        """Get the metadata again, after the image changed since it was captured."""
+        self._set_metadata(self._get_metadata())
+        return self.metadata
+
+    def _set_metadata(self, metadata: ObjectMetadata) -> None:
+        self.metadata = metadata
+        self.content_type = metadata.content_type
         self.extension = self._get_extension()
 
-    def _get_content_type(self) -> str:
-        """Get content type of the image in the bucket."""
+    def _get_metadata(self) -> ObjectMetadata:
+        """Get metadata of the image in the bucket."""
         try:
-            return get_content_type(self.s3_client, self.bucket, self.key)
+            return get_object_metadata(self.s3_client, self.bucket, self.key)
         except BotoCoreError as e:
-            logger.error(f"Error getting content type of image from bucket: {e}")
+            logger.error(f"Error getting metadata of image from bucket: {e}")
             raise
 
     def _get_extension(self) -> str:
@@ -1,146 +1,538 @@
 import concurrent.futures
+import io
 import logging
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple, Union
 
-from botocore.exceptions import BotoCoreError
+from decode_planner import DecodeMethod, DecodePlan, DecodePlanner
+from encoder_profiles import EncoderProfiles, get_encoder_profile
+from executors import (
+    ExecutionBackend,
+    SharedImage,
+    create_executor,
+    resize_and_encode_shared,
+)
+from gif_engine import GifStreamWriter, build_global_palette, has_transparency, iter_frames
+from image_backends import ImageBackend, create_image_backend
 from image_media import ImageMedia
 from image_uploader import ImageUploader
 from PIL import Image as PILImage
-from PIL import ImageSequence, UnidentifiedImageError
-from pygifsicle import optimize
-from utils import create_temp_path
+from PIL import UnidentifiedImageError
+from pipeline import EncodedBodies, VariantPipeline
+from placeholder import PLACEHOLDER_ENABLED, SAMPLE_SIDE, encode_blurhash
+from resampling import BOX, ResamplingPolicy, ResamplingProfile
+from strip_reader import iter_png_strips, iter_strips
+from tiled_resize import StripResizer
+from utils import (
+    IN_MEMORY_MAX_BYTES,
+    IN_MEMORY_PIPELINE_ENABLED,
+    ImageSource,
+    Variant,
+    get_env_int,
+    release_image_source,
+)
 
 from shared.media import AspectRatio, Extension, Size
 from shared.media.constants import IMAGE_DIMENSIONS
+from shared.services.aws.s3.s3_object_metadata import PLACEHOLDER_METADATA_KEY
+from shared.services.scratch_space import ScratchSpace
 
 logger = logging.getLogger(__name__)
 
-MAX_WORKERS = 5
+# A variant is only resized from a previously generated (smaller than source) variant when that
+# variant is at least this many times larger than the target; otherwise the source is used.
+MIN_CASCADE_RATIO = 2.0
+
+# Variants of these formats whose decoded pixels reach STREAM_UPLOAD_MIN_BYTES (HUGE RGB variants
+# do) are encoded straight into a multipart upload. Their encoded size stays close to the pixel
+# size, so overlapping the encode with the upload pays off.
+STREAMED_EXTENSIONS = {Extension.PNG}
+STREAM_UPLOAD_MIN_BYTES = get_env_int("STREAM_UPLOAD_MIN_BYTES", default=8 * 1024 * 1024)
 
 
 class ImageProcessor:
+    def __init__(
+        self,
+        decode_planner: Optional[DecodePlanner] = None,
+        in_memory: bool = IN_MEMORY_PIPELINE_ENABLED,
+        max_in_memory_bytes: int = IN_MEMORY_MAX_BYTES,
+        stream_min_bytes: int = STREAM_UPLOAD_MIN_BYTES,
+        resampling: Optional[ResamplingPolicy] = None,
+        encoder_profiles: Optional[EncoderProfiles] = None,
+        backend: Optional[ImageBackend] = None,
+        placeholders: bool = PLACEHOLDER_ENABLED,
+    ):
+        self.decode_planner = decode_planner or DecodePlanner()
+        self.resampling = resampling or ResamplingPolicy()
+        self.encoder_profiles = encoder_profiles
+        self.backend = backend or create_image_backend()
+        self.in_memory = in_memory
+        self.max_in_memory_bytes = max_in_memory_bytes
+        self.stream_min_bytes = stream_min_bytes
+        self.placeholders = placeholders
+
     def process_and_upload_images(
         self,
-        download_path: Path,
+        source: ImageSource,
         image_media: ImageMedia,
         processed_bucket: str,
-        extension: Extension,
+        extensions: List[Extension],
         sizes: List[Size],
         executor: concurrent.futures.Executor,
         uploader: ImageUploader,
-    ) -> None:
+        variants: Optional[Set[Variant]] = None,
+        scratch: Optional[ScratchSpace] = None,
+        tiled: bool = False,
+    ) -> DecodePlan:
+        """
+        Decode the source once and upload every size in every extension, or only the given
+        variants of them. All extensions are encoded from the same resized variants. Variants
+        spilled to disk are written to the scratch space of the job, or to one of their own.
+        Tiled jobs resize stills of sources too large to decode whole from strips of rows.
+        """
+        if variants is None:
+            variants = {(size, extension) for size in sizes for extension in extensions}
+        resize_and_upload = self._resize_and_upload_images
+        if tiled:
+            resize_and_upload = self._resize_and_upload_in_strips
         try:
-            self._resize_and_upload_images(
-                download_path,
-                extension,
-                sizes,
-                image_media,
-                processed_bucket,
-                executor,
-                uploader,
-            )
+            with nullcontext(scratch) if scratch is not None else ScratchSpace() as job_scratch:
+                return resize_and_upload(
+                    source,
+                    variants,
+                    image_media,
+                    processed_bucket,
+                    executor,
+                    uploader,
+                    job_scratch,
+                )
         except Exception as e:
             logger.exception(f"Unexpected error: {e}")
             raise
 
-    def _create_pil_image(self, download_path: Path) -> PILImage.Image:
+    def process_and_upload_thumbnail(
+        self,
+        thumbnail: PILImage.Image,
+        image_media: ImageMedia,
+        processed_bucket: str,
+        uploader: ImageUploader,
+        variants: Set[Variant],
+        scratch: ScratchSpace,
+    ) -> None:
+        """
+        Upload the given variants resized from a thumbnail standing in for the source, such as
+        the one embedded in its EXIF data. Thumbnails are small, so their variants are resized
+        and encoded in the calling thread, and only uploaded in parallel. They carry no
+        placeholder, which is only computed from the decoded source.
+        """
+        extensions = self._group_extensions_by_size(variants)
+        metadata: Dict[str, str] = {}
+        with create_executor(ExecutionBackend.INLINE) as executor, VariantPipeline(
+            executor, uploader, processed_bucket, image_media, metadata=metadata
+        ) as pipeline:
+            for size, variant in self._resize_cascade(thumbnail, list(extensions)):
+                for extension in extensions[size]:
+                    pipeline.submit(
+                        size,
+                        self._encode_variant,
+                        size,
+                        extension,
+                        variant,
+                        image_media,
+                        processed_bucket,
+                        uploader,
+                        scratch,
+                        metadata,
+                    )
+            pipeline.wait()
+
+    def plan_decode(self, source: ImageSource, sizes: List[Size]) -> DecodePlan:
+        """Plan the decode of the source from its header, without decoding any pixels."""
+        with PILImage.open(source) as img:
+            return self.decode_planner.plan(img, sizes)
+
+    def _create_pil_image(
+        self, source: ImageSource, sizes: List[Size]
+    ) -> Tuple[PILImage.Image, DecodePlan]:
+        """
+        Open and decode the source image once, so every variant can share its pixels. The image
+        is decoded at the reduced scale chosen by the decode planner for the requested sizes.
+        """
         try:
-            return PILImage.open(download_path)
+            return self.backend.decode(source, sizes, self.decode_planner)
         except UnidentifiedImageError as e:
             logger.exception(f"Error opening image file: {e}")
             raise
+        except OSError as e:
+            logger.error(f"Corrupted image: {e}")
+            raise
 
     def _resize_and_upload_images(
         self,
-        download_path: Path,
-        extension: Extension,
-        sizes: List[Size],
+        source: ImageSource,
+        variants: Set[Variant],
+        image_media: ImageMedia,
+        processed_bucket: str,
+        executor: concurrent.futures.Executor,
+        uploader: ImageUploader,
+        scratch: ScratchSpace,
+    ) -> DecodePlan:
+        img, plan = self._create_pil_image(source, list({size for size, _ in variants}))
+        logger.info(f"Decode plan for image {image_media.filename}: {plan}")
+        logger.info(f"Resampling for image {image_media.filename}: {self.resampling}")
+        logger.info(f"Image backend for image {image_media.filename}: {self.backend}")
+
+        # Computed before any variant, so every one is uploaded with it
+        metadata = self._get_variant_metadata(img, img.size)
+        still_variants = set(variants)
+        with VariantPipeline(
+            executor, uploader, processed_bucket, image_media, metadata=metadata
+        ) as pipeline:
+            animated_sizes = [size for size, extension in variants if extension is Extension.GIF]
+            if animated_sizes and getattr(img, "is_animated", False):
+                self._resize_animation(img, image_media, animated_sizes, pipeline, scratch)
+                still_variants -= {(size, Extension.GIF) for size in animated_sizes}
+                # Other formats are stills of the first frame
+                img.seek(0)
+
+            still_extensions = self._group_extensions_by_size(still_variants)
+            is_process_pool = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+            if still_extensions and is_process_pool:
+                self._resize_in_processes(img, still_extensions, pipeline)
+            elif still_extensions:
+                for size, variant in self._resize_cascade(img, list(still_extensions)):
+                    # Every format is encoded by its own task, so they run in parallel
+                    for extension in still_extensions[size]:
+                        pipeline.submit(
+                            size,
+                            self._encode_variant,
+                            size,
+                            extension,
+                            variant,
+                            image_media,
+                            processed_bucket,
+                            uploader,
+                            scratch,
+                            metadata,
+                        )
+                pipeline.wait()
+
+        return plan
+
+    def _resize_and_upload_in_strips(
+        self,
+        source: ImageSource,
+        variants: Set[Variant],
         image_media: ImageMedia,
         processed_bucket: str,
         executor: concurrent.futures.Executor,
         uploader: ImageUploader,
+        scratch: ScratchSpace,
+    ) -> DecodePlan:
+        """
+        Resize every variant from strips of source rows, with the pixels of a one-shot resize.
+        PNGs whose rows can be decoded a strip at a time never hold the whole image, other
+        sources are decoded as usual and read a strip at a time, which still saves the full
+        size copies of a one-shot resize. Each variant is resized from the source, there is no
+        cascade, and every variant of the source is a still of its first frame.
+        """
+        extensions = self._group_extensions_by_size(variants)
+        try:
+            img = PILImage.open(source)
+            plan = self.decode_planner.plan(img, list(extensions), strips=True)
+            if plan.method is DecodeMethod.STRIPS:
+                strips = iter_png_strips(img)
+            else:
+                img = self.decode_planner.decode(img, plan)
+                strips = iter_strips(img)
+            logger.info(f"Decode plan for image {image_media.filename}: {plan}")
+            logger.info(f"Resampling for image {image_media.filename}: {self.resampling}")
+
+            resizers = {
+                size: StripResizer(img, self._get_dimensions(size), self.resampling.for_size(size))
+                for size in extensions
+            }
+            # The sample of the placeholder is resized from the same strips
+            sampler = None
+            if self.placeholders:
+                sampler = StripResizer(img, (SAMPLE_SIDE, SAMPLE_SIDE), BOX)
+            for strip in strips:
+                for resizer in resizers.values():
+                    resizer.feed(strip)
+                if sampler is not None:
+                    sampler.feed(strip)
+        except UnidentifiedImageError as e:
+            logger.exception(f"Error opening image file: {e}")
+            raise
+        except OSError as e:
+            logger.error(f"Corrupted image: {e}")
+            raise
+
+        metadata = self._get_variant_metadata(sampler.result(), img.size) if sampler else {}
+        with VariantPipeline(
+            executor, uploader, processed_bucket, image_media, metadata=metadata
+        ) as pipeline:
+            for size in sorted(resizers, key=self._get_pixel_count, reverse=True):
+                # Each resizer is dropped once resized, along with the rows it held
+                variant = resizers.pop(size).result()
+                for extension in extensions[size]:
+                    pipeline.submit(
+                        size,
+                        self._encode_variant,
+                        size,
+                        extension,
+                        variant,
+                        image_media,
+                        processed_bucket,
+                        uploader,
+                        scratch,
+                        metadata,
+                    )
+            pipeline.wait()
+
+        return plan
+
+    @staticmethod
+    def _group_extensions_by_size(variants: Set[Variant]) -> Dict[Size, List[Extension]]:
+        """Group variants by size, keeping the extensions of each size in a stable order."""
+        extensions: Dict[Size, List[Extension]] = {}
+        for size, extension in sorted(variants, key=lambda variant: variant[1].value):
+            extensions.setdefault(size, []).append(extension)
+        return extensions
+
+    def _resize_in_processes(
+        self,
+        img: PILImage.Image,
+        extensions: Dict[Size, List[Extension]],
+        pipeline: VariantPipeline,
+    ) -> None:
+        """
+        Resize and encode every size in process pool workers mapping the decoded pixels from
+        shared memory. Each worker resizes from the source, so there is no cascade here, and
+        encodes its variant in every extension. The encoded variants are uploaded from this
+        process by the pipeline.
+        """
+        with SharedImage(img) as shared:
+            for size, size_extensions in extensions.items():
+                encoders = [
+                    (extension, get_encoder_profile(extension, size, self.encoder_profiles))
+                    for extension in size_extensions
+                ]
+                pipeline.submit(
+                    size,
+                    resize_and_encode_shared,
+                    shared.handle,
+                    self._get_dimensions(size),
+                    self.resampling.for_size(size),
+                    encoders,
+                    self.backend,
+                )
+            pipeline.wait()
+
+    def _resize_animation(
+        self,
+        img: PILImage.Image,
+        image_media: ImageMedia,
+        sizes: List[Size],
+        pipeline: VariantPipeline,
+        scratch: ScratchSpace,
     ) -> None:
-        futures = [
-            executor.submit(
-                self._resize_and_upload_single_image,
-                size,
-                extension,
-                download_path,
-                image_media,
-                processed_bucket,
-                uploader,
-            )
-            for size in sizes
-        ]
-        for future in concurrent.futures.as_completed(futures):
-            future.result()
-
-    def _resize_and_upload_single_image(
+        """
+        Resize an animated GIF to every size in a single pass over its frames. Each frame is
+        decoded once, resized through the cascade and appended to one GifStreamWriter per size,
+        so memory holds a couple of frames per size instead of the whole animation. Frames can
+        only be decoded in order, so this runs in the calling thread.
+        """
+        palette = build_global_palette(img)
+        transparency = has_transparency(img)
+        loop = img.info.get("loop", 0)
+
+        outputs = {}
+        try:
+            for size in set(sizes):
+                dimensions = self._get_dimensions(size)
+                body = self._create_animation_body(
+                    image_media, size, dimensions, getattr(img, "n_frames", 1), scratch
+                )
+                fp = body if isinstance(body, io.BytesIO) else open(body, "w+b")
+                outputs[size] = (body, GifStreamWriter(fp, dimensions, palette, transparency, loop))
+
+            for frame, duration in iter_frames(img):
+                for size, variant in self._resize_cascade(frame, sizes):
+                    outputs[size][1].write_frame(variant, duration)
+
+            for body, writer in outputs.values():
+                writer.close()
+                if isinstance(body, io.BytesIO):
+                    body.seek(0)
+                else:
+                    writer.fp.close()
+        except Exception as e:
+            logger.error(f"Unexpected error while processing GIF image: {e}")
+            for body, writer in outputs.values():
+                writer.fp.close()
+                release_image_source(body)
+            raise
+
+        for size, (body, _) in outputs.items():
+            pipeline.submit_encoded(size, {Extension.GIF: body})
+        pipeline.wait()
+
+    def _create_animation_body(
+        self,
+        image_media: ImageMedia,
+        size: Size,
+        dimensions: Tuple[int, int],
+        n_frames: int,
+        scratch: ScratchSpace,
+    ) -> ImageSource:
+        """
+        Create the destination of an animated variant: an in-memory buffer, or a scratch file
+        when in-memory mode is off or its frames (one byte per pixel) exceed the in-memory limit.
+        """
+        width, height = dimensions
+        return scratch.allocate(
+            f"{image_media.filename}_{size.name.lower()}.{Extension.GIF.value}",
+            width * height * n_frames,
+            self._get_memory_max_bytes(),
+        )
+
+    def _resize_cascade(
+        self, img: PILImage.Image, sizes: List[Size]
+    ) -> Iterator[Tuple[Size, PILImage.Image]]:
+        """
+        Yield a resized variant for every size, largest first. Backends resizing whole ladders
+        at once resize them all. Otherwise each variant is resized from the last generated
+        variant while it is at least MIN_CASCADE_RATIO times the target, and from the source
+        image otherwise.
+        """
+        sizes = sorted(set(sizes), key=self._get_pixel_count, reverse=True)
+        targets = [(self._get_dimensions(size), self.resampling.for_size(size)) for size in sizes]
+        ladder = self.backend.resize_ladder(img, targets)
+        if ladder is not None:
+            yield from zip(sizes, ladder)
+            return
+
+        base = img
+        for size in sizes:
+            dimensions = self._get_dimensions(size)
+            if base is not img and not self._is_cascade_base(base, dimensions):
+                base = img
+
+            variant = self._resize_image(base, dimensions, self.resampling.for_size(size))
+            yield size, variant
+
+            # Upscaled variants carry no more detail than the source, so never cascade from them
+            if variant.width <= img.width and variant.height <= img.height:
+                base = variant
+
+    @staticmethod
+    def _is_cascade_base(base: PILImage.Image, dimensions: Tuple[int, int]) -> bool:
+        width, height = dimensions
+        return base.width >= width * MIN_CASCADE_RATIO and base.height >= height * MIN_CASCADE_RATIO
+
+    @staticmethod
+    def _get_dimensions(size: Size) -> Tuple[int, int]:
+        return IMAGE_DIMENSIONS[AspectRatio.AR_1_BY_1][size].as_tuple()
+
+    @staticmethod
+    def _get_pixel_count(size: Size) -> int:
+        width, height = ImageProcessor._get_dimensions(size)
+        return width * height
+
+    def _encode_variant(
         self,
         size: Size,
         extension: Extension,
-        download_path: Path,
+        variant: PILImage.Image,
         image_media: ImageMedia,
         processed_bucket: str,
         uploader: ImageUploader,
-    ) -> None:
-        img = self._create_pil_image(download_path)
+        scratch: ScratchSpace,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> EncodedBodies:
+        """
+        Encode a resized variant, returning the body to upload. Large lossless variants are
+        encoded straight into a multipart upload with the user metadata instead, and None is
+        returned as their body.
+        """
         new_filename = f"{image_media.filename}_{size.name.lower()}"
-        new_extension = extension.value
-        local_path = create_temp_path(new_filename, new_extension)
 
+        if self._should_stream(variant, extension):
+            with uploader.stream_image(
+                processed_bucket, image_media, size, extension, metadata
+            ) as stream:
+                self._save_image(variant, extension, size, stream)
+            return {extension: None}
+
+        return {extension: self._encode_image(variant, extension, size, new_filename, scratch)}
+
+    def _get_variant_metadata(
+        self, img: PILImage.Image, source_size: Tuple[int, int]
+    ) -> Dict[str, str]:
+        """
+        Return the user metadata uploaded with every variant of the image: the BlurHash of its
+        pixels as a placeholder, computed from the decoded image or a sample of it.
+        """
+        if not self.placeholders:
+            return {}
+        placeholder = encode_blurhash(img, source_size)
+        logger.info(f"Placeholder of the image: {placeholder}")
+        return {PLACEHOLDER_METADATA_KEY: placeholder}
+
+    def _resize_image(
+        self, img: PILImage.Image, dimensions: Tuple[int, int], profile: ResamplingProfile
+    ) -> PILImage.Image:
         try:
-            if format == Extension.GIF:
-                self._process_gif_image(img, size, extension, local_path)
-            else:
-                self._process_other_images(img, size, extension, local_path)
-
-            uploader.upload_image(
-                local_path,
-                processed_bucket,
-                image_media,
-                size,
-                extension,
-            )
-        except BotoCoreError as e:
-            logger.error(f"Error while uploading to AWS S3: {e}")
+            return self.backend.resize(img, dimensions, profile)
+        except Exception as e:
+            logger.error(f"Unexpected error while resizing image: {e}")
             raise
-        finally:
-            if local_path.exists():
-                local_path.unlink()
 
-    def _process_gif_image(
+    def _should_stream(self, img: PILImage.Image, extension: Extension) -> bool:
+        pixel_bytes = img.width * img.height * len(img.getbands())
+        return extension in STREAMED_EXTENSIONS and pixel_bytes >= self.stream_min_bytes
+
+    def _encode_image(
         self,
         img: PILImage.Image,
+        extension: Extension,
         size: Size,
-        format: Extension,
-        local_path: Path,
-    ):
-        try:
-            frames = [frame.copy().resize(size.value) for frame in ImageSequence.Iterator(img)]
-            frames[0].save(
-                str(local_path),
-                format=format.value,
-                append_images=frames[1:],
-                save_all=True,
-                optimize=False,
-            )
-            optimize(str(local_path))
-        except Exception as e:
-            logger.error(f"Unexpected error while processing GIF image: {e}")
-            raise
+        filename: str,
+        scratch: ScratchSpace,
+    ) -> ImageSource:
+        """
+        Encode the image into an in-memory buffer, or into a scratch file when in-memory mode
+        is off or the decoded pixels exceed the in-memory limit. Encoded images are seldom
+        larger than their decoded pixels, so those are what a scratch file reserves.
+        """
+        pixel_bytes = img.width * img.height * len(img.getbands())
+        body = scratch.allocate(
+            f"{filename}.{extension.value}", pixel_bytes, self._get_memory_max_bytes()
+        )
+        self._save_image(img, extension, size, body)
+        if isinstance(body, io.BytesIO):
+            body.seek(0)
+        return body
+
+    def _get_memory_max_bytes(self) -> Optional[int]:
+        """Return the largest body kept in memory, or None when every body goes to disk."""
+        return self.max_in_memory_bytes if self.in_memory else None
 
-    def _process_other_images(
-        self, img: PILImage.Image, size: Size, extension: Extension, local_path: Path
+    def _save_image(
+        self,
+        img: PILImage.Image,
+        extension: Extension,
+        size: Size,
+        destination: Union[Path, BinaryIO],
     ):
         try:
-            dimensions = IMAGE_DIMENSIONS[AspectRatio.AR_1_BY_1][size].as_tuple()
-            new_img = img.resize(dimensions)
-            new_img.save(local_path, extension.value.upper())
+            encoder = get_encoder_profile(extension, size, self.encoder_profiles)
+            self.backend.encode(img, destination, extension.value.upper(), encoder)
         except OSError as e:
             logger.error(f"Corrupted image: {e}")
             raise
         except Exception as e:
-            logger.error(f"Unexpected error while resizing image: {e}")
+            logger.error(f"Unexpected error while saving image: {e}")
             raise
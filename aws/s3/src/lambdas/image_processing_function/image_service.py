@@ -1,28 +1,63 @@
 import concurrent.futures
 import logging
-from typing import List
+from contextlib import nullcontext
+from typing import List, Optional, Set
 
 from botocore.client import BaseClient
-from botocore.exceptions import BotoCoreError
+from botocore.exceptions import BotoCoreError, ClientError
+from content_index import (
+    ContentIndex,
+    ContentRecord,
+    content_key_from_etag,
+    content_key_from_source,
+)
+from encoder_profiles import is_encoder_available
+from exceptions import ImageTooLargeError
+from executors import ExecutionBackend, create_executor, select_backend
+from exif_thumbnail import EXIF_THUMBNAIL_ENABLED, open_exif_thumbnail
 from image_downloader import ImageDownloader
 from image_media import ImageMedia
 from image_processor import ImageProcessor
 from image_uploader import ImageUploader
+from memory_guard import MemoryGuard, MemoryPlan, MemoryStrategy
+from pipeline import UPLOAD_WORKERS
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from utils import ImageSource, Variant
 
-from shared.media import Extension, Size
+from shared.media import AspectRatio, Extension, Size
+from shared.media.constants import IMAGE_DIMENSIONS
+from shared.media.image_header import HEADER_PROBE_BYTES
+from shared.services.scratch_space import ScratchSpace
 
 logger = logging.getLogger(__name__)
 
-MAX_WORKERS = 5
+# Sizes uploaded from the EXIF thumbnail of JPEGs when it is good enough for them
+EXIF_THUMBNAIL_SIZES = {Size.TINY}
 
 
 class ImageService:
-    def __init__(self, s3_client: BaseClient):
+    def __init__(
+        self,
+        s3_client: BaseClient,
+        content_index: Optional[ContentIndex] = None,
+        exif_thumbnails: bool = EXIF_THUMBNAIL_ENABLED,
+    ):
+        """
+        With a content index, images whose content was already processed have the existing
+        variants copied to their filename instead of being downloaded and processed again.
+        With exif_thumbnails, previews of the EXIF_THUMBNAIL_SIZES of JPEGs are uploaded from
+        their EXIF thumbnail, read from the head of the file, before the whole image is
+        downloaded. The variants of the decoded source replace them.
+        """
         self.s3_client = s3_client
         self.downloader = ImageDownloader(s3_client)
         self.processor = ImageProcessor()
         self.uploader = ImageUploader(s3_client)
+        self.memory_guard = MemoryGuard(
+            self.processor.decode_planner, backend=self.processor.backend
+        )
+        self.content_index = content_index
+        self.exif_thumbnails = exif_thumbnails
 
     @retry(
         stop=stop_after_attempt(3),
@@ -33,23 +68,77 @@ class ImageService:
         self,
         image_media: ImageMedia,
         processed_bucket: str,
-        extension: Extension,
+        extensions: List[Extension],
         sizes: List[Size],
-    ) -> None:
-        download_path = None
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> bool:
+        """
+        Produce every variant of the image that is still missing, returning whether it
+        succeeded. Batches of jobs share the given executor, otherwise the job creates its own
+        for the backend matching its pixel count. Files spilled to disk by the job are kept in
+        a scratch space of its own, removed when the job is over.
+        """
+        source = None
+        previews: Set[Variant] = set()
+        scratch = ScratchSpace()
         try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                download_path = self.downloader.download_image(image_media)
+            extensions = self._get_encodable_extensions(extensions)
+            variants = {(size, extension) for size in sizes for extension in extensions}
 
-                self.processor.process_and_upload_images(
-                    download_path,
-                    image_media,
-                    processed_bucket,
-                    extension,
-                    sizes,
-                    executor,
-                    self.uploader,
+            # Retried and duplicate jobs only produce the variants that are still missing
+            missing = self.uploader.find_missing_variants(processed_bucket, image_media, variants)
+            if not missing:
+                logger.info(f"Every variant of image: {image_media.filename} already exists")
+                return True
+
+            # Single part ETags identify the content before it is downloaded, otherwise the
+            # downloaded bytes are hashed
+            content_key = self._get_content_key(image_media)
+            if self._reuse_processed_variants(content_key, image_media, processed_bucket, missing):
+                return True
+
+            # The smallest variants are the most requested, so previews of them are uploaded
+            # first when the EXIF thumbnail is good enough for them
+            previews = self._upload_from_exif_thumbnail(
+                image_media, processed_bucket, missing, scratch
+            )
+
+            source = self.downloader.download_image(image_media, scratch)
+
+            # The ETag is refreshed when the image changed since its metadata was captured
+            downloaded_key = self._get_content_key(image_media, source)
+            if downloaded_key != content_key and self._reuse_processed_variants(
+                downloaded_key, image_media, processed_bucket, missing
+            ):
+                return True
+
+            # The header tells whether the job fits in memory before any pixel is decoded
+            memory_plan = self.memory_guard.check(source, missing)
+            logger.info(f"Memory plan for image {image_media.filename}: {memory_plan}")
+            if memory_plan.strategy is MemoryStrategy.REJECT:
+                raise ImageTooLargeError(
+                    f"Image: {image_media.filename} is too large to process, {memory_plan}, "
+                    f"{self.memory_guard.memory_bytes // (1024 * 1024)} MB available"
                 )
+
+            # Jobs of a batch run at the same time, so together they must fit in memory as well
+            with self.memory_guard.reserve(memory_plan):
+                with self._get_executor(memory_plan, executor) as job_executor:
+                    self.processor.process_and_upload_images(
+                        source,
+                        image_media,
+                        processed_bucket,
+                        extensions,
+                        sizes,
+                        job_executor,
+                        self.uploader,
+                        missing,
+                        scratch=scratch,
+                        tiled=memory_plan.strategy is MemoryStrategy.TILED,
+                    )
+
+            self._record_processed_variants(downloaded_key, image_media, variants)
+            return True
         except BotoCoreError as e:
             logger.exception(
                 f"Error while interacting with AWSf S3: {e}, Image: {image_media.filename}"
@@ -57,5 +146,183 @@ class ImageService:
         except Exception as e:
             logger.exception(f"Unexpected error: {e}, Image: {image_media.filename}")
         finally:
-            if download_path:
-                self.downloader.cleanup(download_path)
+            if source is not None:
+                self.downloader.cleanup(source)
+            scratch.close()
+        # Previews left in place would pass for the variants when the job is retried
+        self.uploader.delete_images(processed_bucket, image_media, previews)
+        return False
+
+    @staticmethod
+    def _get_executor(memory_plan: MemoryPlan, executor: Optional[concurrent.futures.Executor]):
+        """
+        Return a context manager giving the shared executor as is, or a new executor for the
+        backend chosen from the number of pixels that will be decoded. Low-memory jobs resize
+        and encode one variant at a time in the calling thread, even within a batch. Tiled jobs
+        resize in the calling thread and encode their variants on threads, as process pool
+        workers would need the whole source.
+        """
+        if memory_plan.strategy is MemoryStrategy.LOW_MEMORY:
+            return create_executor(ExecutionBackend.INLINE)
+        is_process_pool = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+        if memory_plan.strategy is MemoryStrategy.TILED and (executor is None or is_process_pool):
+            return create_executor(ExecutionBackend.THREAD)
+        if executor is not None:
+            return nullcontext(executor)
+        width, height = memory_plan.decode_plan.decoded_size
+        return create_executor(select_backend(width * height))
+
+    @staticmethod
+    def _get_encodable_extensions(extensions: List[Extension]) -> List[Extension]:
+        """Drop the extensions whose encoder is missing from this Pillow build."""
+        encodable = [extension for extension in extensions if is_encoder_available(extension)]
+        for extension in set(extensions) - set(encodable):
+            logger.warning(f"Skipping {extension.value} variants, its encoder is not available")
+        return encodable
+
+    def _upload_from_exif_thumbnail(
+        self,
+        image_media: ImageMedia,
+        processed_bucket: str,
+        missing: Set[Variant],
+        scratch: ScratchSpace,
+    ) -> Set[Variant]:
+        """
+        Upload previews of the missing variants of EXIF_THUMBNAIL_SIZES of a JPEG from its EXIF
+        thumbnail, returning those uploaded, which the full decode replaces. Images missing no
+        other variant are decoded right away, so they get no preview. Images whose thumbnail
+        isn't good enough for every one of those sizes, and any failure, get none either.
+        """
+        variants = {variant for variant in missing if variant[0] in EXIF_THUMBNAIL_SIZES}
+        if (
+            not self.exif_thumbnails
+            or not variants
+            or variants == missing
+            or image_media.extension != Extension.JPEG.value
+        ):
+            return set()
+
+        try:
+            head = self.downloader.read_head(image_media, HEADER_PROBE_BYTES)
+            # The thumbnail has to cover every size without upscaling
+            dimensions = [IMAGE_DIMENSIONS[AspectRatio.AR_1_BY_1][size] for size, _ in variants]
+            covered = (max(d.width for d in dimensions), max(d.height for d in dimensions))
+            thumbnail = open_exif_thumbnail(head, covered)
+            if thumbnail is None:
+                return set()
+            self.processor.process_and_upload_thumbnail(
+                thumbnail, image_media, processed_bucket, self.uploader, variants, scratch
+            )
+        except Exception as e:
+            # The full decode produces these variants as well, so the fast path never fails a job
+            logger.warning(
+                f"Failed to upload variants of image: {image_media.filename} from its EXIF "
+                f"thumbnail, due to: {e}"
+            )
+            return set()
+
+        logger.info(
+            f"Uploaded {len(variants)} previews of image: {image_media.filename} from "
+            f"its EXIF thumbnail"
+        )
+        return variants
+
+    def _get_content_key(
+        self, image_media: ImageMedia, source: Optional[ImageSource] = None
+    ) -> Optional[str]:
+        """Return the content key of the image, hashing the source when the ETag gives none."""
+        if self.content_index is None:
+            return None
+        content_key = content_key_from_etag(image_media.etag)
+        if content_key is None and source is not None:
+            content_key = content_key_from_source(source)
+        return content_key
+
+    def _reuse_processed_variants(
+        self,
+        content_key: Optional[str],
+        image_media: ImageMedia,
+        processed_bucket: str,
+        variants: Set[Variant],
+    ) -> bool:
+        """
+        Copy the given variants, already processed from the same content, to the image,
+        returning whether every one was reused. Index errors and missing variants fall back to
+        processing the image.
+        """
+        if self.content_index is None or content_key is None:
+            return False
+
+        try:
+            record = self.content_index.get(content_key)
+        except (BotoCoreError, ClientError, ValueError, KeyError) as e:
+            logger.warning(f"Failed to look up content: {content_key} in the index: {e}")
+            return False
+        if record is None or not record.covers(variants):
+            return False
+
+        # The listing found these variants missing, so a record of the image itself is stale:
+        # its variants were deleted or an earlier run failed partway
+        if record.filename == image_media.filename:
+            logger.warning(
+                f"Variants recorded for content: {content_key} are missing from image: "
+                f"{image_media.filename}, processing it again"
+            )
+            self._forget_content(content_key)
+            return False
+
+        try:
+            self._copy_variants(record.filename, image_media, processed_bucket, variants)
+        except (ImageUploader.UploadFailed, BotoCoreError) as e:
+            logger.warning(f"Failed to reuse variants of: {record.filename}, due to: {e}")
+            self._forget_content(content_key)
+            return False
+
+        logger.info(f"Reused variants of: {record.filename} for image: {image_media.filename}")
+        return True
+
+    def _copy_variants(
+        self,
+        source_filename: str,
+        image_media: ImageMedia,
+        processed_bucket: str,
+        variants: Set[Variant],
+    ) -> None:
+        """Copy every variant from the source filename, in parallel."""
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=UPLOAD_WORKERS, thread_name_prefix="copy"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self.uploader.copy_image,
+                    processed_bucket,
+                    source_filename,
+                    image_media,
+                    size,
+                    extension,
+                )
+                for size, extension in variants
+            ]
+            for future in futures:
+                future.result()
+
+    def _record_processed_variants(
+        self, content_key: Optional[str], image_media: ImageMedia, variants: Set[Variant]
+    ) -> None:
+        """Record the variants processed from the image, so later uploads can reuse them."""
+        if self.content_index is None or content_key is None:
+            return
+        try:
+            self.content_index.put(
+                content_key, ContentRecord(image_media.filename, frozenset(variants))
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to record content: {content_key} in the index: {e}")
+
+    def _forget_content(self, content_key: str) -> None:
+        if self.content_index is None:
+            return
+        try:
+            self.content_index.delete(content_key)
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to remove content: {content_key} from the index: {e}")
@@ -1,14 +1,24 @@
 import logging
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Set
 
 from botocore.client import BaseClient
-from botocore.exceptions import BotoCoreError
+from botocore.exceptions import BotoCoreError, ClientError
 from image_media import ImageMedia
-from s3_utils import upload_file_to_s3
-from tenacity import retry, stop_after_attempt, wait_exponential
+from s3_utils import (
+    copy_object_in_s3,
+    open_s3_upload_stream,
+    upload_file_to_s3,
+    upload_fileobj_to_s3,
+)
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from utils import ImageSource, Variant, release_image_source
 
 from shared.media import Extension, Size
 from shared.media.base import MediaFormatUtils
+from shared.services.aws.s3.s3_key_listing import find_missing_keys
+from shared.services.aws.s3.s3_multipart_upload import MultipartUploadWriter
 
 logger = logging.getLogger(__name__)
 
@@ -23,48 +33,173 @@ class ImageUploader:
     class UploadFailed(Exception):
         """Raised when an image upload fails."""
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def upload_image(
         self,
-        new_path: Path,
+        body: ImageSource,
+        processed_bucket: str,
+        image_media: ImageMedia,
+        size: Size,
+        extension: Extension,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Upload the image (a file or an in-memory buffer) to S3 with the given user metadata and
+        release it afterwards.
+        """
+        try:
+            self._upload_with_retry(body, processed_bucket, image_media, size, extension, metadata)
+        finally:
+            self.clean_up(body)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _upload_with_retry(
+        self,
+        body: ImageSource,
         processed_bucket: str,
         image_media: ImageMedia,
         size: Size,
         extension: Extension,
+        metadata: Optional[Dict[str, str]] = None,
     ) -> None:
-        """Upload the image file to S3, retrying up to 3 times on failure."""
+        """Upload the image to S3, retrying up to 3 times on failure."""
         new_key = self._construct_new_key(image_media.filename, size, extension)
+        content_type = self._get_content_type(extension)
 
         try:
             logger.info(f"Uploading image: {new_key} to bucket: {processed_bucket}")
-            upload_file_to_s3(
-                self.s3_client,
-                new_path,
-                processed_bucket,
-                new_key,
-                MediaFormatUtils.map_extension_to_media_type(extension=extension).value,
-            )
+            if isinstance(body, Path):
+                upload_file_to_s3(
+                    self.s3_client, body, processed_bucket, new_key, content_type, metadata
+                )
+            else:
+                body.seek(0)
+                upload_fileobj_to_s3(
+                    self.s3_client, body, processed_bucket, new_key, content_type, metadata
+                )
             logger.info(f"Uploaded image: {new_key} to bucket: {processed_bucket}")
         except BotoCoreError as e:
             logger.error(
                 f"Failed to upload image: {new_key} to bucket: {processed_bucket}, due to: {e}"
             )
             raise ImageUploader.UploadFailed from e
-        finally:
-            self.clean_up(new_path)
 
-    def clean_up(self, new_path: Path) -> None:
+    @contextmanager
+    def stream_image(
+        self,
+        processed_bucket: str,
+        image_media: ImageMedia,
+        size: Size,
+        extension: Extension,
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> Iterator[MultipartUploadWriter]:
+        """
+        Open a stream the image is encoded into, uploading it in parts while it is written. The
+        upload is completed when the block exits, or aborted if it raises. Unlike upload_image,
+        the stream isn't retried as a whole, as the encoded image isn't kept to be written again;
+        the stream retries every part failing with a transient error instead.
+        """
+        new_key = self._construct_new_key(image_media.filename, size, extension)
+        content_type = self._get_content_type(extension)
+
+        try:
+            logger.info(f"Streaming image: {new_key} to bucket: {processed_bucket}")
+            with open_s3_upload_stream(
+                self.s3_client, processed_bucket, new_key, content_type, metadata
+            ) as stream:
+                yield stream
+            logger.info(f"Streamed image: {stream.report}")
+        except (BotoCoreError, ClientError) as e:
+            logger.error(
+                f"Failed to stream image: {new_key} to bucket: {processed_bucket}, due to: {e}"
+            )
+            raise ImageUploader.UploadFailed from e
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_if_exception_type(BotoCoreError),
+        reraise=True,
+    )
+    def copy_image(
+        self,
+        processed_bucket: str,
+        source_filename: str,
+        image_media: ImageMedia,
+        size: Size,
+        extension: Extension,
+    ) -> None:
+        """
+        Copy a variant processed for another filename to the image, inside the processed bucket.
+        Client errors, such as a variant that no longer exists, fail at once without retrying.
         """
-        Delete the file located at 'new_path' after upload, if it exists.
+        source_key = self._construct_new_key(source_filename, size, extension)
+        new_key = self._construct_new_key(image_media.filename, size, extension)
+
+        try:
+            copy_object_in_s3(self.s3_client, processed_bucket, source_key, new_key)
+            logger.info(f"Copied image: {source_key} to {new_key} in bucket: {processed_bucket}")
+        except ClientError as e:
+            logger.error(f"Failed to copy image: {source_key} to {new_key}, due to: {e}")
+            raise ImageUploader.UploadFailed from e
+
+    def find_missing_variants(
+        self, processed_bucket: str, image_media: ImageMedia, variants: Iterable[Variant]
+    ) -> Set[Variant]:
         """
-        if new_path.exists():
-            try:
-                new_path.unlink(missing_ok=True)
-                logger.info(f"Image file: {new_path} deleted after upload.")
-            except OSError as e:
-                logger.error(f"Error occurred while deleting image file: {new_path}, due to: {e}")
-        else:
-            logger.warning(f"Image file: {new_path} not found.")
+        Return the variants of the image that are not uploaded yet, from a single listing of
+        its prefix instead of a HEAD per variant.
+        """
+        keys = {
+            self._construct_new_key(image_media.filename, size, extension): (size, extension)
+            for size, extension in variants
+        }
+        try:
+            missing = find_missing_keys(
+                self.s3_client, processed_bucket, f"{image_media.filename}/", keys
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to list variants of: {image_media.filename}, due to: {e}")
+            return set(keys.values())
+        return {keys[key] for key in missing}
+
+    def delete_images(
+        self, processed_bucket: str, image_media: ImageMedia, variants: Iterable[Variant]
+    ) -> None:
+        """Delete variants of the image in a single request, such as previews of a failed job."""
+        keys = [
+            self._construct_new_key(image_media.filename, size, extension)
+            for size, extension in variants
+        ]
+        if not keys:
+            return
+        try:
+            self.s3_client.delete_objects(
+                Bucket=processed_bucket,
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+            )
+            logger.info(f"Deleted images: {keys} from bucket: {processed_bucket}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to delete variants of: {image_media.filename}, due to: {e}")
+
+    def clean_up(self, body: ImageSource) -> None:
+        """
+        Release the image after upload, deleting it from disk if it was written to a file.
+        """
+        if isinstance(body, Path) and not body.exists():
+            logger.warning(f"Image file: {body} not found.")
+            return
+
+        try:
+            release_image_source(body)
+            logger.info(f"Image: {body} released after upload.")
+        except OSError as e:
+            logger.error(f"Error occurred while releasing image: {body}, due to: {e}")
+
+    @staticmethod
+    def _get_content_type(extension: Extension) -> str:
+        """Return the full content type of a variant, such as image/webp."""
+        media_type = MediaFormatUtils.map_extension_to_media_type(extension=extension)
+        return MediaFormatUtils.get_content_type(media_type, extension)
 
     def _construct_new_key(self, filename: str, size: Size, extension: Extension) -> str:
         """Construct a new key based on the filename, size and format."""
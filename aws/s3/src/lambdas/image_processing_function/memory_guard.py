@@ -0,0 +1,204 @@
+import io
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Deque, Iterator, List, Optional, Set, Tuple
+
+from decode_planner import DecodeMethod, DecodePlan, DecodePlanner
+from image_backends import ImageBackend
+from PIL import Image as PILImage
+from pipeline import MAX_PENDING_VARIANTS
+from strip_reader import STRIP_ROWS
+from utils import ImageSource, Variant, get_env_int
+
+from shared.media import AspectRatio, Extension, Size
+from shared.media.constants import IMAGE_DIMENSIONS
+from shared.media.image_header import ImageHeader
+from shared.media.memory_estimator import (
+    MEMORY_HEADROOM,
+    MemoryEstimate,
+    estimate_peak_memory,
+    estimate_tiled_memory,
+    function_memory_bytes,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pixels of every frame of a source together, above which it is rejected without estimating
+# anything. It guards against decompression bombs, which are tiny files of huge images.
+MAX_SOURCE_PIXELS = get_env_int("MAX_SOURCE_PIXELS", default=400_000_000)
+
+# Still sources from this many pixels are resized in strips of rows whatever the memory, as
+# their full decode alone would take most of it
+TILED_MIN_PIXELS = get_env_int("TILED_MIN_PIXELS", default=50_000_000)
+
+FUNCTION_MEMORY_BYTES = function_memory_bytes()
+
+
+class MemoryStrategy(Enum):
+    """How a job is run, given the memory it is estimated to take."""
+
+    STANDARD = "standard"
+    TILED = "tiled"
+    LOW_MEMORY = "low_memory"
+    REJECT = "reject"
+
+
+@dataclass(frozen=True)
+class MemoryPlan:
+    strategy: MemoryStrategy
+    header: ImageHeader
+    decode_plan: DecodePlan
+    estimate: MemoryEstimate
+
+    def __str__(self):
+        return (
+            f"{self.strategy.value}, {self.header.width}x{self.header.height} {self.header.mode} "
+            f"x{self.header.frames} frames, estimated peak {self.estimate}"
+        )
+
+
+class MemoryGuard:
+    """
+    Checks a job fits in the memory of the function from the header of its source, before any
+    pixel is decoded. Still sources from TILED_MIN_PIXELS pixels are resized in strips of rows.
+    Other jobs too large to resize every variant at once run in low-memory mode, or in strips
+    when that takes less. Jobs that don't fit at all, or have more pixels than
+    MAX_SOURCE_PIXELS, are rejected. Jobs running at the same time in the process, such as
+    those of a batch, reserve their estimate from the memory they share before decoding.
+    """
+
+    def __init__(
+        self,
+        decode_planner: DecodePlanner,
+        memory_bytes: int = FUNCTION_MEMORY_BYTES,
+        max_source_pixels: int = MAX_SOURCE_PIXELS,
+        concurrent_variants: int = MAX_PENDING_VARIANTS,
+        tiled_min_pixels: int = TILED_MIN_PIXELS,
+        backend: Optional[ImageBackend] = None,
+    ):
+        self.decode_planner = decode_planner
+        self.backend = backend or ImageBackend()
+        self.memory_bytes = memory_bytes
+        self.max_source_pixels = max_source_pixels
+        self.concurrent_variants = concurrent_variants
+        self.tiled_min_pixels = tiled_min_pixels
+        self._reserved_bytes = 0
+        self._waiting: Deque[object] = deque()
+        self._condition = threading.Condition()
+
+    def check(self, source: ImageSource, variants: Set[Variant]) -> MemoryPlan:
+        sizes = list({size for size, _ in variants})
+        header, decode_plan, strips_plan = self.probe(source, sizes)
+
+        # Only GIF variants are animated, the others are stills of the first frame
+        if not any(extension is Extension.GIF for _, extension in variants):
+            header = replace(header, frames=1)
+
+        targets = [IMAGE_DIMENSIONS[AspectRatio.AR_1_BY_1][size].as_tuple() for size in sizes]
+        source_bytes = source.getbuffer().nbytes if isinstance(source, io.BytesIO) else 0
+
+        def estimate(concurrent_variants: int) -> MemoryEstimate:
+            return estimate_peak_memory(
+                header,
+                targets,
+                decode_plan.decoded_size,
+                full_decode_first=decode_plan.method is DecodeMethod.REDUCE,
+                concurrent_variants=concurrent_variants,
+                source_bytes=source_bytes,
+            )
+
+        def tiled_estimate() -> MemoryEstimate:
+            streamed = strips_plan.method is DecodeMethod.STRIPS
+            return estimate_tiled_memory(
+                header,
+                targets,
+                strips_plan.decoded_size,
+                full_decode_first=strips_plan.method is DecodeMethod.REDUCE,
+                strip_rows=STRIP_ROWS if streamed else None,
+                source_bytes=source_bytes,
+            )
+
+        standard = estimate(self.concurrent_variants + 1)
+        if header.pixels * header.frames > self.max_source_pixels:
+            return MemoryPlan(MemoryStrategy.REJECT, header, decode_plan, standard)
+
+        still = header.frames == 1
+        if still and header.pixels >= self.tiled_min_pixels:
+            return self._plan(MemoryStrategy.TILED, header, strips_plan, tiled_estimate())
+        if standard.fits(self.memory_bytes):
+            return MemoryPlan(MemoryStrategy.STANDARD, header, decode_plan, standard)
+
+        # Resized one at a time, the cascade keeps only the variant it resizes from. Stills
+        # are resized in strips instead when that takes less.
+        low_memory = estimate(2)
+        if still:
+            tiled = tiled_estimate()
+            if tiled.peak_bytes < low_memory.peak_bytes:
+                return self._plan(MemoryStrategy.TILED, header, strips_plan, tiled)
+        return self._plan(MemoryStrategy.LOW_MEMORY, header, decode_plan, low_memory)
+
+    def _plan(
+        self,
+        strategy: MemoryStrategy,
+        header: ImageHeader,
+        decode_plan: DecodePlan,
+        estimate: MemoryEstimate,
+    ) -> MemoryPlan:
+        """Plan the job with the strategy when its estimate fits in memory, reject it otherwise."""
+        if not estimate.fits(self.memory_bytes):
+            strategy = MemoryStrategy.REJECT
+        return MemoryPlan(strategy, header, decode_plan, estimate)
+
+    @contextmanager
+    def reserve(self, plan: MemoryPlan) -> Iterator[None]:
+        """
+        Reserve the estimated peak memory of a planned job for as long as it runs. Every plan
+        fits in memory on its own, so a job waits until the jobs running alongside it leave
+        enough for it, running alone at worst. Jobs are let in in the order they reserve, so
+        large ones aren't starved by smaller ones.
+        """
+        # The runtime is shared by every job, so it is taken from the memory once
+        runtime_bytes = plan.estimate.runtime_bytes
+        capacity = int(self.memory_bytes * MEMORY_HEADROOM) - runtime_bytes
+        reserved = max(0, min(plan.estimate.peak_bytes - runtime_bytes, capacity))
+
+        ticket = object()
+        with self._condition:
+            self._waiting.append(ticket)
+            if len(self._waiting) > 1 or self._reserved_bytes + reserved > capacity:
+                logger.info(
+                    f"Waiting for {reserved // (1024 * 1024)} MB, "
+                    f"{self._reserved_bytes // (1024 * 1024)} MB reserved by other jobs"
+                )
+            self._condition.wait_for(
+                lambda: self._waiting[0] is ticket and self._reserved_bytes + reserved <= capacity
+            )
+            self._waiting.popleft()
+            self._reserved_bytes += reserved
+            # The next job in line may fit alongside this one
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._reserved_bytes -= reserved
+                self._condition.notify_all()
+
+    def probe(
+        self, source: ImageSource, sizes: List[Size]
+    ) -> Tuple[ImageHeader, DecodePlan, DecodePlan]:
+        """
+        Read the header of the source with the image backend and plan its decode, whole and in
+        strips, without decoding any pixels.
+        """
+        header = self.backend.metadata(source)
+        with PILImage.open(source) as img:
+            decode_plan = self.decode_planner.plan(img, sizes)
+            strips_plan = self.decode_planner.plan(img, sizes, strips=True)
+        if isinstance(source, io.BytesIO):
+            source.seek(0)
+        return header, decode_plan, strips_plan
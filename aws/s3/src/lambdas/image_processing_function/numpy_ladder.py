@@ -0,0 +1,144 @@
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image as PILImage
+from resampling import Resampling, ResamplingProfile
+from tiled_resize import PREMULTIPLIED_MODES
+
+# Dimensions and resampling profile of every variant of a ladder
+LadderTargets = List[Tuple[Tuple[int, int], ResamplingProfile]]
+
+# Modes averaged as 8 bit bands, colours of those with alpha weighted by it
+LADDER_MODES = {"L", "LA", "RGB", "RGBA"}
+
+# How close to a Box target the pyramid gets before Box takes over, unless the target is a
+# level of the pyramid. Closer, the block boundaries of the levels show in the targets.
+BOX_REDUCING_GAP = 2.0
+
+
+class _Pyramid:
+    """
+    Levels of 2x2 block averages of a base image, computed on demand. Only the last level is
+    kept, as an array of premultiplied pixels for images with alpha, or None while it is the
+    base itself.
+    """
+
+    def __init__(self, base: PILImage.Image, internal_mode: str):
+        self.base = base
+        self.internal_mode = internal_mode
+        self.level: Optional[np.ndarray] = None
+        self.factors = (1, 1)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        if self.level is None:
+            return self.base.size
+        return self.level.shape[1], self.level.shape[0]
+
+    def reduce(self, dimensions: Tuple[int, int], gap: float, exact: bool) -> None:
+        """
+        Halve the last level in each direction while it stays at least gap times the
+        dimensions, or, when exact, while it is the dimensions times a power of two.
+        """
+        while True:
+            width, height = self.size
+            halve_x = _should_halve(width, dimensions[0], gap, exact)
+            halve_y = _should_halve(height, dimensions[1], gap, exact)
+            if not (halve_x or halve_y):
+                return
+            if self.level is None:
+                self.level = _to_array(self._convert(self.base))
+            self.level = _halve(self.level, halve_x, halve_y)
+            self.factors = (self.factors[0] * (1 + halve_x), self.factors[1] * (1 + halve_y))
+
+    def resample(self, dimensions: Tuple[int, int], resample: Resampling) -> PILImage.Image:
+        """Resample the last level to the dimensions, unless it is the target already."""
+        if self.level is None:
+            img = self._convert(self.base)
+        else:
+            img = _to_image(self.level, self.internal_mode)
+        # Like Image.reduce, the last block of odd sizes is partly outside the base, so the
+        # filter resamples the box the base covers
+        box = (0, 0, self.base.width / self.factors[0], self.base.height / self.factors[1])
+        if box != (0, 0, *dimensions):
+            img = img.resize(dimensions, resample, box=box)
+        return img if img.mode == self.base.mode else img.convert(self.base.mode)
+
+    def _convert(self, img: PILImage.Image) -> PILImage.Image:
+        return img if img.mode == self.internal_mode else img.convert(self.internal_mode)
+
+
+def iter_ladder(img: PILImage.Image, targets: LadderTargets) -> Iterator[PILImage.Image]:
+    """
+    Resize an image to every target, largest first, from a single pyramid of 2x2 block
+    averages. Each level halves the previous one while it stays at least the reducing gap of
+    the next target above it, which is how Image.reduce would have reduced it, and the target
+    is resampled from the level with its filter. Box targets that are levels of the pyramid
+    are those levels, handed over to the encoder as images mapping the array, without a copy
+    for the modes Pillow maps (L, RGB is unpacked to its four bytes per pixel once). Targets
+    without a reducing gap are resized from the source as usual, and like the cascade, the
+    pyramid starts over from them unless they were upscaled.
+    """
+    internal_mode = PREMULTIPLIED_MODES.get(img.mode, img.mode)
+    pyramid = _Pyramid(img, internal_mode)
+
+    for dimensions, profile in targets:
+        profile = profile.for_source(img.size, dimensions)
+        box = profile.filter is Resampling.BOX
+        gap = profile.reducing_gap or (BOX_REDUCING_GAP if box else None)
+        if gap is None:
+            variant = profile.resize(img, dimensions)
+            if variant.width <= img.width and variant.height <= img.height:
+                pyramid = _Pyramid(variant, internal_mode)
+            yield variant
+            continue
+
+        pyramid.reduce(dimensions, gap, exact=box)
+        yield pyramid.resample(dimensions, profile.filter)
+
+
+def _should_halve(side: int, target: int, gap: float, exact: bool) -> bool:
+    if side // 2 >= target * gap:
+        return True
+    # Box averages of power of two factors are the 2x2 averages themselves
+    factor, remainder = divmod(side, target)
+    return exact and not remainder and factor > 1 and factor & (factor - 1) == 0
+
+
+def _halve(level: np.ndarray, halve_x: bool, halve_y: bool) -> np.ndarray:
+    """
+    Average every 2x2 block, or pair of pixels in one direction, rounding half up as
+    Image.reduce does. The last row or column of odd sizes is repeated to complete its block.
+    """
+    if halve_y and level.shape[0] % 2:
+        level = np.concatenate([level, level[-1:]], axis=0)
+    if halve_x and level.shape[1] % 2:
+        level = np.concatenate([level, level[:, -1:]], axis=1)
+
+    # Pairs of rows are added as strided slices and pairs of pixels along the reshaped rows,
+    # both running over contiguous memory, which is much faster than averaging the axes of a
+    # 2x2 block view
+    if halve_y:
+        sums = level[0::2].astype(np.uint16)
+        sums += level[1::2]
+    else:
+        sums = level.astype(np.uint16)
+    if halve_x:
+        height, width, bands = sums.shape
+        pairs = sums.reshape(height, width // 2, 2, bands)
+        sums = pairs[:, :, 0] + pairs[:, :, 1]
+
+    count = (1 + halve_x) * (1 + halve_y)
+    sums += count // 2
+    sums >>= count.bit_length() - 1
+    return sums.astype(np.uint8)
+
+
+def _to_array(img: PILImage.Image) -> np.ndarray:
+    return np.asarray(img).reshape(img.height, img.width, len(img.getbands()))
+
+
+def _to_image(level: np.ndarray, mode: str) -> PILImage.Image:
+    """Map the contiguous pixels of a level as a read-only image, copying those Pillow can't."""
+    height, width = level.shape[:2]
+    return PILImage.frombuffer(mode, (width, height), level, "raw", mode, 0, 1)
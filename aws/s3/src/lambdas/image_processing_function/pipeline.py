@@ -0,0 +1,177 @@
+import concurrent.futures
+import io
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Union
+
+from executors import available_cpus
+from image_media import ImageMedia
+from image_uploader import ImageUploader
+from utils import ImageSource, get_env_int, release_image_source
+
+from shared.media import Extension, Size
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_WORKERS = get_env_int("UPLOAD_WORKERS", default=4)
+
+# Variants resized but not yet uploaded. The default lets every upload worker be busy while
+# each CPU encodes the next variant; once reached, producing more variants blocks.
+MAX_PENDING_VARIANTS = get_env_int(
+    "MAX_PENDING_VARIANTS", default=UPLOAD_WORKERS + available_cpus()
+)
+
+
+# Encoded bodies of a variant, by extension. None stands for a body the encode task streamed to
+# S3 itself, and bytes for bodies encoded by process pool workers.
+EncodedBodies = Dict[Extension, Union[ImageSource, bytes, None]]
+
+
+class VariantPipeline:
+    """
+    Encodes variants on the CPU executor and uploads them on a separate I/O thread pool, so
+    encoding the next variant overlaps the upload of the previous one. Submitting blocks while
+    MAX_PENDING_VARIANTS variants are still waiting to be encoded or uploaded, which bounds the
+    memory held by the job when S3 is slow.
+    """
+
+    def __init__(
+        self,
+        cpu_executor: concurrent.futures.Executor,
+        uploader: ImageUploader,
+        processed_bucket: str,
+        image_media: ImageMedia,
+        upload_workers: int = UPLOAD_WORKERS,
+        max_pending: int = MAX_PENDING_VARIANTS,
+        metadata: Optional[Dict[str, str]] = None,
+    ):
+        """Every variant is uploaded with the given user metadata, such as its placeholder."""
+        self.cpu_executor = cpu_executor
+        self.uploader = uploader
+        self.processed_bucket = processed_bucket
+        self.image_media = image_media
+        self.metadata = metadata
+        self._upload_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=upload_workers, thread_name_prefix="upload"
+        )
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._stages: List[concurrent.futures.Future] = []
+
+    def submit(self, size: Size, encode: Callable[..., EncodedBodies], *args) -> None:
+        """
+        Encode a variant on the CPU executor and upload it once encoded. The encode task returns
+        the bodies of the variant by extension, so one resize can be encoded in several formats.
+        """
+        self._raise_first_error()
+        self._pending.acquire()
+
+        stage: concurrent.futures.Future = concurrent.futures.Future()
+        self._stages.append(stage)
+        try:
+            encoded = self.cpu_executor.submit(encode, *args)
+        except BaseException as e:
+            self._finish(stage, e)
+            raise
+        encoded.add_done_callback(lambda future: self._on_encoded(size, stage, future))
+
+    def submit_encoded(self, size: Size, bodies: Dict[Extension, ImageSource]) -> None:
+        """Upload a variant that was already encoded by the caller."""
+        try:
+            self._raise_first_error()
+        except BaseException:
+            for body in bodies.values():
+                release_image_source(body)
+            raise
+        self._pending.acquire()
+
+        stage: concurrent.futures.Future = concurrent.futures.Future()
+        self._stages.append(stage)
+        self._upload_encoded(size, stage, bodies)
+
+    def wait(self) -> None:
+        """Wait for every submitted variant to be uploaded, raising the first failure."""
+        for stage in self._stages:
+            stage.result()
+
+    def close(self) -> None:
+        concurrent.futures.wait(self._stages)
+        self._upload_executor.shutdown(wait=True)
+
+    def __enter__(self) -> "VariantPipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _on_encoded(
+        self, size: Size, stage: concurrent.futures.Future, encoded: concurrent.futures.Future
+    ) -> None:
+        """Hand the encoded bodies of a variant over to the upload pool."""
+        if encoded.exception() is not None:
+            self._finish(stage, encoded.exception())
+            return
+
+        bodies = {
+            extension: io.BytesIO(body) if isinstance(body, bytes) else body
+            for extension, body in encoded.result().items()
+            if body is not None
+        }
+        self._upload_encoded(size, stage, bodies)
+
+    def _upload_encoded(
+        self, size: Size, stage: concurrent.futures.Future, bodies: Dict[Extension, ImageSource]
+    ) -> None:
+        """Upload every body of a variant, completing its stage once all of them are done."""
+        if not bodies:
+            self._finish(stage, None)
+            return
+
+        uploads: List[concurrent.futures.Future] = []
+        items = list(bodies.items())
+        for index, (extension, body) in enumerate(items):
+            try:
+                uploads.append(self._upload_executor.submit(self._upload, body, size, extension))
+            except RuntimeError as e:
+                for _, unsent in items[index:]:
+                    release_image_source(unsent)
+                self._finish(stage, e)
+                return
+
+        lock = threading.Lock()
+        pending = [len(uploads)]
+
+        def on_uploaded(_: concurrent.futures.Future) -> None:
+            with lock:
+                pending[0] -= 1
+                if pending[0]:
+                    return
+            errors = [upload.exception() for upload in uploads if upload.exception()]
+            self._finish(stage, errors[0] if errors else None)
+
+        for upload in uploads:
+            upload.add_done_callback(on_uploaded)
+
+    def _upload(self, body: ImageSource, size: Size, extension: Extension) -> None:
+        self.uploader.upload_image(
+            body,
+            self.processed_bucket,
+            self.image_media,
+            size,
+            extension,
+            self.metadata,
+        )
+
+    def _finish(self, stage: concurrent.futures.Future, error: Optional[BaseException]) -> None:
+        """Complete the stage with the outcome of its last step and free its pending slot."""
+        self._pending.release()
+        if error is not None:
+            stage.set_exception(error)
+        else:
+            stage.set_result(None)
+
+    def _raise_first_error(self) -> None:
+        """Stop producing variants as soon as one of them failed."""
+        for stage in self._stages:
+            error = stage.exception() if stage.done() else None
+            if error is not None:
+                raise error
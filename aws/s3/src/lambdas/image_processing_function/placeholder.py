@@ -0,0 +1,132 @@
+import math
+from typing import List, Tuple
+
+from PIL import Image as PILImage
+from utils import get_env_flag
+
+# Store a BlurHash of the image with every variant, so clients can paint a placeholder before
+# any variant is loaded
+PLACEHOLDER_ENABLED = get_env_flag("PLACEHOLDER_ENABLED", default=True)
+
+# Cosine components of the BlurHash along the long and the short side of the image
+BLURHASH_COMPONENTS = (4, 3)
+
+# Side of the sample the BlurHash is computed from, far finer than its components
+SAMPLE_SIDE = 32
+
+BASE83_CHARACTERS = (
+    "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+)
+
+# Linear intensity of every 8 bit sRGB value
+SRGB_TO_LINEAR = [
+    value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+    for value in (index / 255 for index in range(256))
+]
+
+
+def create_sample(img: PILImage.Image) -> PILImage.Image:
+    """
+    Box average the image down to a square RGB sample. The sample squeezes the image like the
+    variants do, which doesn't matter as a BlurHash is decoded at any aspect ratio.
+    """
+    if img.mode not in ("L", "LA", "RGB", "RGBA"):
+        img = img.convert("RGBA")
+    dimensions = (SAMPLE_SIDE, SAMPLE_SIDE)
+    if img.size != dimensions:
+        # Reducing by an integer factor first is several times faster than a Box resize alone
+        img = img.resize(dimensions, PILImage.Resampling.BOX, reducing_gap=2.0)
+    return img.convert("RGB")
+
+
+def encode_blurhash(img: PILImage.Image, source_size: Tuple[int, int]) -> str:
+    """
+    Encode the BlurHash of an image, given the size of the source it was resized from, which
+    tells its long side. See https://github.com/woltapp/blurhash for the algorithm.
+    """
+    sample = create_sample(img)
+    long_components, short_components = BLURHASH_COMPONENTS
+    if source_size[0] >= source_size[1]:
+        components_x, components_y = long_components, short_components
+    else:
+        components_x, components_y = short_components, long_components
+
+    width, height = sample.size
+    pixels = [SRGB_TO_LINEAR[value] for value in sample.tobytes()]
+    cosines_x = _cosines(components_x, width)
+    cosines_y = _cosines(components_y, height)
+
+    # The basis functions are separable, so rows are projected on the horizontal cosines first
+    rows = []
+    row_length = width * 3
+    for start in range(0, len(pixels), row_length):
+        row = pixels[slice(start, start + row_length)]
+        rows.append(
+            [
+                [
+                    sum(cosine * row[x * 3 + channel] for x, cosine in enumerate(cosines))
+                    for channel in range(3)
+                ]
+                for cosines in cosines_x
+            ]
+        )
+
+    factors = []
+    for j in range(components_y):
+        for i in range(components_x):
+            normalisation = (1 if i == j == 0 else 2) / (width * height)
+            factors.append(
+                [
+                    normalisation
+                    * sum(cosine * rows[y][i][channel] for y, cosine in enumerate(cosines_y[j]))
+                    for channel in range(3)
+                ]
+            )
+    return _encode_factors(factors, components_x, components_y)
+
+
+def _cosines(components: int, side: int) -> List[List[float]]:
+    return [
+        [math.cos(math.pi * component * position / side) for position in range(side)]
+        for component in range(components)
+    ]
+
+
+def _encode_factors(factors: List[List[float]], components_x: int, components_y: int) -> str:
+    dc, ac = factors[0], factors[1:]
+    blurhash = _encode_base83((components_x - 1) + (components_y - 1) * 9, 1)
+
+    if ac:
+        actual_maximum = max(abs(value) for factor in ac for value in factor)
+        quantised_maximum = max(0, min(82, math.floor(actual_maximum * 166 - 0.5)))
+        maximum = (quantised_maximum + 1) / 166
+    else:
+        quantised_maximum, maximum = 0, 1
+    blurhash += _encode_base83(quantised_maximum, 1)
+
+    r, g, b = (_linear_to_srgb(value) for value in dc)
+    blurhash += _encode_base83((r << 16) + (g << 8) + b, 4)
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, math.floor(_sign_pow(value / maximum, 0.5) * 9 + 9.5)))
+            for value in factor
+        )
+        blurhash += _encode_base83(r * 19 * 19 + g * 19 + b, 2)
+    return blurhash
+
+
+def _encode_base83(value: int, length: int) -> str:
+    return "".join(
+        BASE83_CHARACTERS[value // 83 ** (length - position - 1) % 83] for position in range(length)
+    )
+
+
+def _linear_to_srgb(value: float) -> int:
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value: float, exponent: float) -> float:
+    return math.copysign(abs(value) ** exponent, value)
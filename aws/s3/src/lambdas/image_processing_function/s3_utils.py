@@ -1,6 +1,8 @@
 import logging
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Dict, Optional
+
+from shared.services.aws.s3.s3_multipart_upload import TRANSFER_CONFIG, MultipartUploadWriter
 
 logger = logging.getLogger(__name__)
 
@@ -10,20 +12,89 @@ def download_file_from_s3(s3_client: Any, bucket: str, key: str, destination: Pa
     Download a file from an S3 bucket
     """
     try:
-        s3_client.download_file(bucket, key, destination)
+        s3_client.download_file(bucket, key, destination, Config=TRANSFER_CONFIG)
     except Exception as e:
         logger.error(f"Failed to download file from S3: {e}")
         raise
 
 
 def upload_file_to_s3(
-    s3_client: Any, file_path: Path, bucket: str, key: str, content_type: str
+    s3_client: Any,
+    file_path: Path,
+    bucket: str,
+    key: str,
+    content_type: str,
+    metadata: Optional[Dict[str, str]] = None,
 ) -> None:
     """
     Uploads a file to an S3 bucket
     """
     try:
-        s3_client.upload_file(file_path, bucket, key, ExtraArgs={"ContentType": content_type})
+        s3_client.upload_file(
+            file_path,
+            bucket,
+            key,
+            ExtraArgs=_get_extra_args(content_type, metadata),
+            Config=TRANSFER_CONFIG,
+        )
     except Exception as e:
         logger.error(f"Failed to upload file to S3: {e}")
         raise
+
+
+def upload_fileobj_to_s3(
+    s3_client: Any,
+    fileobj: BinaryIO,
+    bucket: str,
+    key: str,
+    content_type: str,
+    metadata: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Uploads a file object (e.g. an in-memory buffer) to an S3 bucket
+    """
+    try:
+        s3_client.upload_fileobj(
+            fileobj,
+            bucket,
+            key,
+            ExtraArgs=_get_extra_args(content_type, metadata),
+            Config=TRANSFER_CONFIG,
+        )
+    except Exception as e:
+        logger.error(f"Failed to upload file object to S3: {e}")
+        raise
+
+
+def copy_object_in_s3(s3_client: Any, bucket: str, source_key: str, key: str) -> None:
+    """
+    Copies an object to a new key of the same S3 bucket, without downloading it
+    """
+    try:
+        s3_client.copy_object(
+            Bucket=bucket, Key=key, CopySource={"Bucket": bucket, "Key": source_key}
+        )
+    except Exception as e:
+        logger.error(f"Failed to copy object in S3: {e}")
+        raise
+
+
+def open_s3_upload_stream(
+    s3_client: Any,
+    bucket: str,
+    key: str,
+    content_type: str,
+    metadata: Optional[Dict[str, str]] = None,
+) -> MultipartUploadWriter:
+    """
+    Open a writable stream uploading to an S3 bucket in parts while it is written to
+    """
+    return MultipartUploadWriter(s3_client, bucket, key, content_type, metadata=metadata)
+
+
+def _get_extra_args(content_type: str, metadata: Optional[Dict[str, str]]) -> Dict[str, Any]:
+    """Return the arguments of an upload describing the object, with its user metadata if any."""
+    extra_args: Dict[str, Any] = {"ContentType": content_type}
+    if metadata:
+        extra_args["Metadata"] = metadata
+    return extra_args
@@ -0,0 +1,155 @@
+import struct
+import zlib
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+import PIL
+from PIL import Image as PILImage
+from utils import get_env_int
+
+from shared.media.memory_estimator import DEFAULT_STRIP_ROWS
+
+# Source rows decoded and resized at a time by the tiled path
+STRIP_ROWS = get_env_int("STRIP_ROWS", default=DEFAULT_STRIP_ROWS)
+
+# Compressed bytes read from the file at a time
+READ_BYTES = 64 * 1024
+
+# Bits per pixel of the PNG modes whose rows Pillow stores with the layout of the file, so the
+# last row of a strip can be handed back to the decoder as is
+PNG_PIXEL_BITS = {"1": 1, "L": 8, "P": 8, "LA": 16, "RGB": 24, "RGBA": 32}
+
+# Pillow versions whose private ImageFile.tile and ImageFile.fp the PNG strips are read with
+# have the layout expected here. Other versions decode PNGs whole.
+STRIP_PILLOW_VERSIONS = ((9, 1), (13, 0))
+
+
+def _parse_version(version: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in version.split(".")[:2] if part.isdigit())
+
+
+PILLOW_VERSION = _parse_version(PIL.__version__)
+
+
+def crop_rows(img: PILImage.Image, top: int, bottom: Optional[int] = None) -> PILImage.Image:
+    return img.crop((0, top, img.width, img.height if bottom is None else bottom))
+
+
+def can_decode_strips(img: PILImage.Image) -> bool:
+    """
+    Return whether the rows of an opened, not yet decoded, image can be decoded a strip at a
+    time: still, non-interlaced PNGs of 8 bits per channel or 1 bit per pixel.
+    """
+    if img.format != "PNG" or img.info.get("interlace") or getattr(img, "is_animated", False):
+        return False
+    tile = _get_png_tile(img)
+    if tile is None:
+        return False
+    codec, _, rawmode = tile
+    return codec == "zip" and rawmode == img.mode and img.mode in PNG_PIXEL_BITS
+
+
+def iter_strips(img: PILImage.Image, rows: int = STRIP_ROWS) -> Iterator[PILImage.Image]:
+    """Yield the rows of a decoded image, a strip at a time."""
+    for top in range(0, img.height, rows):
+        yield crop_rows(img, top, min(top + rows, img.height))
+
+
+def iter_png_strips(img: PILImage.Image, rows: int = STRIP_ROWS) -> Iterator[PILImage.Image]:
+    """
+    Decode the rows of an opened PNG a strip at a time, without ever holding the whole image.
+    Its IDAT data is inflated incrementally and each strip of filtered rows is decoded by
+    Pillow, rewrapped in a stored zlib stream. The filters of the first row of a strip refer to
+    the last row of the previous one, which leads the strip unfiltered and is cropped off.
+    """
+    tile = _get_png_tile(img)
+    if tile is None:
+        raise ValueError("The rows of this image can't be decoded in strips")
+    width, height = img.size
+    row_bytes = 1 + (width * PNG_PIXEL_BITS[img.mode] + 7) // 8
+    # ImageFile.fp is private to Pillow, the file the image was opened from
+    inflater = _IdatInflater(img.fp, tile[1])  # type: ignore[attr-defined]
+
+    previous = b""
+    for top in range(0, height, rows):
+        count = min(rows, height - top)
+        data = inflater.read(count * row_bytes)
+        if previous:
+            # Filter type 0 leaves the row as is
+            data = b"\0" + previous + data
+            count += 1
+
+        try:
+            strip = PILImage.frombytes(
+                img.mode, (width, count), zlib.compress(data, 0), "zip", img.mode
+            )
+        except ValueError as e:
+            raise OSError(f"Corrupted PNG rows from row {top}: {e}") from e
+
+        if previous:
+            strip = crop_rows(strip, 1)
+        previous = crop_rows(strip, strip.height - 1).tobytes()
+        yield strip
+
+
+def _get_png_tile(img: PILImage.Image) -> Optional[Tuple[str, int, str]]:
+    """
+    Return the codec, data offset and raw mode of the single tile of an opened PNG, when the
+    Pillow version is known to lay it out so, or None to decode the image whole.
+    """
+    oldest, newest = STRIP_PILLOW_VERSIONS
+    if not oldest <= PILLOW_VERSION < newest:
+        return None
+    # ImageFile.tile is private to Pillow, a list of (codec, extents, offset, args) tuples
+    tiles = getattr(img, "tile", None)
+    if not isinstance(tiles, list) or len(tiles) != 1:
+        return None
+    tile = tiles[0]
+    if not isinstance(tile, tuple) or len(tile) != 4:
+        return None
+    codec, _, offset, rawmode = tile
+    if not isinstance(codec, str) or not isinstance(offset, int) or not isinstance(rawmode, str):
+        return None
+    return codec, offset, rawmode
+
+
+class _IdatInflater:
+    """Inflates the concatenated data of the IDAT chunks of a PNG, as many bytes at a time."""
+
+    def __init__(self, fp: BinaryIO, offset: int):
+        self._chunks = self._iter_idat(fp, offset)
+        self._decompressor = zlib.decompressobj()
+
+    def read(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            compressed = self._decompressor.unconsumed_tail
+            if not compressed:
+                compressed = next(self._chunks, b"")
+                if not compressed:
+                    raise OSError("image file is truncated")
+            try:
+                data += self._decompressor.decompress(compressed, size - len(data))
+            except zlib.error as e:
+                raise OSError(f"Corrupted PNG data: {e}") from e
+        return bytes(data)
+
+    @staticmethod
+    def _iter_idat(fp: BinaryIO, offset: int) -> Iterator[bytes]:
+        """Yield the data of consecutive IDAT chunks, the first starting at offset."""
+        # The offset Pillow gives is the start of the data, after the length and type
+        fp.seek(offset - 8)
+        while True:
+            header = fp.read(8)
+            if len(header) < 8:
+                return
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type != b"IDAT":
+                return
+            while length:
+                data = fp.read(min(length, READ_BYTES))
+                if not data:
+                    return
+                length -= len(data)
+                yield data
+            # CRC
+            fp.read(4)
@@ -0,0 +1,124 @@
+from typing import Optional, Tuple
+
+from PIL import Image as PILImage
+from resampling import Resampling, ResamplingProfile
+from strip_reader import crop_rows
+
+# Modes Pillow resizes with premultiplied alpha
+PREMULTIPLIED_MODES = {"LA": "La", "RGBA": "RGBa"}
+
+
+def stack_rows(top: Optional[PILImage.Image], bottom: PILImage.Image) -> PILImage.Image:
+    """Return an image of the rows of top followed by the rows of bottom."""
+    if top is None:
+        return bottom
+    stacked = PILImage.new(bottom.mode, (bottom.width, top.height + bottom.height))
+    stacked.paste(top, (0, 0))
+    stacked.paste(bottom, (0, top.height))
+    return stacked
+
+
+class StripResizer:
+    """
+    Resizes an image fed as consecutive strips of rows to one target, producing the same pixels
+    as ResamplingProfile.resize on the whole image. It follows Image.resize step by step: rows
+    are premultiplied and reduced by the integer factor of the reducing gap, in blocks aligned
+    on the top of the image. Pillow resamples each row horizontally on its own, so every strip
+    is resized to the target width as it comes, and the narrow rows are resampled vertically
+    once the last strip is in, with the very coefficients of a one-shot resize. Memory holds a
+    strip of the source and the rows of the target width instead of the whole image.
+    """
+
+    def __init__(
+        self,
+        source: PILImage.Image,
+        dimensions: Tuple[int, int],
+        profile: ResamplingProfile,
+    ):
+        """The source is only read for its size, mode, palette and info, it needs no pixels."""
+        mode = source.mode
+        self.mode = mode
+        self.dimensions = dimensions
+        self.source_height = source.height
+        self.info = source.info.copy()
+        self.palette = source.palette.copy() if source.palette else None
+        profile = profile.for_source(source.size, dimensions)
+
+        self.filter = profile.filter
+        if mode in ("1", "P"):
+            self.filter = Resampling.NEAREST
+        self.internal_mode = mode
+        if self.filter is not Resampling.NEAREST:
+            self.internal_mode = PREMULTIPLIED_MODES.get(mode, mode)
+
+        # Image.resize leaves out the reducing gap when it resizes premultiplied alpha
+        width, height = source.size
+        self.factor = (1, 1)
+        reduces = self.filter is not Resampling.NEAREST and self.internal_mode == mode
+        if profile.reducing_gap is not None and reduces:
+            self.factor = (
+                int(width / dimensions[0] / profile.reducing_gap) or 1,
+                int(height / dimensions[1] / profile.reducing_gap) or 1,
+            )
+        factor_x, factor_y = self.factor
+        # Image.resize resamples the reduced image from a box of the unrounded reduced size
+        self.box_width = width / factor_x
+        self.box_height = height / factor_y
+
+        self.rows = PILImage.new(self.internal_mode, (dimensions[0], -(-height // factor_y)))
+        self.rows_read = 0
+        self.rows_resized = 0
+        # Source rows waiting for a complete block of the reduction
+        self.unreduced: Optional[PILImage.Image] = None
+
+    def feed(self, strip: PILImage.Image) -> None:
+        """Add the next rows of the source, resizing them to the target width."""
+        self.rows_read += strip.height
+        if strip.mode != self.internal_mode:
+            strip = strip.convert(self.internal_mode)
+        reduced = self._reduce(strip)
+        if reduced is None:
+            return
+
+        # With the box covering every row at their own height, only the horizontal pass runs
+        resized = reduced.resize(
+            (self.dimensions[0], reduced.height),
+            self.filter,
+            box=(0, 0, self.box_width, reduced.height),
+        )
+        self.rows.paste(resized, (0, self.rows_resized))
+        self.rows_resized += reduced.height
+
+    def result(self) -> PILImage.Image:
+        """Return the resized image, once every row of the source was fed."""
+        if self.rows_read < self.source_height:
+            raise ValueError(
+                f"Only {self.rows_read} of {self.source_height} rows of the source were fed"
+            )
+        # The box covers every column at its own width, so only the vertical pass runs
+        resized = self.rows.resize(
+            self.dimensions, self.filter, box=(0, 0, self.dimensions[0], self.box_height)
+        )
+        if self.internal_mode != self.mode:
+            resized = resized.convert(self.mode)
+        resized.info = self.info
+        if self.palette is not None:
+            # Rows were resized with whatever palette the strips had, the source one is realized
+            # on the next load
+            resized.palette = self.palette
+            resized.palette.dirty = 1
+        return resized
+
+    def _reduce(self, strip: PILImage.Image) -> Optional[PILImage.Image]:
+        """Reduce the complete blocks of rows, keeping the rest until the next strip."""
+        if self.factor == (1, 1):
+            return strip
+
+        rows = stack_rows(self.unreduced, strip)
+        complete = rows.height
+        if self.rows_read < self.source_height:
+            complete -= rows.height % self.factor[1]
+        self.unreduced = crop_rows(rows, complete) if complete < rows.height else None
+        if complete == 0:
+            return None
+        return crop_rows(rows, 0, complete).reduce(self.factor)
@@ -1,13 +1,14 @@
 import logging
 import mimetypes
-import uuid
+import os
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Tuple, Union
 
 from botocore.exceptions import BotoCoreError, ClientError
 from exceptions import S3AccessError, UnsupportedImageFormatError
 
-from shared.media import EXTENSION_ALIAS_MAP, MediaFormatUtils
+from shared.media import EXTENSION_ALIAS_MAP, Extension, MediaFormatUtils, Size
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 # from enums import ImageFormat
 
@@ -15,15 +16,46 @@ from shared.media import EXTENSION_ALIAS_MAP, MediaFormatUtils
 logger = logging.getLogger(__name__)
 TEMP_DIR = Path("/tmp")
 
+# Images are either held in memory or spilled to a temporary file
+ImageSource = Union[Path, BinaryIO]
 
-def get_content_type(s3_client: Any, bucket: str, key: str) -> str:
+# A processed image: one size in one extension
+Variant = Tuple[Size, Extension]
+
+
+def get_env_flag(name: str, default: bool) -> bool:
+    """
+    Read a boolean flag from the environment, falling back to the default when it is not set.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_env_int(name: str, default: int) -> int:
+    """
+    Read an integer from the environment, falling back to the default when it is not set.
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return int(value)
+
+
+# Keep downloaded and encoded images in memory, spilling to TEMP_DIR above IN_MEMORY_MAX_BYTES
+IN_MEMORY_PIPELINE_ENABLED = get_env_flag("IN_MEMORY_PIPELINE_ENABLED", default=True)
+IN_MEMORY_MAX_BYTES = get_env_int("IN_MEMORY_MAX_BYTES", default=64 * 1024 * 1024)
+
+
+def get_object_metadata(s3_client: Any, bucket: str, key: str) -> ObjectMetadata:
     """
-    Get the content type of the file.
+    Get the metadata (content type, size, ETag and last modified) of the file with a HEAD.
 
     :param s3_client: The S3 client
     :param bucket: The name of the S3 bucket
     :param key: The key of the file in the S3 bucket
-    :return: Content type as a string.
+    :return: The object metadata.
     :raises S3AccessError: If there is an error accessing the S3 bucket.
     """
     try:
@@ -32,11 +64,10 @@ def get_content_type(s3_client: Any, bucket: str, key: str) -> str:
         logger.error(f"Failed to access S3 object with key {key} in bucket {bucket}: {e}")
         raise S3AccessError(bucket, key) from e
 
-    content_type = response.get("ContentType")
-    if content_type is None:
+    if response.get("ContentType") is None:
         raise KeyError(f"No ContentType found for S3 object with key {key} in bucket {bucket}")
 
-    return content_type
+    return ObjectMetadata.from_head_response(response)
 
 
 def get_extension_from_content_type(content_type: str) -> str:
@@ -56,7 +87,7 @@ def get_extension_from_content_type(content_type: str) -> str:
     extension = extension.lstrip(".")
     extension = EXTENSION_ALIAS_MAP.get(extension, extension)
 
-    if MediaFormatUtils.is_extension_allowed(extension):
+    if not MediaFormatUtils.is_extension_allowed(extension):
         logger.warning(f"Unsupported extension: {extension}")
         raise UnsupportedImageFormatError(f"Unsupported extension: {extension}")
     assert extension is not None, "extension should not be None at this point"
@@ -64,8 +95,11 @@ def get_extension_from_content_type(content_type: str) -> str:
     return extension
 
 
-def create_temp_path(filename: str, extension: str) -> Path:
+def release_image_source(source: ImageSource) -> None:
     """
-    Create a temporary path for a file with the given filename and extension.
+    Release an image source, deleting it from disk when it was spilled to a temporary file.
     """
-    return TEMP_DIR / f"{uuid.uuid4()}_{filename}.{extension}"
+    if isinstance(source, Path):
+        source.unlink(missing_ok=True)
+    else:
+        source.close()
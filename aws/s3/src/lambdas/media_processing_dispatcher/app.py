@@ -1,31 +1,110 @@
 import json
 import logging
 import os
+from dataclasses import replace
 from http import HTTPStatus
 
-import boto3
-
-from shared.media import Extension, Size
+from botocore.exceptions import BotoCoreError, ClientError
+
+from shared.media import AspectRatio, Extension, Size
+from shared.media.constants import IMAGE_DIMENSIONS
+from shared.media.image_header import HEADER_PROBE_BYTES, read_image_header
+from shared.media.memory_estimator import (
+    DEFAULT_FUNCTION_MEMORY_MB,
+    DEFAULT_STRIP_ROWS,
+    MB,
+    estimate_peak_memory,
+    estimate_tiled_memory,
+)
 from shared.services.aws.api.api_base_service import ApiBaseService
+from shared.services.aws.client_provider import get_client
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Formats every image is generated in, all of them encoded from a single decode
+IMAGE_OUTPUT_EXTENSIONS = [
+    extension.strip().upper()
+    for extension in os.getenv("IMAGE_OUTPUT_EXTENSIONS", "JPEG,WEBP,AVIF").split(",")
+    if extension.strip()
+]
+
+
+# When set, image jobs are queued for the image processing function instead of invoking it per
+# upload, so upload bursts are absorbed by the queue
+IMAGE_PROCESSING_QUEUE_URL = os.getenv("IMAGE_PROCESSING_QUEUE_URL")
+
+# Images estimated not to fit in the memory of the image processing function, even resized one
+# variant at a time, are sent to the large image processing function instead when it is set
+IMAGE_PROCESSING_MEMORY_BYTES = (
+    int(os.getenv("IMAGE_PROCESSING_MEMORY_MB", DEFAULT_FUNCTION_MEMORY_MB)) * MB
+)
+LARGE_IMAGE_PROCESSING_FUNCTION_ARN = os.getenv("LARGE_IMAGE_PROCESSING_FUNCTION_ARN")
 
-def get_content_type(bucket_name, key):
-    s3 = boto3.client("s3")
+# Stills smaller than this are sent to the image processing function without probing their
+# header, saving a request per upload. At the compression of photos they decode far within its
+# memory, and the function checks the header of every image again, resizing the rare exceptions
+# in strips. Animations are always probed, as a small file may hold many frames.
+HEADER_PROBE_MIN_BYTES = int(os.getenv("HEADER_PROBE_MIN_BYTES", 4 * MB))
+
+
+def get_object_metadata(bucket_name, key):
+    s3 = get_client("s3")
     response = s3.head_object(Bucket=bucket_name, Key=key)
-    return response["ContentType"]
+    return ObjectMetadata.from_head_response(response)
 
 
 def get_filename(key):
     return key.split("/")[-1]
 
 
+def is_large_image(bucket_name, key, metadata, extensions, sizes):
+    """
+    Return whether the header of the image estimates it too large for the memory of the image
+    processing function. Stills under HEADER_PROBE_MIN_BYTES are assumed to fit without fetching
+    anything. Otherwise only the first bytes are fetched, and images whose header can't be
+    read or parsed here are left to the function, which checks them again before decoding. As
+    this only routes the job, failing to fetch the header never fails the dispatch. The estimate
+    assumes a full decode, as reduced decodes depend on the format, unless the rows of the image
+    can be decoded a strip at a time.
+    """
+    if metadata.size < HEADER_PROBE_MIN_BYTES and Extension.GIF.name not in extensions:
+        return False
+
+    s3 = get_client("s3")
+    try:
+        response = s3.get_object(
+            Bucket=bucket_name, Key=key, Range=f"bytes=0-{HEADER_PROBE_BYTES - 1}"
+        )
+        head = response["Body"].read()
+    except (BotoCoreError, ClientError) as e:
+        # Empty objects (InvalidRange), missing permissions and transient errors alike
+        logger.warning(f"Couldn't read the header of {key}, leaving it to the function: {e}")
+        return False
+    header = read_image_header(head, metadata.size)
+    if header is None:
+        return False
+    if Extension.GIF.name not in extensions:
+        header = replace(header, frames=1)
+
+    targets = [IMAGE_DIMENSIONS[AspectRatio.AR_1_BY_1][Size[size]].as_tuple() for size in sizes]
+    estimate = estimate_peak_memory(header, targets, source_bytes=metadata.size)
+    if header.frames == 1:
+        # Stills the function resizes in strips when that takes less
+        strip_rows = DEFAULT_STRIP_ROWS if header.strips else None
+        tiled = estimate_tiled_memory(
+            header, targets, strip_rows=strip_rows, source_bytes=metadata.size
+        )
+        estimate = min(estimate, tiled, key=lambda option: option.peak_bytes)
+    logger.info(f"Estimated peak memory of {key}: {estimate}")
+    return not estimate.fits(IMAGE_PROCESSING_MEMORY_BYTES)
+
+
 def lambda_handler(event, context):
     logger.info(event)
 
-    lambda_client = boto3.client("lambda")
+    lambda_client = get_client("lambda")
     image_processing_function_arn = os.environ.get("IMAGE_PROCESSING_FUNCTION_ARN")
     # video_processing_function_arn = os.environ.get("VIDEO_PROCESSING_FUNCTION_ARN")
     # gif_processing_function_arn = os.environ.get("GIF_PROCESSING_FUNCTION_ARN")
@@ -58,14 +137,18 @@ def lambda_handler(event, context):
     # Getting additional info
     filename = get_filename(key)
 
-    # Extract file extension
-    content_type = get_content_type(bucket, key)
+    # HEAD the object once, its metadata is passed on so processing functions don't repeat it
+    metadata = get_object_metadata(bucket, key)
+    content_type = metadata.content_type
     logger.info(f"Content type: {content_type}")
 
     # Depending on the file type, dispatch to the appropriate Lambda function
     if content_type.startswith("image/"):
-        # Specifying which format and what sizes to generate.
-        extension = Extension.JPEG.name
+        # Specifying which formats and what sizes to generate.
+        extensions = [Extension[extension].name for extension in IMAGE_OUTPUT_EXTENSIONS]
+        # GIFs are also generated as GIFs, which keeps the frames of animated ones
+        if content_type == "image/gif" and Extension.GIF.name not in extensions:
+            extensions.append(Extension.GIF.name)
         sizes = [
             Size.TINY.name,
             Size.SMALL.name,
@@ -74,19 +157,33 @@ def lambda_handler(event, context):
             Size.HUGE.name,
         ]
 
-        lambda_client.invoke(
-            FunctionName=image_processing_function_arn,
-            InvocationType="Event",
-            Payload=json.dumps(
-                {
-                    "bucket": bucket,
-                    "key": key,
-                    "filename": filename,
-                    "extension": extension,
-                    "sizes": sizes,
-                }
-            ),
+        payload = json.dumps(
+            {
+                "bucket": bucket,
+                "key": key,
+                "filename": filename,
+                "extensions": extensions,
+                "sizes": sizes,
+                "metadata": metadata.to_payload(),
+            }
         )
+        if LARGE_IMAGE_PROCESSING_FUNCTION_ARN and is_large_image(
+            bucket, key, metadata, extensions, sizes
+        ):
+            lambda_client.invoke(
+                FunctionName=LARGE_IMAGE_PROCESSING_FUNCTION_ARN,
+                InvocationType="Event",
+                Payload=payload,
+            )
+        elif IMAGE_PROCESSING_QUEUE_URL:
+            sqs_client = get_client("sqs")
+            sqs_client.send_message(QueueUrl=IMAGE_PROCESSING_QUEUE_URL, MessageBody=payload)
+        else:
+            lambda_client.invoke(
+                FunctionName=image_processing_function_arn,
+                InvocationType="Event",
+                Payload=payload,
+            )
     elif content_type.startswith("video/"):
         # TODO add vidoe processing lambda invokation
         # Video processing into mp4 lambda -> triggers image processing function
@@ -1,27 +1,35 @@
 import os
-import uuid
 
-import boto3
-from moviepy.editor import VideoFileClip
+from shared.services.aws.client_provider import get_client
+from shared.services.scratch_space import ScratchSpace, sweep_scratch_space
 
-s3 = boto3.client("s3")
+s3 = get_client("s3")
 
 
 # For more complex video processing tasks, you might want to consider using other AWS services
 
 
 def lambda_handler(event, context):
+    # Files of invocations that timed out are still in /tmp of a warm container
+    sweep_scratch_space()
     for record in event["Records"]:
         bucket = record["s3"]["bucket"]["name"]
         key = record["s3"]["object"]["key"]
-        download_path = "/tmp/{}{}".format(uuid.uuid4(), key)
-        upload_path = "/tmp/processed-{}".format(key)
+        size = record["s3"]["object"].get("size", 0)
 
-        s3.download_file(bucket, key, download_path)
-        process_video(download_path, upload_path)
-        s3.upload_file(upload_path, os.getenv("PROCESSED_MEDIA_BUCKET"), key)
+        # The processed video is expected to take about as much space as the upload
+        with ScratchSpace() as scratch:
+            download_path = str(scratch.reserve(key, size))
+            upload_path = str(scratch.reserve(f"processed-{key}", size))
+
+            s3.download_file(bucket, key, download_path)
+            process_video(download_path, upload_path)
+            s3.upload_file(upload_path, os.getenv("PROCESSED_MEDIA_BUCKET"), key)
 
 
 def process_video(input_path, output_path):
+    # moviepy pulls in numpy and imageio, so it is only imported once there is a video to convert
+    from moviepy.editor import VideoFileClip
+
     clip = VideoFileClip(input_path)
     clip.write_videofile(output_path, codec="libx264")
@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from shared.services.aws.client_provider import clear_clients
+
+# The S3 lambdas import their modules as top-level modules (the lambda directory is the
+# deployment root), so expose the lambda directory on the path for the tests.
+IMAGE_PROCESSING_FUNCTION_DIR = (
+    Path(__file__).resolve().parents[1] / "src" / "lambdas" / "image_processing_function"
+)
+
+sys.path.append(str(IMAGE_PROCESSING_FUNCTION_DIR))
+
+
+@pytest.fixture(autouse=True)
+def fresh_aws_clients():
+    """Clients are cached per process, so every test starts without any, like a new container."""
+    clear_clients()
+    yield
+    clear_clients()
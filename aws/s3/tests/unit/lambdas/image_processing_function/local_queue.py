@@ -0,0 +1,86 @@
+import collections
+import json
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List
+
+
+@dataclass
+class QueuedMessage:
+    message_id: str
+    body: str
+    receive_count: int = 0
+
+
+class InMemoryQueue:
+    """
+    In-memory stand-in for an SQS queue feeding the image processing function, so the queue
+    consumer can be exercised and its throughput measured offline. Messages are received in
+    batches shaped like SQS Lambda events. Messages reported in batchItemFailures are delivered
+    again, until they were received max_receive_count times and move to the dead letters.
+    """
+
+    def __init__(self, max_receive_count: int = 3) -> None:
+        self.max_receive_count = max_receive_count
+        self.dead_letters: List[QueuedMessage] = []
+        self._messages: Deque[QueuedMessage] = collections.deque()
+        self._in_flight: Dict[str, QueuedMessage] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._messages) + len(self._in_flight)
+
+    def send_message(self, body: dict) -> str:
+        message = QueuedMessage(str(uuid.uuid4()), json.dumps(body))
+        with self._lock:
+            self._messages.append(message)
+        return message.message_id
+
+    def receive_event(self, max_messages: int = 10) -> dict:
+        """Receive up to max_messages messages as an SQS event, hiding them until acknowledged."""
+        records: List[dict] = []
+        with self._lock:
+            while self._messages and len(records) < max_messages:
+                message = self._messages.popleft()
+                message.receive_count += 1
+                self._in_flight[message.message_id] = message
+                records.append(self._to_record(message))
+        return {"Records": records}
+
+    def acknowledge(self, event: dict, response: dict) -> None:
+        """
+        Delete the messages of an event that succeeded, and make the failed ones visible again
+        or move them to the dead letters.
+        """
+        failed = {failure["itemIdentifier"] for failure in response.get("batchItemFailures", [])}
+        with self._lock:
+            for record in event["Records"]:
+                message = self._in_flight.pop(record["messageId"])
+                if message.message_id not in failed:
+                    continue
+                if message.receive_count >= self.max_receive_count:
+                    self.dead_letters.append(message)
+                else:
+                    self._messages.append(message)
+
+    def drain(self, handler: Callable[[dict, object], dict], batch_size: int = 10) -> int:
+        """Feed every message to the handler in batches until the queue is empty."""
+        batches = 0
+        while True:
+            event = self.receive_event(batch_size)
+            if not event["Records"]:
+                return batches
+            self.acknowledge(event, handler(event, None))
+            batches += 1
+
+    @staticmethod
+    def _to_record(message: QueuedMessage) -> dict:
+        return {
+            "messageId": message.message_id,
+            "receiptHandle": message.message_id,
+            "body": message.body,
+            "attributes": {"ApproximateReceiveCount": str(message.receive_count)},
+            "eventSource": "aws:sqs",
+        }
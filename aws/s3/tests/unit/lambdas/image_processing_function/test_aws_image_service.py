@@ -0,0 +1,85 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from aws_image_service import AWSImageProcessingService, ImageJob, JobResult
+
+from shared.media import Extension, Size
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
+
+# ===================== CONSTANTS =====================
+
+METADATA = ObjectMetadata(content_type="image/jpeg", size=1024, etag='"etag"')
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("CONTENT_INDEX_BACKEND", "none")
+    service = AWSImageProcessingService(Mock(), "processed-bucket")
+    service.image_service = Mock()
+    service.image_service.process_images.return_value = True
+    return service
+
+
+def create_job(filename):
+    return ImageJob(
+        "raw-bucket", f"user/images/{filename}", filename, [Extension.JPEG], [Size.TINY], METADATA
+    )
+
+
+# ===================== TESTS: process_batch =====================
+
+
+def test_process_batch_returns_results_in_order(service):
+    """Test every job is processed and reported in the order it was given."""
+    service.image_service.process_images.side_effect = lambda image, *args: image.filename != "b"
+
+    results = service.process_batch([create_job("a"), create_job("b"), create_job("c")])
+
+    assert [result.filename for result in results] == ["a", "b", "c"]
+    assert [result.succeeded for result in results] == [True, False, True]
+
+
+def test_process_batch_shares_one_executor(service):
+    """Test every job of the batch resizes and encodes on the same executor."""
+    service.process_batch([create_job("a"), create_job("b")])
+
+    executors = {call.args[4] for call in service.image_service.process_images.mock_calls}
+    assert len(executors) == 1
+    assert None not in executors
+
+
+def test_process_batch_limits_concurrency(service):
+    """Test no more than max_concurrency jobs run at the same time."""
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def process_images(*args):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return True
+
+    service.image_service.process_images.side_effect = process_images
+    results = service.process_batch([create_job(str(index)) for index in range(6)], 2)
+
+    assert peak[0] == 2
+    assert all(result.succeeded for result in results)
+
+
+def test_process_batch_reports_job_errors(service):
+    """Test a failing job is reported without stopping the other jobs."""
+    service.image_service.process_images.side_effect = [RuntimeError("broken"), True]
+
+    results = service.process_batch([create_job("a"), create_job("b")], max_concurrency=1)
+
+    assert results == [
+        JobResult("a", succeeded=False, error="broken"),
+        JobResult("b", succeeded=True),
+    ]
@@ -0,0 +1,145 @@
+import io
+import json
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+from content_index import (
+    ContentRecord,
+    S3ContentIndex,
+    SQLiteContentIndex,
+    content_key_from_etag,
+    content_key_from_source,
+    create_content_index,
+)
+
+from shared.media import Extension, Size
+
+# ===================== CONSTANTS =====================
+
+RECORD = ContentRecord(
+    "image", frozenset({(Size.TINY, Extension.JPEG), (Size.TINY, Extension.WEBP)})
+)
+CONTENT = b"image bytes"
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def sqlite_index(tmp_path):
+    index = SQLiteContentIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+# ===================== TESTS: content keys =====================
+
+
+def test_content_key_from_single_part_etag():
+    """Test single part ETags, the MD5 of the content, are used as content keys."""
+    assert content_key_from_etag('"9e107d9d372bb6826bd81d3542a419d6"') == (
+        "md5:9e107d9d372bb6826bd81d3542a419d6"
+    )
+
+
+def test_content_key_from_multipart_etag():
+    """Test multipart ETags, which depend on the part size, give no content key."""
+    assert content_key_from_etag('"9e107d9d372bb6826bd81d3542a419d6-3"') is None
+
+
+def test_content_key_from_source_matches_for_buffers_and_files(tmp_path):
+    """Test the SHA-256 content key is the same for buffers and files with the same bytes."""
+    path = tmp_path / "image.jpeg"
+    path.write_bytes(CONTENT)
+
+    key = content_key_from_source(io.BytesIO(CONTENT))
+
+    assert key.startswith("sha256:")
+    assert content_key_from_source(path) == key
+    assert content_key_from_source(io.BytesIO(b"other bytes")) != key
+
+
+# ===================== TESTS: ContentRecord =====================
+
+
+def test_content_record_round_trips_through_json():
+    """Test records are restored from their JSON representation."""
+    assert ContentRecord.from_json(RECORD.to_json()) == RECORD
+
+
+def test_content_record_covers_subsets_of_its_variants():
+    """Test a record covers only the variants it was processed with."""
+    assert RECORD.covers({(Size.TINY, Extension.JPEG)})
+    assert not RECORD.covers({(Size.TINY, Extension.JPEG), (Size.SMALL, Extension.JPEG)})
+
+
+# ===================== TESTS: SQLiteContentIndex =====================
+
+
+def test_sqlite_index_puts_gets_and_deletes(sqlite_index):
+    """Test records are stored, replaced and deleted by content key."""
+    assert sqlite_index.get("md5:etag") is None
+
+    sqlite_index.put("md5:etag", RECORD)
+    assert sqlite_index.get("md5:etag") == RECORD
+
+    replaced = ContentRecord("other", RECORD.variants)
+    sqlite_index.put("md5:etag", replaced)
+    assert sqlite_index.get("md5:etag") == replaced
+
+    sqlite_index.delete("md5:etag")
+    assert sqlite_index.get("md5:etag") is None
+
+
+def test_sqlite_index_persists_across_connections(tmp_path):
+    """Test records outlive the index they were written by."""
+    path = str(tmp_path / "index.sqlite3")
+    index = SQLiteContentIndex(path)
+    index.put("md5:etag", RECORD)
+    index.close()
+
+    assert SQLiteContentIndex(path).get("md5:etag") == RECORD
+
+
+# ===================== TESTS: S3ContentIndex =====================
+
+
+def test_s3_index_stores_records_under_the_prefix():
+    """Test records are stored as JSON objects named after the content key."""
+    s3_client = Mock()
+    S3ContentIndex(s3_client, "content-index-bucket").put("md5:etag", RECORD)
+
+    kwargs = s3_client.put_object.call_args.kwargs
+    assert kwargs["Bucket"] == "content-index-bucket"
+    assert kwargs["Key"] == "content-index/md5/etag.json"
+    assert json.loads(kwargs["Body"])["filename"] == "image"
+
+
+def test_s3_index_gets_records():
+    """Test stored records are read back."""
+    s3_client = Mock()
+    s3_client.get_object.return_value = {"Body": io.BytesIO(RECORD.to_json().encode())}
+
+    assert S3ContentIndex(s3_client, "content-index-bucket").get("md5:etag") == RECORD
+
+
+def test_s3_index_misses_missing_records():
+    """Test content without an index object was never processed."""
+    s3_client = Mock()
+    s3_client.get_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+
+    assert S3ContentIndex(s3_client, "content-index-bucket").get("md5:etag") is None
+
+
+# ===================== TESTS: create_content_index =====================
+
+
+def test_create_content_index_can_be_disabled():
+    """Test no index is created when deduplication is turned off."""
+    assert create_content_index(Mock(), "content-index-bucket", backend="none") is None
+    assert isinstance(create_content_index(Mock(), "content-index-bucket", "S3"), S3ContentIndex)
+
+
+def test_create_content_index_needs_a_bucket():
+    """Test the S3 index is off without its bucket, rather than written anywhere public."""
+    assert create_content_index(Mock(), None, backend="s3") is None
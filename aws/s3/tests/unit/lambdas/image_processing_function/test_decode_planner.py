@@ -0,0 +1,91 @@
+import pytest
+from decode_planner import DecodeMethod, DecodePlanner
+from PIL import Image as PILImage
+
+from shared.media import Size
+
+# ===================== CONSTANTS =====================
+
+SOURCE_DIMENSIONS = (4000, 3000)
+ON_DEMAND_SIZES = [Size.TINY, Size.SMALL, Size.MEDIUM]
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def jpeg_path(tmp_path):
+    path = tmp_path / "source.jpeg"
+    PILImage.new("RGB", SOURCE_DIMENSIONS, (10, 120, 200)).save(path, "JPEG")
+    return path
+
+
+@pytest.fixture
+def png_path(tmp_path):
+    path = tmp_path / "source.png"
+    PILImage.new("RGB", SOURCE_DIMENSIONS, (10, 120, 200)).save(path, "PNG")
+    return path
+
+
+# ===================== TESTS: plan =====================
+
+
+@pytest.mark.parametrize(
+    "sizes, expected_scale",
+    [
+        ([Size.TINY], 8),
+        ([Size.SMALL], 4),
+        (ON_DEMAND_SIZES, 2),
+        ([Size.TINY, Size.LARGE], 1),
+        ([Size.HUGE], 1),
+    ],
+)
+def test_plan_scale(jpeg_path, sizes, expected_scale):
+    """Test the planner picks the largest scale keeping the largest target above the gap."""
+    with PILImage.open(jpeg_path) as img:
+        plan = DecodePlanner().plan(img, sizes)
+
+    assert plan.scale == expected_scale
+    assert plan.source_size == SOURCE_DIMENSIONS
+
+
+def test_plan_uses_draft_for_jpeg(jpeg_path):
+    """Test JPEG sources are planned for DCT scaled decoding."""
+    with PILImage.open(jpeg_path) as img:
+        plan = DecodePlanner().plan(img, [Size.TINY])
+
+    assert plan.method == DecodeMethod.DRAFT
+    assert plan.decoded_size == (500, 375)
+
+
+def test_plan_uses_reduce_for_other_formats(png_path):
+    """Test sources without DCT scaling are planned for reduction after decoding."""
+    with PILImage.open(png_path) as img:
+        plan = DecodePlanner().plan(img, [Size.TINY])
+
+    assert plan.method == DecodeMethod.REDUCE
+    assert plan.scale == 8
+
+
+def test_plan_full_when_disabled(jpeg_path):
+    """Test the planner always decodes at full scale when disabled."""
+    with PILImage.open(jpeg_path) as img:
+        plan = DecodePlanner(enabled=False).plan(img, [Size.TINY])
+
+    assert plan.method == DecodeMethod.FULL
+    assert plan.scale == 1
+    assert plan.decoded_size == SOURCE_DIMENSIONS
+
+
+# ===================== TESTS: decode =====================
+
+
+@pytest.mark.parametrize("path_fixture", ["jpeg_path", "png_path"])
+def test_decode_matches_plan(request, path_fixture):
+    """Test the decoded image has the size announced by the plan."""
+    planner = DecodePlanner()
+    img = PILImage.open(request.getfixturevalue(path_fixture))
+    plan = planner.plan(img, ON_DEMAND_SIZES)
+
+    decoded = planner.decode(img, plan)
+
+    assert decoded.size == plan.decoded_size == (2000, 1500)
@@ -0,0 +1,53 @@
+import io
+
+import pytest
+from encoder_profiles import (
+    DEFAULT_PROFILE,
+    ENCODER_PROFILES,
+    EncoderProfile,
+    get_encoder_profile,
+)
+from PIL import Image as PILImage
+
+from shared.media import Extension, Size
+
+# ===================== CONSTANTS =====================
+
+IMAGE_EXTENSIONS = [Extension.JPEG, Extension.PNG, Extension.GIF, Extension.WEBP, Extension.AVIF]
+
+# ===================== TESTS: EncoderProfile =====================
+
+
+def test_save_options_skip_unset_values():
+    """Test options left unset are not passed to Pillow."""
+    profile = EncoderProfile(quality=80, progressive=True)
+
+    assert profile.save_options() == {"quality": 80, "progressive": True}
+    assert DEFAULT_PROFILE.save_options() == {}
+
+
+@pytest.mark.parametrize("extension", IMAGE_EXTENSIONS)
+@pytest.mark.parametrize("size", list(Size))
+def test_every_profile_encodes(extension, size):
+    """Test Pillow accepts the options of every configured profile."""
+    img = PILImage.new("RGB", (64, 64), (40, 120, 200))
+    buffer = io.BytesIO()
+
+    get_encoder_profile(extension, size).save(img, buffer, extension.value.upper())
+
+    buffer.seek(0)
+    assert PILImage.open(buffer).format == extension.value.upper()
+
+
+# ===================== TESTS: get_encoder_profile =====================
+
+
+def test_every_image_extension_has_profiles():
+    """Test every image extension has a profile for every size."""
+    for extension in IMAGE_EXTENSIONS:
+        assert set(ENCODER_PROFILES[extension]) == set(Size)
+
+
+def test_unlisted_pairs_use_defaults():
+    """Test extensions without profiles fall back to Pillow defaults."""
+    assert get_encoder_profile(Extension.JPEG, Size.TINY, profiles={}) == DEFAULT_PROFILE
@@ -0,0 +1,109 @@
+import concurrent.futures
+import io
+
+import pytest
+from encoder_profiles import DEFAULT_PROFILE
+from executors import (
+    ExecutionBackend,
+    InlineExecutor,
+    SharedImage,
+    create_executor,
+    process_pool_supported,
+    resize_and_encode_shared,
+    select_backend,
+)
+from PIL import Image as PILImage
+from resampling import BOX
+
+from shared.media import Extension
+
+# ===================== CONSTANTS =====================
+
+SMALL_JOB_PIXELS = 500 * 500
+MEDIUM_JOB_PIXELS = 2000 * 1500
+LARGE_JOB_PIXELS = 6000 * 4000
+
+# ===================== TESTS: InlineExecutor =====================
+
+
+def test_inline_executor_runs_on_submit():
+    """Test the inline executor runs the task immediately and returns a completed future."""
+    future = InlineExecutor().submit(sum, [1, 2, 3])
+
+    assert future.done()
+    assert future.result() == 6
+
+
+def test_inline_executor_captures_exceptions():
+    """Test exceptions raised by the task are stored on the future."""
+    future = InlineExecutor().submit(int, "not a number")
+
+    with pytest.raises(ValueError):
+        future.result()
+
+
+# ===================== TESTS: select_backend =====================
+
+
+@pytest.mark.parametrize(
+    "pixel_count, cpus, expected",
+    [
+        (SMALL_JOB_PIXELS, 4, ExecutionBackend.INLINE),
+        (MEDIUM_JOB_PIXELS, 4, ExecutionBackend.THREAD),
+        (LARGE_JOB_PIXELS, 4, ExecutionBackend.PROCESS),
+        (LARGE_JOB_PIXELS, 1, ExecutionBackend.THREAD),
+    ],
+)
+def test_select_backend_auto(mocker, pixel_count, cpus, expected):
+    """Test the backend is chosen from the job's pixel count and the available CPUs."""
+    mocker.patch("executors.process_pool_supported", return_value=True)
+
+    assert select_backend(pixel_count, requested="auto", cpus=cpus) == expected
+
+
+def test_select_backend_requested():
+    """Test an explicitly requested backend overrides the pixel count heuristic."""
+    assert select_backend(LARGE_JOB_PIXELS, requested="inline", cpus=4) == ExecutionBackend.INLINE
+
+
+def test_select_backend_without_process_support(mocker):
+    """Test the thread backend is used where process pools are not supported."""
+    mocker.patch("executors.process_pool_supported", return_value=False)
+
+    assert select_backend(LARGE_JOB_PIXELS, requested="process") == ExecutionBackend.THREAD
+
+
+# ===================== TESTS: create_executor =====================
+
+
+@pytest.mark.parametrize(
+    "backend, executor_class",
+    [
+        (ExecutionBackend.INLINE, InlineExecutor),
+        (ExecutionBackend.THREAD, concurrent.futures.ThreadPoolExecutor),
+        (ExecutionBackend.PROCESS, concurrent.futures.ProcessPoolExecutor),
+    ],
+)
+def test_create_executor(backend, executor_class):
+    """Test each backend creates its executor."""
+    with create_executor(backend, max_workers=1) as executor:
+        assert isinstance(executor, executor_class)
+
+
+# ===================== TESTS: SharedImage =====================
+
+
+@pytest.mark.skipif(not process_pool_supported(), reason="shared memory is not available")
+@pytest.mark.parametrize("mode", ["RGB", "L", "P"])
+def test_resize_and_encode_shared(mode):
+    """Test a worker can resize and encode an image mapped from shared memory."""
+    img = PILImage.new(mode, (400, 300))
+
+    with SharedImage(img) as shared:
+        encoders = [(Extension.JPEG, DEFAULT_PROFILE), (Extension.WEBP, DEFAULT_PROFILE)]
+        data = resize_and_encode_shared(shared.handle, (120, 120), BOX, encoders)
+
+    for extension, body in data.items():
+        encoded = PILImage.open(io.BytesIO(body))
+        assert encoded.format == extension.name
+        assert encoded.size == (120, 120)
@@ -0,0 +1,126 @@
+import io
+import struct
+
+import pytest
+from exif_thumbnail import find_exif_thumbnail, open_exif_thumbnail
+from PIL import Image as PILImage
+
+# ===================== CONSTANTS =====================
+
+TINY_DIMENSIONS = (120, 120)
+THUMBNAIL_DIMENSIONS = (160, 120)
+
+# ===================== FIXTURES =====================
+
+
+def encode_jpeg(dimensions, mode="RGB"):
+    buffer = io.BytesIO()
+    PILImage.linear_gradient("L").resize(dimensions).convert(mode).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def create_exif(thumbnail, byte_order="<", compression=6):
+    """Build the TIFF structure of an EXIF segment, its IFD1 pointing to the thumbnail."""
+
+    def entry(tag, field_type, value):
+        value_format = "H2x" if field_type == 3 else "I"
+        return struct.pack(f"{byte_order}HHI{value_format}", tag, field_type, 1, value)
+
+    # IFD0 holds the orientation only, IFD1 follows it and the thumbnail follows IFD1
+    ifd0 = (
+        struct.pack(f"{byte_order}H", 1) + entry(0x0112, 3, 1) + struct.pack(f"{byte_order}I", 26)
+    )
+    thumbnail_offset = 26 + 2 + 3 * 12 + 4
+    ifd1 = (
+        struct.pack(f"{byte_order}H", 3)
+        + entry(0x0103, 3, compression)
+        + entry(0x0201, 4, thumbnail_offset)
+        + entry(0x0202, 4, len(thumbnail))
+        + struct.pack(f"{byte_order}I", 0)
+    )
+    header = (b"II" if byte_order == "<" else b"MM") + struct.pack(f"{byte_order}HI", 42, 8)
+    return header + ifd0 + ifd1 + thumbnail
+
+
+def create_exif_jpeg(dimensions, thumbnail, byte_order="<"):
+    """Encode a JPEG with an EXIF segment right after its start of image."""
+    segment = b"Exif\x00\x00" + create_exif(thumbnail, byte_order)
+    data = encode_jpeg(dimensions)
+    return data[:2] + b"\xff\xe1" + struct.pack(">H", len(segment) + 2) + segment + data[2:]
+
+
+THUMBNAIL = encode_jpeg(THUMBNAIL_DIMENSIONS)
+
+# ===================== TESTS: find_exif_thumbnail =====================
+
+
+@pytest.mark.parametrize("byte_order", ["<", ">"], ids=["little-endian", "big-endian"])
+def test_find_exif_thumbnail(byte_order):
+    """Test the thumbnail IFD1 points to is found in either byte order."""
+    data = create_exif_jpeg((400, 300), THUMBNAIL, byte_order)
+
+    assert find_exif_thumbnail(data) == THUMBNAIL
+
+
+def test_find_exif_thumbnail_after_other_segments():
+    """Test segments ahead of the EXIF one, such as JFIF's, are skipped."""
+    data = create_exif_jpeg((400, 300), THUMBNAIL)
+    jfif = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + bytes(9)
+
+    assert find_exif_thumbnail(data[:2] + jfif + data[2:]) == THUMBNAIL
+
+
+def test_find_exif_thumbnail_missing():
+    """Test images without EXIF data, non-JPEG data and uncompressed thumbnails have none."""
+    segment = b"Exif\x00\x00" + create_exif(THUMBNAIL, compression=1)
+    data = encode_jpeg((400, 300))
+    uncompressed = data[:2] + b"\xff\xe1" + struct.pack(">H", len(segment) + 2) + segment
+
+    assert find_exif_thumbnail(data) is None
+    assert find_exif_thumbnail(b"\x89PNG\r\n\x1a\n" + bytes(64)) is None
+    assert find_exif_thumbnail(uncompressed + data[2:]) is None
+
+
+def test_find_exif_thumbnail_past_the_data():
+    """Test thumbnails cut short by the end of the data aren't returned."""
+    data = create_exif_jpeg((400, 300), THUMBNAIL)
+    half_thumbnail = data.index(THUMBNAIL) + len(THUMBNAIL) // 2
+
+    assert find_exif_thumbnail(data[:half_thumbnail]) is None
+    assert find_exif_thumbnail(data[:40]) is None
+
+
+# ===================== TESTS: open_exif_thumbnail =====================
+
+
+def test_open_exif_thumbnail():
+    """Test thumbnails covering the dimensions with the aspect ratio of the image are decoded."""
+    thumbnail = open_exif_thumbnail(create_exif_jpeg((4000, 3000), THUMBNAIL), TINY_DIMENSIONS)
+
+    assert thumbnail.size == THUMBNAIL_DIMENSIONS
+    assert thumbnail.mode == "RGB"
+
+
+@pytest.mark.parametrize(
+    "dimensions, thumbnail_dimensions, mode",
+    [
+        ((4000, 3000), (120, 90), "RGB"),
+        ((6000, 4000), (160, 120), "RGB"),
+        ((3000, 4000), (160, 120), "RGB"),
+        ((4000, 3000), (160, 120), "L"),
+    ],
+    ids=["too-small", "padded", "rotated", "greyscale"],
+)
+def test_open_exif_thumbnail_not_good_enough(dimensions, thumbnail_dimensions, mode):
+    """Test small, padded or rotated thumbnails and those of another mode are rejected."""
+    data = create_exif_jpeg(dimensions, encode_jpeg(thumbnail_dimensions, mode))
+
+    assert open_exif_thumbnail(data, TINY_DIMENSIONS) is None
+
+
+def test_open_exif_thumbnail_without_header():
+    """Test thumbnails are rejected when the dimensions of the image are past the data."""
+    data = create_exif_jpeg((4000, 3000), THUMBNAIL)
+    end_of_thumbnail = data.index(THUMBNAIL) + len(THUMBNAIL)
+
+    assert open_exif_thumbnail(data[:end_of_thumbnail], TINY_DIMENSIONS) is None
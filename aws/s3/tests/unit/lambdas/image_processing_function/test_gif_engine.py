@@ -0,0 +1,145 @@
+import io
+
+import pytest
+from gif_engine import GifStreamWriter, build_global_palette, has_transparency, iter_frames
+from PIL import Image as PILImage
+from PIL import ImageDraw
+
+# ===================== CONSTANTS =====================
+
+SOURCE_DIMENSIONS = (120, 80)
+OUTPUT_DIMENSIONS = (60, 40)
+FRAME_COUNT = 6
+DURATIONS = [30 + 10 * index for index in range(FRAME_COUNT)]
+
+# ===================== FIXTURES =====================
+
+
+def draw_frames(mode, background):
+    """A square moving across a plain background, one step per frame."""
+    frames = []
+    for index in range(FRAME_COUNT):
+        frame = PILImage.new(mode, SOURCE_DIMENSIONS, background)
+        left = index * 10
+        ImageDraw.Draw(frame).rectangle((left, 20, left + 20, 40), fill=(250, 200, 0, 255))
+        frames.append(frame)
+    return frames
+
+
+def save_gif(frames, **params):
+    buffer = io.BytesIO()
+    frames[0].save(
+        buffer, "GIF", save_all=True, append_images=frames[1:], duration=DURATIONS, **params
+    )
+    buffer.seek(0)
+    return PILImage.open(buffer)
+
+
+def rewrite(img, transparency=False, palette=None):
+    """Write img through GifStreamWriter at OUTPUT_DIMENSIONS and open the result."""
+    buffer = io.BytesIO()
+    palette = palette or build_global_palette(img)
+    writer = GifStreamWriter(buffer, OUTPUT_DIMENSIONS, palette, transparency)
+    for frame, duration in iter_frames(img):
+        writer.write_frame(frame.resize(OUTPUT_DIMENSIONS), duration)
+    writer.close()
+    buffer.seek(0)
+    return PILImage.open(buffer), writer
+
+
+@pytest.fixture
+def opaque_gif():
+    return save_gif(draw_frames("RGB", (20, 40, 160)))
+
+
+@pytest.fixture
+def transparent_gif():
+    return save_gif(draw_frames("RGBA", (0, 0, 0, 0)), disposal=2)
+
+
+def read_frames(gif):
+    frames = []
+    for index in range(gif.n_frames):
+        gif.seek(index)
+        frames.append((gif.convert("RGBA"), gif.info["duration"]))
+    return frames
+
+
+# ===================== TESTS: iter_frames =====================
+
+
+def test_iter_frames_yields_durations(opaque_gif):
+    """Test every frame is yielded as a full RGB picture with its own duration."""
+    frames = list(iter_frames(opaque_gif))
+
+    assert [duration for _, duration in frames] == DURATIONS
+    assert all(frame.mode == "RGB" for frame, _ in frames)
+
+
+def test_has_transparency(opaque_gif, transparent_gif):
+    """Test transparent GIFs are told apart from opaque ones."""
+    assert not has_transparency(opaque_gif)
+    assert has_transparency(transparent_gif)
+
+
+# ===================== TESTS: build_global_palette =====================
+
+
+def test_global_palette_leaves_transparent_index(opaque_gif):
+    """Test the palette keeps its last entry free for transparent pixels."""
+    palette = build_global_palette(opaque_gif)
+
+    assert palette.mode == "P"
+    assert len(palette.getcolors()) <= 255
+    assert opaque_gif.tell() == 0
+
+
+# ===================== TESTS: GifStreamWriter =====================
+
+
+def test_writer_keeps_frames_and_durations(opaque_gif):
+    """Test the written GIF has every frame, at the requested size, with its duration."""
+    gif, writer = rewrite(opaque_gif)
+
+    frames = read_frames(gif)
+    assert gif.size == OUTPUT_DIMENSIONS
+    assert writer.frames == FRAME_COUNT
+    assert [duration for _, duration in frames] == DURATIONS
+    assert gif.info["loop"] == 0
+
+
+def test_writer_reproduces_moving_content(opaque_gif):
+    """Test frames written as changed regions still composite into the full picture."""
+    gif, _ = rewrite(opaque_gif)
+
+    last, _ = read_frames(gif)[-1]
+    # The square has moved from the left edge, which must show the background again
+    assert last.getpixel((2, 15))[2] > 100
+    assert last.getpixel((28, 15))[:2] == pytest.approx((250, 200), abs=30)
+
+
+@pytest.mark.parametrize("palette_mode", ["no-palette", "RGB"])
+def test_writer_quantizes_images_without_palette(opaque_gif, palette_mode):
+    """Test palette images without a palette, or of another mode, are quantized into one."""
+    palette = build_global_palette(opaque_gif)
+    if palette_mode == "no-palette":
+        palette.palette = None
+    else:
+        palette = palette.convert("RGB")
+
+    gif, writer = rewrite(opaque_gif, palette=palette)
+
+    assert writer.palette.mode == "P"
+    assert len(read_frames(gif)) == FRAME_COUNT
+
+
+def test_writer_keeps_transparency(transparent_gif):
+    """Test transparent pixels stay transparent and frames are cleared between each other."""
+    gif, _ = rewrite(transparent_gif, transparency=True)
+
+    frames = read_frames(gif)
+    first, _ = frames[0]
+    last, _ = frames[-1]
+    assert first.getpixel((0, 0))[3] == 0
+    assert first.getpixel((5, 15))[3] == 255
+    assert last.getpixel((5, 15))[3] == 0
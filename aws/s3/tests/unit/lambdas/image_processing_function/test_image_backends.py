@@ -0,0 +1,236 @@
+import io
+import random
+
+import pytest
+from decode_planner import DecodeMethod, DecodePlanner
+from encoder_profiles import DEFAULT_PROFILE
+from image_backends import (
+    ImageBackend,
+    ImageBackendType,
+    NumpyBackend,
+    VipsBackend,
+    backend_supported,
+    block_average,
+    create_image_backend,
+    get_integer_factors,
+)
+from PIL import Image as PILImage
+from resampling import BOX, LANCZOS, LANCZOS_REDUCED
+
+from shared.media import Size
+
+# ===================== CONSTANTS =====================
+
+SOURCE_DIMENSIONS = (1080, 720)
+BAND_MODES = ["L", "LA", "RGB", "RGBA"]
+
+numpy_supported = pytest.mark.skipif(
+    not backend_supported(ImageBackendType.NUMPY), reason="numpy is not installed"
+)
+vips_supported = pytest.mark.skipif(
+    not backend_supported(ImageBackendType.VIPS), reason="pyvips is not installed"
+)
+
+# ===================== FIXTURES =====================
+
+
+def create_image(mode, dimensions=SOURCE_DIMENSIONS):
+    """Create an image of noise, where the pixels of different resizes differ the most."""
+    width, height = dimensions
+    img = PILImage.frombytes("RGBA", dimensions, random.Random(0).randbytes(width * height * 4))
+    return img.convert(mode)
+
+
+def encode(img, image_format):
+    buffer = io.BytesIO()
+    img.save(buffer, image_format)
+    buffer.seek(0)
+    return buffer
+
+
+def max_difference(img, other):
+    return max(abs(a - b) for a, b in zip(img.tobytes(), other.tobytes()))
+
+
+# ===================== TESTS: create_image_backend =====================
+
+
+@pytest.mark.parametrize(
+    "requested, backend_class",
+    [("pillow", ImageBackend), (" Pillow ", ImageBackend)],
+)
+def test_create_image_backend(requested, backend_class):
+    """Test the requested backend is created, whatever the case and spaces around it."""
+    assert type(create_image_backend(requested)) is backend_class
+
+
+@pytest.mark.parametrize("requested", ["vips", "numpy"])
+def test_create_image_backend_falls_back_to_pillow(requested, mocker):
+    """Test backends whose dependency is missing fall back to Pillow."""
+    mocker.patch("image_backends.backend_supported", return_value=False)
+
+    assert type(create_image_backend(requested)) is ImageBackend
+
+
+def test_create_image_backend_unknown():
+    """Test unknown backends are rejected."""
+    with pytest.raises(ValueError):
+        create_image_backend("imagemagick")
+
+
+@numpy_supported
+def test_create_numpy_backend():
+    """Test the NumPy backend is created when numpy is installed."""
+    assert type(create_image_backend("numpy")) is NumpyBackend
+
+
+# ===================== TESTS: ImageBackend =====================
+
+
+def test_metadata():
+    """Test the metadata of the source is read from its header, leaving it at its start."""
+    frames = [PILImage.new("L", (40, 30), color).convert("P") for color in (0, 128, 255)]
+    source = io.BytesIO()
+    frames[0].save(source, "GIF", save_all=True, append_images=frames[1:])
+    source.seek(0)
+
+    header = ImageBackend().metadata(source)
+
+    assert (header.width, header.height, header.mode, header.frames) == (40, 30, "P", 3)
+    assert source.tell() == 0
+
+
+def test_decode_follows_the_plan():
+    """Test the source is decoded at the scale planned for the sizes."""
+    source = encode(create_image("RGB", (2160, 2160)), "JPEG")
+
+    img, plan = ImageBackend().decode(source, [Size.TINY], DecodePlanner())
+
+    assert plan.method is DecodeMethod.DRAFT
+    assert img.size == plan.decoded_size
+
+
+def test_resize_and_encode():
+    """Test images are resized with the profile and encoded with the encoder profile."""
+    backend = ImageBackend()
+    img = create_image("RGB")
+
+    resized = backend.resize(img, (120, 80), LANCZOS)
+    buffer = io.BytesIO()
+    backend.encode(resized, buffer, "WEBP", DEFAULT_PROFILE)
+
+    assert resized.tobytes() == LANCZOS.resize(img, (120, 80)).tobytes()
+    assert PILImage.open(buffer).format == "WEBP"
+
+
+def test_resize_ladder_left_to_the_processor():
+    """Test Pillow leaves ladders to the cascade of the processor."""
+    assert ImageBackend().resize_ladder(create_image("RGB"), [((120, 80), LANCZOS)]) is None
+
+
+# ===================== TESTS: NumpyBackend =====================
+
+
+@pytest.mark.parametrize(
+    "source_size, dimensions, expected",
+    [
+        ((4320, 4320), (120, 120), (36, 36)),
+        ((1080, 720), (540, 120), (2, 6)),
+        ((1000, 1000), (270, 270), None),
+        ((120, 120), (120, 120), None),
+        ((120, 120), (240, 240), None),
+    ],
+)
+def test_get_integer_factors(source_size, dimensions, expected):
+    """Test only reductions by integer factors in both directions have factors."""
+    assert get_integer_factors(source_size, dimensions) == expected
+
+
+@numpy_supported
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+@pytest.mark.parametrize("factors", [(2, 2), (3, 2), (36, 24)])
+def test_block_average(mode, factors):
+    """Test blocks average like Image.reduce, rounding aside."""
+    img = create_image(mode)
+
+    averaged = block_average(img, factors)
+
+    assert averaged.mode == mode
+    assert averaged.size == (img.width // factors[0], img.height // factors[1])
+    assert max_difference(averaged, img.reduce(factors)) <= 1
+
+
+@numpy_supported
+@pytest.mark.parametrize("mode", ["LA", "RGBA"])
+def test_block_average_weights_colours_by_alpha(mode):
+    """Test the colours of transparent pixels don't bleed into the average."""
+    img = PILImage.new(mode, (2, 2), (0,) * len(mode))
+    img.putpixel((0, 0), (200,) * (len(mode) - 1) + (64,))
+
+    averaged = block_average(img, (2, 2))
+
+    assert averaged.getpixel((0, 0)) == (200,) * (len(mode) - 1) + (16,)
+
+
+@numpy_supported
+@pytest.mark.parametrize("mode", BAND_MODES)
+def test_numpy_backend_averages_integer_reductions(mode):
+    """Test integer reductions are block averaged whatever the filter of the profile."""
+    img = create_image(mode)
+
+    resized = NumpyBackend().resize(img, (270, 120), LANCZOS)
+
+    assert resized.tobytes() == block_average(img, (4, 6)).tobytes()
+
+
+@numpy_supported
+@pytest.mark.parametrize(
+    "mode, dimensions, profile",
+    [("RGB", (500, 500), LANCZOS_REDUCED), ("RGB", (2160, 1440), BOX), ("P", (540, 360), BOX)],
+    ids=["fractional", "upscale", "palette"],
+)
+def test_numpy_backend_leaves_other_resizes_to_pillow(mode, dimensions, profile):
+    """Test fractional reductions, upscales and other modes are resized by Pillow."""
+    img = create_image(mode)
+
+    resized = NumpyBackend().resize(img, dimensions, profile)
+
+    assert resized.tobytes() == profile.resize(img, dimensions).tobytes()
+
+
+@numpy_supported
+@pytest.mark.parametrize("mode, resized", [("RGBA", True), ("P", False), ("I;16", False)])
+def test_numpy_backend_resize_ladder(mode, resized):
+    """Test ladders of 8 bit images are resized at once, others are left to the processor."""
+    targets = [((540, 360), BOX), ((270, 180), LANCZOS_REDUCED)]
+
+    ladder = NumpyBackend().resize_ladder(create_image(mode), targets)
+
+    if resized:
+        assert [variant.size for variant in ladder] == [(540, 360), (270, 180)]
+    else:
+        assert ladder is None
+
+
+# ===================== TESTS: VipsBackend =====================
+
+
+@vips_supported
+@pytest.mark.parametrize("mode", BAND_MODES)
+def test_vips_backend_resize(mode):
+    """Test libvips resizes to the exact dimensions, keeping the mode."""
+    resized = VipsBackend().resize(create_image(mode), (270, 120), LANCZOS_REDUCED)
+
+    assert resized.mode == mode
+    assert resized.size == (270, 120)
+
+
+@vips_supported
+def test_vips_backend_decode_shrinks_on_load():
+    """Test JPEGs are shrunk on load by the planned scale."""
+    source = encode(create_image("RGB", (2160, 2160)), "JPEG")
+
+    img, plan = VipsBackend().decode(source, [Size.TINY], DecodePlanner())
+
+    assert plan.method is DecodeMethod.DRAFT
+    assert img.size == plan.decoded_size
@@ -0,0 +1,155 @@
+import io
+import re
+from pathlib import Path
+from unittest.mock import ANY, Mock
+
+import pytest
+from botocore.exceptions import ClientError
+from image_downloader import ImageDownloader
+
+from shared.services.aws.s3.s3_ranged_download import RangedDownloader
+from shared.services.scratch_space import ScratchSpace
+
+# ===================== CONSTANTS =====================
+
+IMAGE_BYTES = b"\xff\xd8raw-image-bytes\xff\xd9"
+RANGE_SIZE = 4
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def image_media():
+    return Mock(
+        bucket="raw-bucket",
+        key="user/images/image",
+        filename="image",
+        extension="jpeg",
+        metadata=Mock(size=len(IMAGE_BYTES)),
+    )
+
+
+def get_object(Range=None, **kwargs):
+    """Serve IMAGE_BYTES like S3, honouring byte ranges."""
+    if Range is None:
+        return {"Body": io.BytesIO(IMAGE_BYTES), "ContentLength": len(IMAGE_BYTES)}
+
+    start, stop = map(int, re.match(r"bytes=(\d+)-(\d+)", Range).groups())
+    data = IMAGE_BYTES[start:][: stop - start + 1]
+    return {
+        "Body": io.BytesIO(data),
+        "ContentLength": len(data),
+        "ContentRange": f"bytes {start}-{start + len(data) - 1}/{len(IMAGE_BYTES)}",
+        "ETag": '"etag"',
+    }
+
+
+@pytest.fixture
+def s3_client():
+    client = Mock()
+    client.get_object.side_effect = get_object
+    return client
+
+
+@pytest.fixture
+def ranged_downloader(s3_client):
+    return RangedDownloader(s3_client, range_size=RANGE_SIZE, max_concurrency=2)
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    with ScratchSpace(root=tmp_path) as scratch:
+        yield scratch
+
+
+# ===================== TESTS: download_image =====================
+
+
+def test_download_image_into_memory(s3_client, ranged_downloader, image_media, scratch, tmp_path):
+    """Test objects are downloaded in ranges into a buffer without touching the file system."""
+    downloader = ImageDownloader(
+        s3_client, in_memory=True, max_in_memory_bytes=1024, ranged_downloader=ranged_downloader
+    )
+
+    source = downloader.download_image(image_media, scratch)
+
+    assert not isinstance(source, Path)
+    assert source.read() == IMAGE_BYTES
+    assert list(tmp_path.iterdir()) == []
+    assert s3_client.get_object.call_count == -(-len(IMAGE_BYTES) // RANGE_SIZE)
+    s3_client.download_file.assert_not_called()
+
+
+def test_download_image_single_range(s3_client, image_media, scratch):
+    """Test objects no larger than one range are downloaded with a single request."""
+    downloader = ImageDownloader(
+        s3_client, in_memory=True, ranged_downloader=RangedDownloader(s3_client, range_size=1024)
+    )
+
+    source = downloader.download_image(image_media, scratch)
+
+    assert source.read() == IMAGE_BYTES
+    s3_client.get_object.assert_called_once()
+
+
+def test_download_image_spills_to_disk(s3_client, ranged_downloader, image_media, scratch):
+    """Test objects above the in-memory limit are downloaded into a file of the scratch space."""
+    downloader = ImageDownloader(
+        s3_client, in_memory=True, max_in_memory_bytes=4, ranged_downloader=ranged_downloader
+    )
+
+    source = downloader.download_image(image_media, scratch)
+
+    assert isinstance(source, Path)
+    assert source.parent == scratch.directory
+    assert source.read_bytes() == IMAGE_BYTES
+    assert scratch.bytes_in_use == len(IMAGE_BYTES)
+
+    downloader.cleanup(source)
+    assert not source.exists()
+    assert scratch.bytes_in_use == 0
+
+
+def test_download_image_to_file_when_in_memory_disabled(s3_client, image_media, scratch):
+    """Test the file download path is used when in-memory mode is off."""
+    downloader = ImageDownloader(s3_client, in_memory=False)
+
+    source = downloader.download_image(image_media, scratch)
+
+    assert isinstance(source, Path)
+    s3_client.download_file.assert_called_once_with(
+        image_media.bucket, image_media.key, source, Config=ANY
+    )
+    s3_client.get_object.assert_not_called()
+
+
+def test_download_image_refreshes_changed_metadata(
+    s3_client, ranged_downloader, image_media, scratch
+):
+    """Test the metadata is only fetched again when the image no longer matches its ETag."""
+    precondition_failed = ClientError({"Error": {"Code": "PreconditionFailed"}}, "GetObject")
+    s3_client.get_object.side_effect = [precondition_failed] + [
+        get_object(Range=f"bytes={start}-{start + RANGE_SIZE - 1}")
+        for start in range(0, len(IMAGE_BYTES), RANGE_SIZE)
+    ]
+    downloader = ImageDownloader(s3_client, in_memory=True, ranged_downloader=ranged_downloader)
+
+    source = downloader.download_image(image_media, scratch)
+
+    assert source.read() == IMAGE_BYTES
+    image_media.refresh_metadata.assert_called_once()
+
+
+# ===================== TESTS: read_head =====================
+
+
+def test_read_head(s3_client, image_media):
+    """Test the first bytes are read with a single ranged GET pinned to the ETag."""
+    downloader = ImageDownloader(s3_client)
+
+    head = downloader.read_head(image_media, 6)
+
+    assert head == IMAGE_BYTES[:6]
+    s3_client.get_object.assert_called_once_with(
+        Bucket="raw-bucket", Key="user/images/image", Range="bytes=0-5", IfMatch=image_media.etag
+    )
@@ -0,0 +1,51 @@
+from unittest.mock import Mock
+
+import pytest
+from image_media import ImageMedia
+
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
+
+# ===================== CONSTANTS =====================
+
+METADATA = ObjectMetadata(content_type="image/png", size=1024, etag='"etag"')
+HEAD_RESPONSE = {"ContentType": "image/jpeg", "ContentLength": 2048, "ETag": '"new-etag"'}
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def s3_client():
+    client = Mock()
+    client.head_object.return_value = HEAD_RESPONSE
+    return client
+
+
+# ===================== TESTS: ImageMedia =====================
+
+
+def test_image_media_trusts_given_metadata(s3_client):
+    """Test metadata captured upstream is used without requesting it again."""
+    image_media = ImageMedia(s3_client, "raw-bucket", "user/images/image", "image", METADATA)
+
+    assert image_media.content_type == "image/png"
+    assert image_media.etag == '"etag"'
+    s3_client.head_object.assert_not_called()
+
+
+def test_image_media_heads_without_metadata(s3_client):
+    """Test the image is HEADed once when no metadata is given."""
+    image_media = ImageMedia(s3_client, "raw-bucket", "user/images/image", "image")
+
+    assert image_media.content_type == "image/jpeg"
+    assert image_media.metadata.size == 2048
+    s3_client.head_object.assert_called_once()
+
+
+def test_refresh_metadata(s3_client):
+    """Test refreshing the metadata replaces the content type and ETag."""
+    image_media = ImageMedia(s3_client, "raw-bucket", "user/images/image", "image", METADATA)
+
+    image_media.refresh_metadata()
+
+    assert image_media.etag == '"new-etag"'
+    assert image_media.content_type == "image/jpeg"
@@ -0,0 +1,135 @@
+import json
+from unittest.mock import Mock
+
+import app
+import pytest
+from aws_image_service import AWSImageProcessingService, JobResult
+from local_queue import InMemoryQueue
+
+# ===================== CONSTANTS =====================
+
+JOB = {
+    "bucket": "raw-bucket",
+    "key": "user/images/a",
+    "filename": "a",
+    "extensions": ["JPEG"],
+    "sizes": ["TINY"],
+}
+
+METADATA = {"content_type": "image/jpeg", "size": 1024, "etag": '"etag"'}
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = Mock()
+    monkeypatch.setattr(app, "get_service", lambda processed_bucket: service)
+    return service
+
+
+# ===================== TESTS: lambda_handler =====================
+
+
+def test_lambda_handler_processes_single_jobs(service):
+    """Test an event with one bucket and key is processed as a single job."""
+    response = app.lambda_handler(JOB, None)
+
+    assert response["statusCode"] == 200
+    service.process_image.assert_called_once()
+    service.process_batch.assert_not_called()
+
+
+def test_lambda_handler_processes_batches(service):
+    """Test a list of jobs is processed as one batch with a result per job."""
+    service.process_batch.return_value = [JobResult("a", True), JobResult("b", True)]
+
+    response = app.lambda_handler({"jobs": [JOB, {**JOB, "filename": "b"}]}, None)
+
+    assert response["statusCode"] == 200
+    assert [result["statusCode"] for result in response["results"]] == [200, 200]
+    assert [job.filename for job in service.process_batch.call_args.args[0]] == ["a", "b"]
+
+
+def test_lambda_handler_reports_invalid_and_failed_jobs(service):
+    """Test invalid jobs are reported in place and the batch is a partial success."""
+    service.process_batch.return_value = [JobResult("b", False, "Processing failed")]
+    jobs = [{**JOB, "sizes": ["UNKNOWN"]}, {**JOB, "filename": "b"}]
+
+    response = app.lambda_handler({"jobs": jobs}, None)
+
+    assert response["statusCode"] == 207
+    assert [result["statusCode"] for result in response["results"]] == [400, 500]
+    assert len(service.process_batch.call_args.args[0]) == 1
+
+
+def test_lambda_handler_rejects_empty_batches(service):
+    """Test a batch without jobs is rejected."""
+    assert app.lambda_handler({"jobs": []}, None)["statusCode"] == 400
+
+
+# ===================== TESTS: sqs_handler =====================
+
+
+def test_sqs_handler_reports_only_failed_messages(service):
+    """Test only the messages of failed jobs are returned as batch item failures."""
+    queue = InMemoryQueue()
+    for filename in ["a", "b", "c"]:
+        queue.send_message({**JOB, "filename": filename})
+    service.process_batch.side_effect = lambda jobs: [
+        JobResult(job.filename, job.filename != "b") for job in jobs
+    ]
+    event = queue.receive_event()
+
+    response = app.lambda_handler(event, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": event["Records"][1]["messageId"]}]}
+
+
+def test_sqs_handler_accepts_single_extension_payloads(service):
+    """Test messages with the single extension payload of the API are processed."""
+    service.process_batch.return_value = [JobResult("a", True)]
+    payload = {key: value for key, value in JOB.items() if key != "extensions"}
+    record = {"messageId": "1", "body": json.dumps({**payload, "extension": "WEBP"})}
+
+    assert app.sqs_handler({"Records": [record]}, None) == {"batchItemFailures": []}
+    assert [
+        extension.name for extension in service.process_batch.call_args.args[0][0].extensions
+    ] == ["WEBP"]
+
+
+def test_sqs_handler_drops_invalid_messages(service):
+    """Test messages that can never succeed are not retried."""
+    records = [{"messageId": "1", "body": "not json"}, {"messageId": "2", "body": "[]"}]
+
+    assert app.sqs_handler({"Records": records}, None) == {"batchItemFailures": []}
+    service.process_batch.assert_not_called()
+
+
+def test_sqs_handler_drains_the_queue_offline(monkeypatch):
+    """Test a queue is drained through the real batch service, retrying failed jobs."""
+    monkeypatch.setenv("CONTENT_INDEX_BACKEND", "none")
+    service = AWSImageProcessingService(Mock(), "processed-bucket")
+    attempts = {}
+
+    def process_images(image, *args):
+        attempts[image.filename] = attempts.get(image.filename, 0) + 1
+        # "flaky" fails its first attempt, "broken" every attempt
+        return image.filename != "broken" and (image.filename != "flaky" or attempts["flaky"] > 1)
+
+    service.image_service = Mock()
+    service.image_service.process_images.side_effect = process_images
+    monkeypatch.setattr(app, "get_service", lambda processed_bucket: service)
+
+    queue = InMemoryQueue(max_receive_count=3)
+    filenames = [f"image-{index}" for index in range(25)] + ["flaky", "broken"]
+    for filename in filenames:
+        queue.send_message({**JOB, "filename": filename, "metadata": METADATA})
+
+    queue.drain(app.lambda_handler)
+
+    assert len(queue) == 0
+    assert attempts["flaky"] == 2
+    assert attempts["broken"] == 3
+    assert [json.loads(message.body)["filename"] for message in queue.dead_letters] == ["broken"]
+    assert all(attempts[filename] == 1 for filename in filenames[:25])
@@ -0,0 +1,436 @@
+import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from decode_planner import DecodeMethod
+from encoder_profiles import EncoderProfile
+from executors import InlineExecutor, process_pool_supported
+from image_backends import ImageBackend, ImageBackendType, NumpyBackend, backend_supported
+from image_processor import ImageProcessor
+from PIL import Image as PILImage
+from placeholder import encode_blurhash
+
+from shared.media import Extension, Size
+from shared.services.aws.s3.s3_object_metadata import PLACEHOLDER_METADATA_KEY
+from shared.services.scratch_space import ScratchSpace
+
+# ===================== CONSTANTS =====================
+
+ALL_SIZES = [Size.TINY, Size.SMALL, Size.MEDIUM, Size.LARGE, Size.HUGE]
+SOURCE_DIMENSIONS = (4320, 4320)
+SMALL_SOURCE_DIMENSIONS = (800, 800)
+
+EXPECTED_DIMENSIONS = {
+    Size.TINY: (120, 120),
+    Size.SMALL: (270, 270),
+    Size.MEDIUM: (540, 540),
+    Size.LARGE: (1080, 1080),
+    Size.HUGE: (2160, 2160),
+}
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def processor():
+    return ImageProcessor()
+
+
+@pytest.fixture
+def scratch(tmp_path):
+    with ScratchSpace(root=tmp_path) as scratch:
+        yield scratch
+
+
+@pytest.fixture
+def source_path(tmp_path):
+    path = tmp_path / "source.jpeg"
+    PILImage.new("RGB", SMALL_SOURCE_DIMENSIONS, (200, 10, 10)).save(path, "JPEG")
+    return path
+
+
+def record_resize_bases(processor, mocker):
+    """Patch _resize_image to record the dimensions of every base image it is given."""
+    bases = []
+    original = processor._resize_image
+
+    def resize(img, dimensions, profile):
+        bases.append(img.size)
+        return original(img, dimensions, profile)
+
+    mocker.patch.object(processor, "_resize_image", side_effect=resize)
+    return bases
+
+
+# ===================== TESTS: _resize_cascade =====================
+
+
+def test_resize_cascade_yields_largest_first(processor):
+    """Test the cascade yields every requested size from largest to smallest."""
+    img = PILImage.new("RGB", SOURCE_DIMENSIONS)
+
+    variants = list(processor._resize_cascade(img, ALL_SIZES))
+
+    assert [size for size, _ in variants] == list(reversed(ALL_SIZES))
+    for size, variant in variants:
+        assert variant.size == EXPECTED_DIMENSIONS[size]
+
+
+def test_resize_cascade_reuses_previous_variants(processor, mocker):
+    """Test only the largest variant is resized from the full resolution source."""
+    img = PILImage.new("RGB", SOURCE_DIMENSIONS)
+    bases = record_resize_bases(processor, mocker)
+
+    list(processor._resize_cascade(img, ALL_SIZES))
+
+    assert bases == [SOURCE_DIMENSIONS, (2160, 2160), (1080, 1080), (540, 540), (270, 270)]
+
+
+def test_resize_cascade_falls_back_to_source(processor, mocker):
+    """Test a variant is resized from the source when the previous one is too small."""
+    img = PILImage.new("RGB", SOURCE_DIMENSIONS)
+    bases = record_resize_bases(processor, mocker)
+
+    list(processor._resize_cascade(img, [Size.HUGE, Size.MEDIUM, Size.TINY]))
+
+    assert bases == [SOURCE_DIMENSIONS, (2160, 2160), (540, 540)]
+
+
+def test_resize_cascade_skips_upscaled_variants(processor, mocker):
+    """Test upscaled variants are never used as a cascade base."""
+    img = PILImage.new("RGB", SMALL_SOURCE_DIMENSIONS)
+    bases = record_resize_bases(processor, mocker)
+
+    list(processor._resize_cascade(img, ALL_SIZES))
+
+    assert bases == [SMALL_SOURCE_DIMENSIONS] * 3 + [(540, 540), (270, 270)]
+
+
+@pytest.mark.skipif(not backend_supported(ImageBackendType.NUMPY), reason="numpy is not installed")
+def test_resize_cascade_with_backend_ladder(mocker):
+    """Test backends resizing whole ladders resize every size, instead of the cascade."""
+    processor = ImageProcessor(backend=NumpyBackend())
+    resize_spy = mocker.spy(processor, "_resize_image")
+    img = PILImage.new("RGB", SOURCE_DIMENSIONS)
+
+    variants = list(processor._resize_cascade(img, ALL_SIZES))
+
+    assert [size for size, _ in variants] == ALL_SIZES[::-1]
+    assert all(variant.size == EXPECTED_DIMENSIONS[size] for size, variant in variants)
+    assert resize_spy.call_count == 0
+
+
+# ===================== TESTS: process_and_upload_images =====================
+
+
+def test_process_and_upload_images_decodes_once(processor, source_path, mocker):
+    """Test the source is opened once for the whole ladder and every size is uploaded."""
+    open_spy = mocker.spy(PILImage, "open")
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        processor.process_and_upload_images(
+            source_path, image_media, "bucket", [Extension.JPEG], ALL_SIZES, executor, uploader
+        )
+
+    assert open_spy.call_count == 1
+    uploaded_sizes = {call.args[3] for call in uploader.upload_image.call_args_list}
+    assert uploaded_sizes == set(ALL_SIZES)
+
+
+def test_process_and_upload_images_in_every_extension(processor, source_path, mocker):
+    """Test every extension is encoded from the same decode and resized variants."""
+    open_spy = mocker.spy(PILImage, "open")
+    resize_spy = mocker.spy(processor, "_resize_image")
+    extensions = [Extension.JPEG, Extension.WEBP, Extension.AVIF]
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        processor.process_and_upload_images(
+            source_path, image_media, "bucket", extensions, ALL_SIZES, executor, uploader
+        )
+
+    assert open_spy.call_count == 1
+    assert resize_spy.call_count == len(ALL_SIZES)
+    uploaded = {call.args[3:5]: call.args[0] for call in uploader.upload_image.call_args_list}
+    assert set(uploaded) == {(size, extension) for size in ALL_SIZES for extension in extensions}
+    assert PILImage.open(uploaded[Size.TINY, Extension.AVIF]).format == "AVIF"
+
+
+def test_process_and_upload_images_only_given_variants(processor, source_path, mocker):
+    """Test only the given variants are resized and uploaded, such as the missing ones."""
+    resize_spy = mocker.spy(processor, "_resize_image")
+    variants = {
+        (Size.TINY, Extension.JPEG),
+        (Size.TINY, Extension.WEBP),
+        (Size.LARGE, Extension.WEBP),
+    }
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        processor.process_and_upload_images(
+            source_path,
+            image_media,
+            "bucket",
+            [Extension.JPEG, Extension.WEBP],
+            ALL_SIZES,
+            executor,
+            uploader,
+            variants,
+        )
+
+    assert resize_spy.call_count == 2
+    assert {call.args[3:5] for call in uploader.upload_image.call_args_list} == variants
+
+
+def test_process_and_upload_images_with_backend(source_path, mocker):
+    """Test the source is decoded, resized and encoded by the image backend of the processor."""
+    backend = ImageBackend()
+    decode_spy = mocker.spy(backend, "decode")
+    resize_spy = mocker.spy(backend, "resize")
+    encode_spy = mocker.spy(backend, "encode")
+    processor = ImageProcessor(backend=backend)
+    uploader = Mock()
+
+    processor.process_and_upload_images(
+        source_path,
+        Mock(filename="image"),
+        "bucket",
+        [Extension.JPEG, Extension.WEBP],
+        ALL_SIZES,
+        InlineExecutor(),
+        uploader,
+    )
+
+    assert decode_spy.call_count == 1
+    assert resize_spy.call_count == len(ALL_SIZES)
+    assert encode_spy.call_count == len(ALL_SIZES) * 2
+    assert uploader.upload_image.call_count == len(ALL_SIZES) * 2
+
+
+def test_process_and_upload_images_with_placeholder(processor, source_path):
+    """Test every variant is uploaded with the BlurHash of the source as its metadata."""
+    uploader = Mock()
+
+    processor.process_and_upload_images(
+        source_path,
+        Mock(filename="image"),
+        "bucket",
+        [Extension.JPEG, Extension.WEBP],
+        ALL_SIZES,
+        InlineExecutor(),
+        uploader,
+    )
+
+    metadata = [call.args[5] for call in uploader.upload_image.call_args_list]
+    assert len(metadata) == len(ALL_SIZES) * 2
+    assert all(meta == metadata[0] for meta in metadata)
+    assert len(metadata[0][PLACEHOLDER_METADATA_KEY]) == 28
+
+
+def test_process_and_upload_images_without_placeholder(source_path):
+    """Test variants are uploaded without metadata when placeholders are disabled."""
+    processor = ImageProcessor(placeholders=False)
+    uploader = Mock()
+
+    processor.process_and_upload_images(
+        source_path,
+        Mock(filename="image"),
+        "bucket",
+        [Extension.JPEG],
+        ALL_SIZES,
+        InlineExecutor(),
+        uploader,
+    )
+
+    assert all(call.args[5] == {} for call in uploader.upload_image.call_args_list)
+
+
+# ===================== TESTS: process_and_upload_thumbnail =====================
+
+
+def test_process_and_upload_thumbnail(processor, scratch):
+    """Test the variants are resized from the thumbnail, without a placeholder of its pixels."""
+    thumbnail = PILImage.new("RGB", (160, 120), (200, 10, 10))
+    variants = {(Size.TINY, Extension.JPEG), (Size.TINY, Extension.WEBP)}
+    uploader = Mock()
+
+    processor.process_and_upload_thumbnail(
+        thumbnail, Mock(filename="image"), "bucket", uploader, variants, scratch
+    )
+
+    uploaded = {call.args[3:5]: call.args[0] for call in uploader.upload_image.call_args_list}
+    assert set(uploaded) == variants
+    assert PILImage.open(uploaded[Size.TINY, Extension.WEBP]).size == EXPECTED_DIMENSIONS[Size.TINY]
+    assert all(call.args[5] == {} for call in uploader.upload_image.call_args_list)
+
+
+# ===================== TESTS: _encode_image =====================
+
+
+def test_encode_image_into_memory(scratch):
+    """Test variants are encoded into an in-memory buffer."""
+    processor = ImageProcessor(in_memory=True)
+    img = PILImage.new("RGB", (120, 120))
+
+    body = processor._encode_image(img, Extension.JPEG, Size.TINY, "image_tiny", scratch)
+
+    assert isinstance(body, io.BytesIO)
+    assert PILImage.open(body).size == (120, 120)
+
+
+def test_encode_image_spills_to_disk(scratch):
+    """Test variants whose pixels exceed the in-memory limit are encoded into a scratch file."""
+    processor = ImageProcessor(in_memory=True, max_in_memory_bytes=1024)
+    img = PILImage.new("RGB", (120, 120))
+
+    body = processor._encode_image(img, Extension.JPEG, Size.TINY, "image_tiny", scratch)
+
+    assert isinstance(body, Path)
+    assert body.parent == scratch.directory
+    assert PILImage.open(body).size == (120, 120)
+
+
+def test_encode_image_over_scratch_budget(tmp_path):
+    """Test spilling a variant larger than the scratch budget fails before it is encoded."""
+    processor = ImageProcessor(in_memory=False)
+    img = PILImage.new("RGB", (120, 120))
+
+    with ScratchSpace(budget_bytes=1024, root=tmp_path) as scratch:
+        with pytest.raises(ScratchSpace.BudgetExceeded):
+            processor._encode_image(img, Extension.JPEG, Size.TINY, "image_tiny", scratch)
+
+
+def test_encode_image_applies_encoder_profile(scratch):
+    """Test variants are saved with the encoder profile of their extension and size."""
+    profiles = {Extension.JPEG: {Size.MEDIUM: EncoderProfile(quality=60, progressive=True)}}
+    processor = ImageProcessor(encoder_profiles=profiles)
+    img = PILImage.new("RGB", (540, 540))
+
+    encoded = PILImage.open(
+        processor._encode_image(img, Extension.JPEG, Size.MEDIUM, "image", scratch)
+    )
+
+    assert encoded.info.get("progressive")
+
+
+def test_large_png_variants_are_streamed(source_path):
+    """Test variants over the streaming threshold are encoded straight into an S3 upload."""
+    processor = ImageProcessor(stream_min_bytes=EXPECTED_DIMENSIONS[Size.LARGE][0] ** 2 * 3)
+    streams = {}
+
+    def stream_image(bucket, image_media, size, extension, metadata=None):
+        streams[size] = io.BytesIO()
+        return nullcontext(streams[size])
+
+    uploader = Mock(stream_image=Mock(side_effect=stream_image))
+    image_media = Mock(filename="image")
+
+    processor.process_and_upload_images(
+        source_path, image_media, "bucket", [Extension.PNG], ALL_SIZES, InlineExecutor(), uploader
+    )
+
+    assert set(streams) == {Size.LARGE, Size.HUGE}
+    uploaded_sizes = {call.args[3] for call in uploader.upload_image.call_args_list}
+    assert uploaded_sizes == {Size.TINY, Size.SMALL, Size.MEDIUM}
+    assert PILImage.open(streams[Size.HUGE]).size == EXPECTED_DIMENSIONS[Size.HUGE]
+
+
+@pytest.mark.skipif(not process_pool_supported(), reason="shared memory is not available")
+def test_process_and_upload_images_in_processes(processor, source_path):
+    """Test every size is encoded by process pool workers and uploaded from the parent."""
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        processor.process_and_upload_images(
+            source_path, image_media, "bucket", [Extension.JPEG], ALL_SIZES, executor, uploader
+        )
+
+    uploaded = {call.args[3]: call.args[0] for call in uploader.upload_image.call_args_list}
+    assert set(uploaded) == set(ALL_SIZES)
+    assert PILImage.open(uploaded[Size.TINY]).size == EXPECTED_DIMENSIONS[Size.TINY]
+
+
+# ===================== TESTS: tiled resize =====================
+
+
+def test_process_and_upload_images_in_strips(tmp_path):
+    """Test tiled jobs decode PNG rows in strips and upload the pixels of one-shot resizes."""
+    processor = ImageProcessor(stream_min_bytes=SOURCE_DIMENSIONS[0] ** 2 * 4)
+    path = tmp_path / "source.png"
+    source = PILImage.linear_gradient("L").resize((1500, 1100)).convert("RGB")
+    source.save(path, "PNG")
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        plan = processor.process_and_upload_images(
+            path, image_media, "bucket", [Extension.PNG], ALL_SIZES, executor, uploader, tiled=True
+        )
+
+    assert plan.method is DecodeMethod.STRIPS
+    uploaded = {call.args[3]: call.args[0] for call in uploader.upload_image.call_args_list}
+    assert set(uploaded) == set(ALL_SIZES)
+    for size in [Size.TINY, Size.MEDIUM]:
+        expected = processor.resampling.for_size(size).resize(source, EXPECTED_DIMENSIONS[size])
+        assert PILImage.open(uploaded[size]).tobytes() == expected.tobytes()
+    placeholders = {
+        call.args[5][PLACEHOLDER_METADATA_KEY] for call in uploader.upload_image.call_args_list
+    }
+    assert placeholders == {encode_blurhash(source, source.size)}
+
+
+def test_process_and_upload_images_in_strips_of_decoded_image(processor, source_path, mocker):
+    """Test tiled jobs decode sources that can't be decoded in strips whole, as planned."""
+    decode_spy = mocker.spy(processor.decode_planner, "decode")
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    plan = processor.process_and_upload_images(
+        source_path,
+        image_media,
+        "bucket",
+        [Extension.JPEG],
+        ALL_SIZES,
+        InlineExecutor(),
+        uploader,
+        tiled=True,
+    )
+
+    assert plan.method is not DecodeMethod.STRIPS
+    assert decode_spy.call_count == 1
+    assert {call.args[3] for call in uploader.upload_image.call_args_list} == set(ALL_SIZES)
+
+
+# ===================== TESTS: _resize_animation =====================
+
+
+def test_animated_gif_ladder(processor, tmp_path):
+    """Test every size of an animated GIF keeps all frames and their durations."""
+    path = tmp_path / "source.gif"
+    frames = [PILImage.new("RGB", SMALL_SOURCE_DIMENSIONS, (i * 40, 0, 0)) for i in range(4)]
+    frames[0].save(path, "GIF", save_all=True, append_images=frames[1:], duration=[40, 80] * 2)
+    uploader = Mock()
+    image_media = Mock(filename="image")
+
+    processor.process_and_upload_images(
+        path, image_media, "bucket", [Extension.GIF], ALL_SIZES, InlineExecutor(), uploader
+    )
+
+    uploaded = {call.args[3]: call.args[0] for call in uploader.upload_image.call_args_list}
+    assert set(uploaded) == set(ALL_SIZES)
+    for size, body in uploaded.items():
+        gif = PILImage.open(body)
+        durations = []
+        for index in range(gif.n_frames):
+            gif.seek(index)
+            durations.append(gif.info["duration"])
+        assert gif.size == EXPECTED_DIMENSIONS[size]
+        assert durations == [40, 80] * 2
@@ -0,0 +1,365 @@
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+from content_index import ContentRecord, SQLiteContentIndex, content_key_from_source
+from executors import InlineExecutor, process_pool_supported
+from image_service import ImageService
+from memory_guard import MemoryStrategy
+from PIL import Image as PILImage
+
+from shared.media import Extension, Size
+from shared.media.memory_estimator import MEMORY_HEADROOM
+
+# ===================== CONSTANTS =====================
+
+ETAG = '"9e107d9d372bb6826bd81d3542a419d6"'
+ETAG_KEY = "md5:9e107d9d372bb6826bd81d3542a419d6"
+MULTIPART_ETAG = '"9e107d9d372bb6826bd81d3542a419d6-2"'
+SOURCE_DIMENSIONS = (400, 300)
+EXTENSIONS = [Extension.JPEG, Extension.WEBP]
+SIZES = [Size.TINY, Size.SMALL]
+VARIANTS = frozenset((size, extension) for size in SIZES for extension in EXTENSIONS)
+
+# ===================== FIXTURES =====================
+
+
+def create_content():
+    buffer = io.BytesIO()
+    PILImage.new("RGB", SOURCE_DIMENSIONS).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+CONTENT = create_content()
+
+
+@pytest.fixture
+def s3_client():
+    client = Mock()
+    client.get_paginator.return_value.paginate.return_value = []
+    return client
+
+
+@pytest.fixture
+def content_index(tmp_path):
+    index = SQLiteContentIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def service(s3_client, content_index):
+    service = ImageService(s3_client, content_index)
+    service.downloader = Mock()
+    service.downloader.download_image.side_effect = lambda image_media, scratch: io.BytesIO(CONTENT)
+    service.processor = Mock()
+    return service
+
+
+def create_image_media(filename="upload", etag=ETAG):
+    return Mock(filename=filename, etag=etag)
+
+
+def list_existing_keys(s3_client, keys):
+    s3_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": key} for key in keys]}
+    ]
+
+
+def copied_keys(s3_client):
+    return {
+        (call.kwargs["CopySource"]["Key"], call.kwargs["Key"])
+        for call in s3_client.copy_object.mock_calls
+    }
+
+
+# ===================== TESTS: ImageService existing variants =====================
+
+
+def test_process_images_skips_existing_images(service, s3_client):
+    """Test nothing is downloaded when a single listing finds every variant."""
+    list_existing_keys(
+        s3_client,
+        ["upload/tiny.jpeg", "upload/tiny.webp", "upload/small.jpeg", "upload/small.webp"],
+    )
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    s3_client.get_paginator.return_value.paginate.assert_called_once_with(
+        Bucket="processed-bucket", Prefix="upload/"
+    )
+    service.downloader.download_image.assert_not_called()
+    s3_client.head_object.assert_not_called()
+
+
+def test_process_images_only_missing_variants(service, s3_client, content_index):
+    """Test only the variants missing from the listing are processed."""
+    list_existing_keys(s3_client, ["upload/tiny.jpeg", "upload/tiny.webp", "upload/small.jpeg"])
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    process = service.processor.process_and_upload_images
+    assert process.call_args.args[-1] == {(Size.SMALL, Extension.WEBP)}
+    assert content_index.get(ETAG_KEY) == ContentRecord("upload", VARIANTS)
+
+
+# ===================== TESTS: ImageService deduplication =====================
+
+
+def test_process_images_records_processed_content(service, content_index):
+    """Test processed images are recorded under the content key of their ETag."""
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    service.processor.process_and_upload_images.assert_called_once()
+    assert content_index.get(ETAG_KEY) == ContentRecord("upload", VARIANTS)
+
+
+def test_process_images_copies_variants_of_known_content(service, s3_client, content_index):
+    """Test known content is copied from its variants without downloading or processing."""
+    content_index.put(ETAG_KEY, ContentRecord("original", VARIANTS))
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    service.downloader.download_image.assert_not_called()
+    service.processor.process_and_upload_images.assert_not_called()
+    assert copied_keys(s3_client) == {
+        ("original/tiny.jpeg", "upload/tiny.jpeg"),
+        ("original/tiny.webp", "upload/tiny.webp"),
+        ("original/small.jpeg", "upload/small.jpeg"),
+        ("original/small.webp", "upload/small.webp"),
+    }
+
+
+def test_process_images_hashes_multipart_uploads(service, s3_client, content_index):
+    """Test content without a single part ETag is looked up by the SHA-256 of its bytes."""
+    content_index.put(
+        content_key_from_source(io.BytesIO(CONTENT)), ContentRecord("original", VARIANTS)
+    )
+
+    service.process_images(
+        create_image_media(etag=MULTIPART_ETAG), "processed-bucket", EXTENSIONS, SIZES
+    )
+
+    service.downloader.download_image.assert_called_once()
+    service.processor.process_and_upload_images.assert_not_called()
+    assert len(copied_keys(s3_client)) == len(VARIANTS)
+
+
+def test_process_images_processes_uncovered_variants(service, s3_client, content_index):
+    """Test known content is processed again when variants it lacks are requested."""
+    content_index.put(ETAG_KEY, ContentRecord("original", frozenset({(Size.TINY, Extension.JPEG)})))
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    s3_client.copy_object.assert_not_called()
+    service.processor.process_and_upload_images.assert_called_once()
+    assert content_index.get(ETAG_KEY) == ContentRecord("upload", VARIANTS)
+
+
+def test_process_images_falls_back_when_variants_are_gone(service, s3_client, content_index):
+    """Test content whose variants were deleted is processed and recorded again."""
+    content_index.put(ETAG_KEY, ContentRecord("original", VARIANTS))
+    s3_client.copy_object.side_effect = ClientError({"Error": {"Code": "NoSuchKey"}}, "CopyObject")
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    service.processor.process_and_upload_images.assert_called_once()
+    assert content_index.get(ETAG_KEY) == ContentRecord("upload", VARIANTS)
+
+
+def test_process_images_reprocesses_stale_record_of_same_image(service, s3_client, content_index):
+    """Test variants missing from an image its own record covers are processed again."""
+    content_index.put(ETAG_KEY, ContentRecord("upload", VARIANTS))
+    list_existing_keys(s3_client, ["upload/tiny.jpeg"])
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    s3_client.copy_object.assert_not_called()
+    process = service.processor.process_and_upload_images
+    assert process.call_args.args[-1] == VARIANTS - {(Size.TINY, Extension.JPEG)}
+    assert content_index.get(ETAG_KEY) == ContentRecord("upload", VARIANTS)
+
+
+def test_process_images_without_index(s3_client):
+    """Test every image is processed when deduplication is off."""
+    service = ImageService(s3_client)
+    service.downloader = Mock()
+    service.downloader.download_image.side_effect = lambda image_media, scratch: io.BytesIO(CONTENT)
+    service.processor = Mock()
+
+    service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    service.processor.process_and_upload_images.assert_called_once()
+    s3_client.copy_object.assert_not_called()
+
+
+# ===================== TESTS: ImageService EXIF thumbnails =====================
+
+
+def test_process_images_tiny_from_exif_thumbnail(service, content_index, mocker):
+    """Test a TINY preview is uploaded from the EXIF thumbnail before the image is downloaded."""
+    service.exif_thumbnails = True
+    thumbnail = PILImage.new("RGB", (160, 120))
+    open_thumbnail = mocker.patch("image_service.open_exif_thumbnail", return_value=thumbnail)
+    image_media = create_image_media()
+    image_media.extension = "jpeg"
+    download = service.downloader.download_image
+
+    service.processor.process_and_upload_thumbnail.side_effect = (
+        lambda *args: download.assert_not_called()
+    )
+    assert service.process_images(image_media, "processed-bucket", EXTENSIONS, SIZES)
+
+    assert open_thumbnail.call_args.args == (service.downloader.read_head.return_value, (120, 120))
+    thumbnail_call = service.processor.process_and_upload_thumbnail.call_args
+    assert thumbnail_call.args[0] is thumbnail
+    assert thumbnail_call.args[4] == {(Size.TINY, Extension.JPEG), (Size.TINY, Extension.WEBP)}
+    # The decoded source replaces the preview, with its placeholder
+    assert service.processor.process_and_upload_images.call_args.args[-1] == VARIANTS
+    assert content_index.get(ETAG_KEY) == ContentRecord("upload", VARIANTS)
+    service.s3_client.delete_objects.assert_not_called()
+
+
+def test_process_images_only_tiny_without_exif_preview(service, mocker):
+    """Test images missing TINY alone get no preview, as they are decoded right away."""
+    service.exif_thumbnails = True
+    mocker.patch("image_service.open_exif_thumbnail", return_value=PILImage.new("RGB", (160, 120)))
+    image_media = create_image_media()
+    image_media.extension = "jpeg"
+
+    assert service.process_images(image_media, "processed-bucket", EXTENSIONS, [Size.TINY])
+
+    service.processor.process_and_upload_thumbnail.assert_not_called()
+    service.downloader.download_image.assert_called_once()
+
+
+def test_process_images_deletes_exif_previews_of_failed_jobs(service, mocker):
+    """Test the previews of a failed job are deleted, so a retry produces them from the source."""
+    service.exif_thumbnails = True
+    mocker.patch("image_service.open_exif_thumbnail", return_value=PILImage.new("RGB", (160, 120)))
+    service.processor.process_and_upload_images.side_effect = OSError("Corrupted image")
+    image_media = create_image_media()
+    image_media.extension = "jpeg"
+
+    assert not service.process_images(image_media, "processed-bucket", EXTENSIONS, SIZES)
+
+    kwargs = service.s3_client.delete_objects.call_args.kwargs
+    assert kwargs["Bucket"] == "processed-bucket"
+    assert sorted(item["Key"] for item in kwargs["Delete"]["Objects"]) == [
+        "upload/tiny.jpeg",
+        "upload/tiny.webp",
+    ]
+
+
+@pytest.mark.parametrize("failure", ["no-thumbnail", "read-error", "upload-error"])
+def test_process_images_exif_thumbnail_falls_back(service, mocker, failure):
+    """Test TINY is left to the full decode without a good thumbnail, or when the path fails."""
+    service.exif_thumbnails = True
+    thumbnail = None if failure == "no-thumbnail" else PILImage.new("RGB", (160, 120))
+    mocker.patch("image_service.open_exif_thumbnail", return_value=thumbnail)
+    if failure == "read-error":
+        error = ClientError({"Error": {"Code": "PreconditionFailed"}}, "GetObject")
+        service.downloader.read_head.side_effect = error
+    elif failure == "upload-error":
+        service.processor.process_and_upload_thumbnail.side_effect = OSError("Upload failed")
+    image_media = create_image_media()
+    image_media.extension = "jpeg"
+
+    assert service.process_images(image_media, "processed-bucket", EXTENSIONS, SIZES)
+
+    assert service.processor.process_and_upload_images.call_args.args[-1] == VARIANTS
+
+
+@pytest.mark.parametrize("extension, enabled", [("png", True), ("jpeg", False)])
+def test_process_images_exif_thumbnail_jpeg_only(service, extension, enabled):
+    """Test the head of other formats, or of any image with the fast path off, isn't read."""
+    service.exif_thumbnails = enabled
+    image_media = create_image_media()
+    image_media.extension = extension
+
+    assert service.process_images(image_media, "processed-bucket", EXTENSIONS, SIZES)
+
+    service.downloader.read_head.assert_not_called()
+    assert service.processor.process_and_upload_images.call_args.args[-1] == VARIANTS
+
+
+# ===================== TESTS: ImageService memory guard =====================
+
+
+def test_process_images_in_low_memory_mode(service, mocker):
+    """Test low-memory jobs are resized in the calling thread instead of the batch executor."""
+    check = service.memory_guard.check
+    mocker.patch.object(
+        service.memory_guard,
+        "check",
+        side_effect=lambda *args: replace(check(*args), strategy=MemoryStrategy.LOW_MEMORY),
+    )
+
+    with ThreadPoolExecutor() as batch_executor:
+        assert service.process_images(
+            create_image_media(), "processed-bucket", EXTENSIONS, SIZES, batch_executor
+        )
+
+    executor = service.processor.process_and_upload_images.call_args.args[5]
+    assert isinstance(executor, InlineExecutor)
+
+
+@pytest.mark.skipif(not process_pool_supported(), reason="shared memory is not available")
+def test_process_images_in_strips(service):
+    """Test stills from the tiled pixel count are resized in strips, with variants on threads."""
+    service.memory_guard.tiled_min_pixels = 1000
+
+    with ProcessPoolExecutor(max_workers=1) as batch_executor:
+        assert service.process_images(
+            create_image_media(), "processed-bucket", EXTENSIONS, SIZES, batch_executor
+        )
+
+    call = service.processor.process_and_upload_images.call_args
+    assert call.kwargs["tiled"]
+    assert isinstance(call.args[5], ThreadPoolExecutor)
+
+
+def test_process_images_concurrent_jobs_share_the_memory(service, mocker):
+    """Test concurrent jobs of a batch each fitting in memory, but not together, run alone."""
+    plan = service.memory_guard.check(io.BytesIO(CONTENT), set(VARIANTS))
+    service.memory_guard.memory_bytes = int(plan.estimate.peak_bytes / MEMORY_HEADROOM) + 1
+    running, most_running = [0], [0]
+    lock = threading.Lock()
+
+    def process(*args, **kwargs):
+        with lock:
+            running[0] += 1
+            most_running[0] = max(most_running[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    service.processor.process_and_upload_images.side_effect = process
+    filenames = [f"upload-{index}" for index in range(4)]
+
+    with ThreadPoolExecutor(max_workers=len(filenames)) as job_executor:
+        results = job_executor.map(
+            lambda filename: service.process_images(
+                create_image_media(filename), "processed-bucket", EXTENSIONS, SIZES
+            ),
+            filenames,
+        )
+        assert all(results)
+
+    assert service.processor.process_and_upload_images.call_count == len(filenames)
+    assert most_running[0] == 1
+
+
+def test_process_images_rejects_images_too_large(service, content_index):
+    """Test jobs estimated not to fit in memory fail before any pixel is decoded."""
+    service.memory_guard.memory_bytes = 1024 * 1024
+
+    assert not service.process_images(create_image_media(), "processed-bucket", EXTENSIONS, SIZES)
+
+    service.processor.process_and_upload_images.assert_not_called()
+    assert content_index.get(ETAG_KEY) is None
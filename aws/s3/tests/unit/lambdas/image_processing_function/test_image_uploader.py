@@ -0,0 +1,137 @@
+import io
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+from image_uploader import ImageUploader
+
+from shared.media import Extension, Size
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def s3_client():
+    return Mock()
+
+
+@pytest.fixture
+def image_media():
+    return Mock(filename="image")
+
+
+# ===================== TESTS: upload_image =====================
+
+
+def test_upload_image_from_buffer(s3_client, image_media):
+    """Test in-memory images are uploaded with upload_fileobj and released afterwards."""
+    buffer = io.BytesIO(b"encoded")
+    buffer.seek(3)
+
+    ImageUploader(s3_client).upload_image(
+        buffer, "processed-bucket", image_media, Size.SMALL, Extension.JPEG
+    )
+
+    s3_client.upload_fileobj.assert_called_once()
+    args = s3_client.upload_fileobj.call_args.args
+    assert args[1:] == ("processed-bucket", "image/small.jpeg")
+    s3_client.upload_file.assert_not_called()
+    assert buffer.closed
+
+
+def test_upload_image_from_file(s3_client, image_media, tmp_path):
+    """Test images spilled to disk are uploaded with upload_file and deleted afterwards."""
+    path = tmp_path / "image_small.jpeg"
+    path.write_bytes(b"encoded")
+
+    ImageUploader(s3_client).upload_image(
+        path, "processed-bucket", image_media, Size.SMALL, Extension.JPEG
+    )
+
+    s3_client.upload_file.assert_called_once()
+    assert s3_client.upload_file.call_args.args[:3] == (
+        path,
+        "processed-bucket",
+        "image/small.jpeg",
+    )
+    assert not path.exists()
+
+
+def test_upload_image_content_type(s3_client, image_media):
+    """Test variants are uploaded with the full content type of their extension."""
+    ImageUploader(s3_client).upload_image(
+        io.BytesIO(b"encoded"), "processed-bucket", image_media, Size.SMALL, Extension.WEBP
+    )
+
+    extra_args = s3_client.upload_fileobj.call_args.kwargs["ExtraArgs"]
+    assert extra_args["ContentType"] == "image/webp"
+    assert "Metadata" not in extra_args
+
+
+def test_upload_image_metadata(s3_client, image_media):
+    """Test variants are uploaded with the user metadata given, such as their placeholder."""
+    ImageUploader(s3_client).upload_image(
+        io.BytesIO(b"encoded"),
+        "processed-bucket",
+        image_media,
+        Size.SMALL,
+        Extension.WEBP,
+        {"placeholder": "L00000fQ"},
+    )
+
+    extra_args = s3_client.upload_fileobj.call_args.kwargs["ExtraArgs"]
+    assert extra_args["Metadata"] == {"placeholder": "L00000fQ"}
+
+
+# ===================== TESTS: stream_image =====================
+
+
+def test_stream_image(s3_client, image_media):
+    """Test an image streamed while encoding is uploaded under the variant key."""
+    with ImageUploader(s3_client).stream_image(
+        "processed-bucket", image_media, Size.HUGE, Extension.PNG
+    ) as stream:
+        stream.write(b"encoded")
+
+    s3_client.put_object.assert_called_once()
+    kwargs = s3_client.put_object.call_args.kwargs
+    assert (kwargs["Bucket"], kwargs["Key"], kwargs["Body"]) == (
+        "processed-bucket",
+        "image/huge.png",
+        b"encoded",
+    )
+
+
+def test_stream_image_metadata(s3_client, image_media):
+    """Test an image streamed while encoding is uploaded with the user metadata given."""
+    with ImageUploader(s3_client).stream_image(
+        "processed-bucket", image_media, Size.HUGE, Extension.PNG, {"placeholder": "L00000fQ"}
+    ) as stream:
+        stream.write(b"encoded")
+
+    assert s3_client.put_object.call_args.kwargs["Metadata"] == {"placeholder": "L00000fQ"}
+
+
+def test_stream_image_client_error(s3_client, image_media):
+    """Test client errors of the upload fail the stream like those of upload_image."""
+    s3_client.put_object.side_effect = ClientError({"Error": {"Code": "AccessDenied"}}, "PutObject")
+
+    with pytest.raises(ImageUploader.UploadFailed):
+        with ImageUploader(s3_client).stream_image(
+            "processed-bucket", image_media, Size.HUGE, Extension.PNG
+        ) as stream:
+            stream.write(b"encoded")
+
+
+# ===================== TESTS: delete_images =====================
+
+
+def test_delete_images(s3_client, image_media):
+    """Test the variants are deleted in a single request."""
+    uploader = ImageUploader(s3_client)
+
+    uploader.delete_images("bucket", image_media, [(Size.TINY, Extension.JPEG)])
+
+    s3_client.delete_objects.assert_called_once()
+    objects = s3_client.delete_objects.call_args.kwargs["Delete"]["Objects"]
+    assert objects == [{"Key": f"{image_media.filename}/tiny.jpeg"}]
@@ -0,0 +1,44 @@
+from local_queue import InMemoryQueue
+
+# ===================== TESTS: InMemoryQueue =====================
+
+
+def test_receive_event_is_shaped_like_sqs():
+    """Test received batches are SQS Lambda events of at most max_messages records."""
+    queue = InMemoryQueue()
+    for index in range(3):
+        queue.send_message({"filename": str(index)})
+
+    event = queue.receive_event(max_messages=2)
+
+    assert len(event["Records"]) == 2
+    assert event["Records"][0]["eventSource"] == "aws:sqs"
+    assert event["Records"][0]["body"] == '{"filename": "0"}'
+    assert len(queue) == 3
+
+
+def test_acknowledge_deletes_succeeded_and_redelivers_failed():
+    """Test acknowledged messages are deleted and reported failures are received again."""
+    queue = InMemoryQueue()
+    first, second = queue.send_message({"filename": "a"}), queue.send_message({"filename": "b"})
+    event = queue.receive_event()
+
+    queue.acknowledge(event, {"batchItemFailures": [{"itemIdentifier": second}]})
+
+    records = queue.receive_event()["Records"]
+    assert [record["messageId"] for record in records] == [second]
+    assert records[0]["attributes"]["ApproximateReceiveCount"] == "2"
+    assert first not in {record["messageId"] for record in records}
+
+
+def test_failed_messages_move_to_dead_letters():
+    """Test messages failing max_receive_count times stop being delivered."""
+    queue = InMemoryQueue(max_receive_count=2)
+    message_id = queue.send_message({"filename": "a"})
+
+    def fail(event, context):
+        return {"batchItemFailures": [{"itemIdentifier": message_id}]}
+
+    assert queue.drain(fail) == 2
+    assert len(queue) == 0
+    assert [message.message_id for message in queue.dead_letters] == [message_id]
@@ -0,0 +1,154 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from decode_planner import DecodeMethod, DecodePlanner
+from memory_guard import MemoryGuard, MemoryStrategy
+from PIL import Image as PILImage
+
+from shared.media import Extension, Size
+from shared.media.memory_estimator import MEMORY_HEADROOM
+
+# ===================== CONSTANTS =====================
+
+GB = 1024 * 1024 * 1024
+STILL_VARIANTS = {(size, Extension.JPEG) for size in Size}
+ANIMATED_VARIANTS = {(size, Extension.GIF) for size in [Size.TINY, Size.SMALL]}
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def guard():
+    return MemoryGuard(DecodePlanner(enabled=False), memory_bytes=GB)
+
+
+def create_source(dimensions=(2000, 2000), frames=1, image_format="PNG"):
+    images = [PILImage.new("RGB", dimensions, (index, 0, 0)) for index in range(frames)]
+    buffer = io.BytesIO()
+    image_format = "GIF" if frames > 1 else image_format
+    images[0].save(buffer, image_format, save_all=frames > 1, append_images=images[1:])
+    buffer.seek(0)
+    return buffer
+
+
+# ===================== TESTS: MemoryGuard =====================
+
+
+def test_check_standard(guard):
+    """Test jobs fitting in memory with every variant in flight run as usual."""
+    source = create_source()
+
+    plan = guard.check(source, STILL_VARIANTS)
+
+    assert plan.strategy is MemoryStrategy.STANDARD
+    assert (plan.header.width, plan.header.height, plan.header.mode) == (2000, 2000, "RGB")
+    assert source.tell() == 0
+
+
+def test_check_low_memory(guard):
+    """Test jobs only fitting in memory one variant at a time run in low-memory mode."""
+    standard = guard.check(create_source(), STILL_VARIANTS).estimate
+    guard.memory_bytes = int(standard.peak_bytes / MEMORY_HEADROOM) - 1
+
+    plan = guard.check(create_source(), STILL_VARIANTS)
+
+    assert plan.strategy is MemoryStrategy.LOW_MEMORY
+    assert plan.estimate.peak_bytes < standard.peak_bytes
+
+
+def test_check_rejects_jobs_not_fitting_in_memory(guard):
+    """Test jobs too large for memory even in low-memory mode are rejected."""
+    guard.memory_bytes = 128 * 1024 * 1024
+
+    assert guard.check(create_source(), STILL_VARIANTS).strategy is MemoryStrategy.REJECT
+
+
+def test_check_rejects_sources_over_pixel_budget(guard):
+    """Test sources with more pixels than allowed are rejected whatever the memory."""
+    guard.max_source_pixels = 1000 * 1000
+
+    assert guard.check(create_source(), STILL_VARIANTS).strategy is MemoryStrategy.REJECT
+
+
+def test_check_counts_frames_of_animated_variants_only(guard):
+    """Test the frames of an animation only count when GIF variants are made from them."""
+    source = create_source((300, 300), frames=5)
+
+    animated = guard.check(source, ANIMATED_VARIANTS)
+    still = guard.check(source, {(Size.TINY, Extension.JPEG)})
+
+    assert animated.header.frames == 5
+    assert animated.estimate.output_bytes > 0
+    assert still.header.frames == 1
+    assert still.estimate.output_bytes == 0
+
+
+def test_check_tiled_from_pixel_count(guard):
+    """Test stills from the tiled pixel count are resized from PNG rows decoded in strips."""
+    guard.tiled_min_pixels = 1000 * 1000
+
+    plan = guard.check(create_source(), STILL_VARIANTS)
+
+    assert plan.strategy is MemoryStrategy.TILED
+    assert plan.decode_plan.method is DecodeMethod.STRIPS
+    assert plan.estimate.decode_bytes < 2000 * 2000 * 4
+
+
+def test_check_tiled_decodes_other_formats_whole(guard):
+    """Test sources that can't be decoded in strips are decoded whole, and read in strips."""
+    guard.tiled_min_pixels = 1000 * 1000
+
+    plan = guard.check(create_source(image_format="JPEG"), STILL_VARIANTS)
+
+    assert plan.strategy is MemoryStrategy.TILED
+    assert plan.decode_plan.method is not DecodeMethod.STRIPS
+    assert plan.estimate.decode_bytes >= 2000 * 2000 * 4
+
+
+def test_check_never_tiles_animations(guard):
+    """Test animated variants are never resized in strips, frames are decoded one at a time."""
+    guard.tiled_min_pixels = 1000
+
+    plan = guard.check(create_source((300, 300), frames=5), ANIMATED_VARIANTS)
+
+    assert plan.strategy is MemoryStrategy.STANDARD
+
+
+# ===================== TESTS: MemoryGuard.reserve =====================
+
+
+def run_concurrently(guard, plans):
+    """Run a job reserving memory for every plan at once, returning the most running together."""
+    running, most_running = [0], [0]
+    lock = threading.Lock()
+
+    def job(plan):
+        with guard.reserve(plan):
+            with lock:
+                running[0] += 1
+                most_running[0] = max(most_running[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    with ThreadPoolExecutor(max_workers=len(plans)) as executor:
+        list(executor.map(job, plans))
+    return most_running[0]
+
+
+def test_reserve_runs_jobs_fitting_together_at_once(guard):
+    """Test jobs whose estimates fit in memory together run at the same time."""
+    plan = guard.check(create_source((300, 300)), STILL_VARIANTS)
+
+    assert run_concurrently(guard, [plan] * 4) == 4
+
+
+def test_reserve_runs_jobs_over_the_shared_memory_alone(guard):
+    """Test jobs each fitting in memory, but not together, run one at a time."""
+    plan = guard.check(create_source(), STILL_VARIANTS)
+    guard.memory_bytes = int(plan.estimate.peak_bytes / MEMORY_HEADROOM) + 1
+
+    assert run_concurrently(guard, [plan] * 4) == 1
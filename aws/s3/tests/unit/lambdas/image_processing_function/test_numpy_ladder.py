@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from numpy_ladder import iter_ladder  # noqa: E402
+from PIL import Image as PILImage  # noqa: E402
+from resampling import BICUBIC_REDUCED, BOX, LANCZOS, LANCZOS_REDUCED  # noqa: E402
+
+# ===================== CONSTANTS =====================
+
+MODES = ["L", "LA", "RGB", "RGBA"]
+
+# The ladder of IMAGE_DIMENSIONS, largest first
+LADDER = [(2160, 2160), (1080, 1080), (540, 540), (270, 270), (120, 120)]
+
+# ===================== FIXTURES =====================
+
+
+def create_image(mode, dimensions):
+    """Create a smooth gradient with noise on top, so averages of blocks are easy to tell."""
+    width, height = dimensions
+    noise = PILImage.frombytes("RGBA", dimensions, random.Random(0).randbytes(width * height * 4))
+    gradient = PILImage.linear_gradient("L").resize(dimensions).convert("RGBA")
+    return PILImage.blend(gradient, noise, 0.3).convert(mode)
+
+
+def mean_difference(img, other):
+    return np.abs(np.asarray(img, dtype=int) - np.asarray(other, dtype=int)).mean()
+
+
+# ===================== TESTS: iter_ladder =====================
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("source_size", [(1080, 1080), (1000, 750), (1001, 999)], ids=str)
+@pytest.mark.parametrize("profile", [BOX, BICUBIC_REDUCED, LANCZOS_REDUCED], ids=str)
+def test_iter_ladder_resizes_every_target(mode, source_size, profile):
+    """Test every target is resized largest first, close to resizing it from the source."""
+    img = create_image(mode, source_size)
+    targets = [(dimensions, profile) for dimensions in LADDER[2:]]
+
+    variants = list(iter_ladder(img, targets))
+
+    assert [variant.size for variant in variants] == LADDER[2:]
+    for variant, (dimensions, _) in zip(variants, targets):
+        assert variant.mode == mode
+        assert mean_difference(variant, profile.resize(img, dimensions)) < 2
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB"])
+def test_iter_ladder_box_levels_are_block_averages(mode):
+    """Test Box targets a power of two below the source are levels of 2x2 averages."""
+    img = create_image(mode, (1080, 1080))
+
+    variants = list(iter_ladder(img, [(dimensions, BOX) for dimensions in LADDER[2:4]]))
+
+    assert variants[0].tobytes() == img.reduce(2).tobytes()
+    assert variants[1].tobytes() == img.reduce(2).reduce(2).tobytes()
+
+
+def test_iter_ladder_hands_levels_over_without_copy():
+    """Test levels that are targets are mapped by the variant rather than copied into it."""
+    img = create_image("L", (1080, 1080))
+
+    variant = next(iter_ladder(img, [((540, 540), BOX)]))
+
+    assert variant.readonly
+
+
+@pytest.mark.parametrize("mode", ["LA", "RGBA"])
+def test_iter_ladder_weights_colours_by_alpha(mode):
+    """Test the colours of transparent pixels don't bleed into the averages, as in Pillow."""
+    img = PILImage.new(mode, (4, 4), (0,) * len(mode))
+    img.paste((200,) * (len(mode) - 1) + (255,), (0, 0, 1, 1))
+
+    variant = next(iter_ladder(img, [((1, 1), BOX)]))
+
+    assert variant.getpixel((0, 0)) == BOX.resize(img, (1, 1)).getpixel((0, 0))
+    assert variant.getpixel((0, 0))[0] > 200
+
+
+def test_iter_ladder_targets_without_gap_from_the_source(mocker):
+    """Test targets without a reducing gap are resized from the source, then cascaded from."""
+    img = create_image("RGB", (1000, 1000))
+    resize_spy = mocker.spy(PILImage.Image, "resize")
+
+    variants = list(iter_ladder(img, [((540, 540), LANCZOS), ((270, 270), BICUBIC_REDUCED)]))
+
+    # The second is resampled from the first, with no level in between
+    assert [call.args[0].size for call in resize_spy.call_args_list] == [(1000, 1000), (540, 540)]
+    assert variants[0].tobytes() == LANCZOS.resize(img, (540, 540)).tobytes()
+
+
+def test_iter_ladder_upscales():
+    """Test targets larger than the source are upscaled from it."""
+    img = create_image("RGB", (500, 500))
+
+    variants = list(iter_ladder(img, [(LADDER[1], BOX), (LADDER[4], BOX)]))
+
+    assert variants[0].tobytes() == BOX.resize(img, LADDER[1]).tobytes()
+    assert variants[1].size == LADDER[4]
@@ -0,0 +1,120 @@
+import io
+import threading
+from unittest.mock import Mock
+
+import pytest
+from executors import InlineExecutor
+from image_uploader import ImageUploader
+from pipeline import VariantPipeline
+
+from shared.media import Extension, Size
+
+# ===================== CONSTANTS =====================
+
+SIZES = [Size.TINY, Size.SMALL, Size.MEDIUM]
+TIMEOUT = 5
+
+# ===================== FIXTURES =====================
+
+
+@pytest.fixture
+def uploader():
+    return Mock()
+
+
+def create_pipeline(uploader, **kwargs):
+    return VariantPipeline(InlineExecutor(), uploader, "bucket", Mock(filename="image"), **kwargs)
+
+
+def as_jpeg(encode):
+    """Wrap an encode function so its result is the JPEG body of the variant."""
+    return lambda *args: {Extension.JPEG: encode(*args)}
+
+
+# ===================== TESTS: VariantPipeline =====================
+
+
+def test_pipeline_uploads_every_variant(uploader):
+    """Test every encoded variant is uploaded with its size."""
+    with create_pipeline(uploader) as pipeline:
+        for size in SIZES:
+            pipeline.submit(size, as_jpeg(io.BytesIO), size.name.encode())
+        pipeline.wait()
+
+    uploaded = {call.args[3]: call.args[0].getvalue() for call in uploader.upload_image.mock_calls}
+    assert uploaded == {size: size.name.encode() for size in SIZES}
+
+
+def test_pipeline_wraps_encoded_bytes(uploader):
+    """Test bytes returned by process pool workers are uploaded from an in-memory buffer."""
+    with create_pipeline(uploader) as pipeline:
+        pipeline.submit(Size.TINY, as_jpeg(bytes), b"encoded")
+        pipeline.wait()
+
+    body = uploader.upload_image.call_args.args[0]
+    assert isinstance(body, io.BytesIO)
+    assert body.getvalue() == b"encoded"
+
+
+def test_pipeline_blocks_when_uploads_back_up(uploader):
+    """Test producing variants blocks once max_pending variants are waiting for upload."""
+    release_uploads = threading.Event()
+    uploader.upload_image.side_effect = lambda *args: release_uploads.wait(TIMEOUT)
+    encoded = []
+
+    def encode(size):
+        encoded.append(size)
+        return {Extension.JPEG: io.BytesIO()}
+
+    with create_pipeline(uploader, max_pending=2) as pipeline:
+        producer = threading.Thread(
+            target=lambda: [pipeline.submit(size, encode, size) for size in SIZES]
+        )
+        producer.start()
+        producer.join(0.2)
+
+        assert producer.is_alive()
+        assert encoded == SIZES[:2]
+
+        release_uploads.set()
+        producer.join(TIMEOUT)
+        pipeline.wait()
+
+    assert encoded == SIZES
+    assert uploader.upload_image.call_count == len(SIZES)
+
+
+def test_pipeline_raises_encode_errors(uploader):
+    """Test an encode failure is raised and stops further variants from being produced."""
+    with create_pipeline(uploader) as pipeline:
+        pipeline.submit(Size.TINY, as_jpeg(int), "not an image")
+
+        with pytest.raises(ValueError):
+            pipeline.submit(Size.SMALL, as_jpeg(io.BytesIO))
+        with pytest.raises(ValueError):
+            pipeline.wait()
+
+    uploader.upload_image.assert_not_called()
+
+
+def test_pipeline_raises_upload_errors(uploader):
+    """Test an upload failure is raised when waiting for the pipeline."""
+    uploader.upload_image.side_effect = ImageUploader.UploadFailed
+
+    with create_pipeline(uploader) as pipeline:
+        pipeline.submit(Size.TINY, as_jpeg(io.BytesIO))
+
+        with pytest.raises(ImageUploader.UploadFailed):
+            pipeline.wait()
+
+
+def test_pipeline_uploads_every_extension(uploader):
+    """Test every body of a variant is uploaded with its extension before the stage completes."""
+    bodies = {Extension.JPEG: b"jpeg", Extension.WEBP: b"webp", Extension.AVIF: None}
+
+    with create_pipeline(uploader) as pipeline:
+        pipeline.submit(Size.TINY, dict, bodies)
+        pipeline.wait()
+
+    uploaded = {call.args[4]: call.args[0].getvalue() for call in uploader.upload_image.mock_calls}
+    assert uploaded == {Extension.JPEG: b"jpeg", Extension.WEBP: b"webp"}
@@ -0,0 +1,66 @@
+import pytest
+from PIL import Image as PILImage
+from placeholder import BASE83_CHARACTERS, SAMPLE_SIDE, create_sample, encode_blurhash
+
+# ===================== CONSTANTS =====================
+
+LANDSCAPE_DIMENSIONS = (400, 300)
+
+# BlurHashes of the gradient below, as encoded by the reference implementation
+LANDSCAPE_BLURHASH = "LzHV8:l|gJnl2rWDfjWpwxjtfQjt"
+PORTRAIT_BLURHASH = "TzHV8:l|gJ2rWDfjwxjtfQX7e;fj"
+# 0xFF0000, pure red, in four base 83 digits
+RED_BLURHASH_COLOUR = "TI:j"
+
+# ===================== FIXTURES =====================
+
+
+def create_gradient(dimensions=LANDSCAPE_DIMENSIONS):
+    """Create an image whose red grows downwards and green leftwards."""
+    gradient = PILImage.linear_gradient("L")
+    img = PILImage.merge("RGB", [gradient, gradient.rotate(90), PILImage.new("L", (256, 256), 80)])
+    return img.resize(dimensions)
+
+
+# ===================== TESTS: create_sample =====================
+
+
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA", "P", "CMYK", "I;16"])
+def test_create_sample(mode):
+    """Test images of every mode are sampled down to a square RGB image."""
+    sample = create_sample(create_gradient().convert(mode))
+
+    assert sample.mode == "RGB"
+    assert sample.size == (SAMPLE_SIDE, SAMPLE_SIDE)
+
+
+# ===================== TESTS: encode_blurhash =====================
+
+
+def test_encode_blurhash():
+    """Test the BlurHash matches the reference implementation, with 4x3 components."""
+    blurhash = encode_blurhash(create_gradient(), LANDSCAPE_DIMENSIONS)
+
+    assert blurhash == LANDSCAPE_BLURHASH
+    assert len(blurhash) == 4 + 2 * 4 * 3
+    assert set(blurhash) <= set(BASE83_CHARACTERS)
+
+
+def test_encode_blurhash_of_portrait_source():
+    """Test portrait sources have more components vertically, the sample being square."""
+    assert encode_blurhash(create_gradient(), (300, 400)) == PORTRAIT_BLURHASH
+
+
+def test_encode_blurhash_of_resized_image():
+    """Test images resized from the source, such as the samples of strips, have its components."""
+    img = create_gradient()
+    sample = img.resize((SAMPLE_SIDE, SAMPLE_SIDE), PILImage.Resampling.BOX)
+
+    assert encode_blurhash(sample, img.size)[6:] == LANDSCAPE_BLURHASH[6:]
+
+
+def test_encode_blurhash_average_colour():
+    """Test the average colour of the image is encoded in sRGB after the components."""
+    blurhash = encode_blurhash(PILImage.new("RGB", (64, 48), (255, 0, 0)), (64, 48))
+
+    assert blurhash[2:6] == RED_BLURHASH_COLOUR
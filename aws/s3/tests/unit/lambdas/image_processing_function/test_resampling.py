@@ -0,0 +1,72 @@
+import pytest
+from PIL import Image as PILImage
+from resampling import (
+    BICUBIC_REDUCED,
+    BOX,
+    LANCZOS,
+    RESAMPLING_TIERS,
+    Resampling,
+    ResamplingPolicy,
+    ResamplingProfile,
+    ResamplingTier,
+)
+
+from shared.media import Size
+
+# ===================== TESTS: ResamplingProfile =====================
+
+
+def test_profile_downscales_with_its_filter(mocker):
+    """Test downscales use the profile filter and reducing gap."""
+    img = PILImage.new("RGB", (800, 600))
+    resize = mocker.spy(img, "resize")
+
+    variant = ResamplingProfile(Resampling.LANCZOS, reducing_gap=3.0).resize(img, (120, 120))
+
+    assert variant.size == (120, 120)
+    resize.assert_called_once_with((120, 120), Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def test_profile_upscales_with_upscale_filter(mocker):
+    """Test upscales never use the box filter, which enlarges pixels into blocks."""
+    img = PILImage.new("RGB", (100, 100))
+    resize = mocker.spy(img, "resize")
+
+    BOX.resize(img, (270, 270))
+
+    resize.assert_called_once_with((270, 270), Resampling.BICUBIC)
+
+
+# ===================== TESTS: ResamplingPolicy =====================
+
+
+@pytest.mark.parametrize("tier", list(ResamplingTier))
+def test_every_tier_covers_every_size(tier):
+    """Test every tier has a profile for every size."""
+    assert set(RESAMPLING_TIERS[tier]) == set(Size)
+
+
+def test_balanced_tier_uses_cheap_filters_for_thumbnails():
+    """Test thumbnails use a reduced bicubic filter and the largest variants Lanczos."""
+    policy = ResamplingPolicy("balanced", "")
+
+    assert policy.for_size(Size.TINY) == BICUBIC_REDUCED
+    assert policy.for_size(Size.HUGE) == LANCZOS
+
+
+def test_overrides_replace_tier_profiles():
+    """Test per size overrides take precedence over the tier."""
+    policy = ResamplingPolicy("QUALITY", " tiny=bilinear, ,HUGE=bicubic")
+
+    assert policy.for_size(Size.TINY) == ResamplingProfile(Resampling.BILINEAR)
+    assert policy.for_size(Size.HUGE) == ResamplingProfile(Resampling.BICUBIC)
+    assert policy.for_size(Size.MEDIUM) == LANCZOS
+
+
+@pytest.mark.parametrize(
+    "tier, overrides", [("fastest", ""), ("fast", "TINY=sharp"), ("fast", "ENORMOUS=box")]
+)
+def test_invalid_configuration_raises(tier, overrides):
+    """Test unknown tiers, filters and sizes fail when the policy is created."""
+    with pytest.raises((ValueError, KeyError)):
+        ResamplingPolicy(tier, overrides)
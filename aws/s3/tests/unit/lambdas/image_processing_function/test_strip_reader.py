@@ -0,0 +1,142 @@
+import io
+import random
+import struct
+import zlib
+
+import pytest
+from PIL import Image as PILImage
+from strip_reader import can_decode_strips, iter_png_strips, iter_strips
+
+# ===================== CONSTANTS =====================
+
+DIMENSIONS = (517, 301)
+STRIP_MODES = ["1", "L", "P", "LA", "RGB", "RGBA"]
+COARSE_LEVELS = bytes(level & 0xE0 for level in range(256))
+
+# ===================== FIXTURES =====================
+
+
+def create_image(mode, dimensions=DIMENSIONS):
+    """Create an image of coarse noise, so the PNG encoder picks every kind of row filter."""
+    width, height = dimensions
+    pixels = random.Random(0).randbytes(width * height * 4).translate(COARSE_LEVELS)
+    img = PILImage.frombytes("RGBA", dimensions, pixels)
+    return img.convert("RGB").quantize(100) if mode == "P" else img.convert(mode)
+
+
+def encode_png(img, **options):
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG", **options)
+    return buffer.getvalue()
+
+
+def set_interlaced(data):
+    """Flag the PNG as interlaced, which Pillow can't write, fixing the CRC of its header."""
+    header = bytearray(data[8:33])
+    header[20] = 1
+    header[21:] = struct.pack(">I", zlib.crc32(bytes(header[4:21])))
+    return data[:8] + bytes(header) + data[33:]
+
+
+def stack(strips, mode):
+    strips = list(strips)
+    img = PILImage.new(mode, (strips[0].width, sum(strip.height for strip in strips)))
+    top = 0
+    for strip in strips:
+        img.paste(strip, (0, top))
+        top += strip.height
+    return img
+
+
+# ===================== TESTS: can_decode_strips =====================
+
+
+@pytest.mark.parametrize("mode", STRIP_MODES)
+def test_can_decode_strips(mode):
+    """Test non-interlaced PNGs of 8 bits per channel, or 1 bit per pixel, decode in strips."""
+    assert can_decode_strips(PILImage.open(io.BytesIO(encode_png(create_image(mode)))))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        set_interlaced(encode_png(create_image("RGB"))),
+        encode_png(PILImage.new("I;16", DIMENSIONS)),
+        encode_png(create_image("P"), bits=4),
+    ],
+    ids=["interlaced", "16 bits", "4 bits palette"],
+)
+def test_cannot_decode_strips(data):
+    """Test PNGs whose rows Pillow doesn't store as in the file are decoded whole."""
+    assert not can_decode_strips(PILImage.open(io.BytesIO(data)))
+
+
+def test_cannot_decode_strips_of_other_formats():
+    """Test only PNGs are decoded in strips."""
+    buffer = io.BytesIO()
+    create_image("RGB").save(buffer, "JPEG")
+
+    assert not can_decode_strips(PILImage.open(buffer))
+
+
+@pytest.mark.parametrize("version", [(9, 0), (13, 0)])
+def test_cannot_decode_strips_with_other_pillow_versions(mocker, version):
+    """Test PNGs are decoded whole by Pillow versions whose private tile layout isn't known."""
+    mocker.patch("strip_reader.PILLOW_VERSION", version)
+
+    assert not can_decode_strips(PILImage.open(io.BytesIO(encode_png(create_image("RGB")))))
+
+
+def test_cannot_decode_strips_of_unexpected_tiles():
+    """Test PNGs are decoded whole when their tile isn't laid out as expected."""
+    img = PILImage.open(io.BytesIO(encode_png(create_image("RGB"))))
+    img.tile = [("zip", (0, 0) + DIMENSIONS, "41", "RGB")]
+
+    assert not can_decode_strips(img)
+
+
+# ===================== TESTS: iter_png_strips =====================
+
+
+@pytest.mark.parametrize("mode", STRIP_MODES)
+@pytest.mark.parametrize("rows", [1, 7, 300, 301, 1000])
+def test_iter_png_strips(mode, rows):
+    """Test the strips of a PNG hold the rows of its full decode."""
+    data = encode_png(create_image(mode))
+
+    strips = list(iter_png_strips(PILImage.open(io.BytesIO(data)), rows))
+
+    assert all(strip.height <= rows for strip in strips)
+    assert stack(strips, mode).tobytes() == PILImage.open(io.BytesIO(data)).tobytes()
+
+
+def test_iter_png_strips_over_several_idat_chunks(mocker):
+    """Test image data split over several IDAT chunks is read across them."""
+    mocker.patch("PIL.PngImagePlugin.ImageFile.MAXBLOCK", 1024)
+    data = encode_png(create_image("RGB"))
+
+    strips = iter_png_strips(PILImage.open(io.BytesIO(data)), 64)
+
+    assert data.count(b"IDAT") > 1
+    assert stack(strips, "RGB").tobytes() == PILImage.open(io.BytesIO(data)).tobytes()
+
+
+def test_iter_png_strips_truncated():
+    """Test truncated image data raises an error like a full decode does."""
+    data = encode_png(create_image("RGB"))
+
+    with pytest.raises(OSError):
+        list(iter_png_strips(PILImage.open(io.BytesIO(data[: len(data) // 2])), 64))
+
+
+# ===================== TESTS: iter_strips =====================
+
+
+def test_iter_strips():
+    """Test a decoded image is read in strips of the given number of rows."""
+    img = create_image("RGB")
+
+    strips = list(iter_strips(img, 100))
+
+    assert [strip.height for strip in strips] == [100, 100, 100, 1]
+    assert stack(strips, "RGB").tobytes() == img.tobytes()
@@ -0,0 +1,82 @@
+import random
+from functools import lru_cache
+
+import pytest
+from PIL import Image as PILImage
+from resampling import BICUBIC_REDUCED, BOX, LANCZOS, LANCZOS_REDUCED
+from strip_reader import iter_strips
+from tiled_resize import StripResizer
+
+# ===================== CONSTANTS =====================
+
+SOURCE_DIMENSIONS = (901, 603)
+MODES = ["1", "L", "LA", "P", "RGB", "RGBA", "CMYK"]
+PROFILES = [BOX, BICUBIC_REDUCED, LANCZOS_REDUCED, LANCZOS]
+
+# Reductions by several factors, a target taller than the source and one of another ratio
+TARGETS = [(120, 120), (270, 270), (640, 640), (640, 77)]
+
+# ===================== FIXTURES =====================
+
+
+@lru_cache(maxsize=None)
+def create_source(mode):
+    """Create a smooth gradient with noise on top, so every filter tap counts. Shared by tests."""
+    width, height = SOURCE_DIMENSIONS
+    noise = random.Random(0).randbytes(width * height * 4)
+    img = PILImage.frombytes("RGBA", SOURCE_DIMENSIONS, noise)
+    gradient = PILImage.linear_gradient("L").resize(SOURCE_DIMENSIONS).convert("RGBA")
+    img = PILImage.blend(gradient, img, 0.3)
+    if mode == "P":
+        img = img.convert("RGB").quantize(64)
+        img.info["transparency"] = 3
+        return img
+    return img.convert(mode)
+
+
+def resize_in_strips(img, dimensions, profile, rows):
+    resizer = StripResizer(img, dimensions, profile)
+    for strip in iter_strips(img, rows):
+        resizer.feed(strip)
+    return resizer.result()
+
+
+# ===================== TESTS: StripResizer =====================
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("profile", PROFILES, ids=str)
+@pytest.mark.parametrize("dimensions", TARGETS, ids=str)
+def test_strip_resizer_matches_one_shot_resize(mode, profile, dimensions):
+    """Test resizing in strips gives the very pixels of resizing the whole image at once."""
+    img = create_source(mode)
+    expected = profile.resize(img, dimensions)
+
+    for rows in [7, 64]:
+        resized = resize_in_strips(img, dimensions, profile, rows)
+
+        assert resized.mode == expected.mode
+        assert resized.size == expected.size
+        assert resized.tobytes() == expected.tobytes()
+
+
+def test_strip_resizer_keeps_palette_and_info():
+    """Test palette images keep the palette and transparency of their source."""
+    img = create_source("P")
+    expected = LANCZOS.resize(img, (120, 120))
+
+    resized = resize_in_strips(img, (120, 120), LANCZOS, 64)
+
+    assert resized.info == expected.info == {"transparency": 3}
+    assert resized.getpalette() == expected.getpalette()
+    assert resized.convert("RGBA").tobytes() == expected.convert("RGBA").tobytes()
+
+
+def test_strip_resizer_needs_every_row():
+    """Test the result is only given once every row of the source was fed."""
+    img = create_source("RGB")
+    resizer = StripResizer(img, (120, 120), LANCZOS)
+    resizer.feed(img.crop((0, 0, img.width, 100)))
+
+    with pytest.raises(ValueError):
+        resizer.result()
@@ -0,0 +1,95 @@
+import importlib.util
+import io
+import json
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+# ===================== CONSTANTS =====================
+
+# The dispatcher module is named app like the image processing function's, which the conftest
+# puts on the path, so it is loaded from its file under another name
+MEDIA_PROCESSING_DISPATCHER_DIR = (
+    Path(__file__).resolve().parents[4] / "src" / "lambdas" / "media_processing_dispatcher"
+)
+spec = importlib.util.spec_from_file_location(
+    "media_processing_dispatcher", MEDIA_PROCESSING_DISPATCHER_DIR / "app.py"
+)
+assert spec is not None and spec.loader is not None
+dispatcher = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(dispatcher)
+
+# ===================== FIXTURES =====================
+
+
+def create_event(key):
+    return {"Records": [{"s3": {"bucket": {"name": "raw-bucket"}, "object": {"key": key}}}]}
+
+
+def create_head_response(content_type, size=1024):
+    return {"ContentType": content_type, "ContentLength": size, "ETag": '"etag"'}
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    clients = {"s3": Mock(), "lambda": Mock(), "sqs": Mock()}
+    monkeypatch.setattr(dispatcher, "get_client", lambda service: clients[service])
+    monkeypatch.setattr(dispatcher, "IMAGE_OUTPUT_EXTENSIONS", ["JPEG", "WEBP"])
+    monkeypatch.setattr(dispatcher, "IMAGE_PROCESSING_QUEUE_URL", None)
+    monkeypatch.setattr(dispatcher, "LARGE_IMAGE_PROCESSING_FUNCTION_ARN", None)
+    monkeypatch.setenv("IMAGE_PROCESSING_FUNCTION_ARN", "image-processing-function")
+    return clients
+
+
+def get_image_payload(clients):
+    """Return the payload the image processing function was invoked with."""
+    calls = [
+        call
+        for call in clients["lambda"].invoke.call_args_list
+        if call.kwargs["FunctionName"] == "image-processing-function"
+    ]
+    assert len(calls) == 1
+    return json.loads(calls[0].kwargs["Payload"])
+
+
+# ===================== TESTS: lambda_handler =====================
+
+
+def test_lambda_handler_requests_gif_variants_of_gifs(clients):
+    """Test GIF sources are also generated as GIFs, so animated ones keep their frames."""
+    clients["s3"].head_object.return_value = create_head_response("image/gif")
+
+    response = dispatcher.lambda_handler(create_event("user/images/a.gif"), None)
+
+    assert response["statusCode"] == 200
+    assert get_image_payload(clients)["extensions"] == ["JPEG", "WEBP", "GIF"]
+
+
+def test_lambda_handler_requests_configured_extensions_of_other_images(clients):
+    """Test other images are only generated in the configured formats."""
+    clients["s3"].head_object.return_value = create_head_response("image/jpeg")
+
+    dispatcher.lambda_handler(create_event("user/images/a.jpg"), None)
+
+    assert get_image_payload(clients)["extensions"] == ["JPEG", "WEBP"]
+
+
+# ===================== TESTS: is_large_image =====================
+
+
+@pytest.mark.parametrize(
+    "size, extensions, probed",
+    [
+        (1024, ["JPEG", "WEBP"], False),
+        (dispatcher.HEADER_PROBE_MIN_BYTES, ["JPEG", "WEBP"], True),
+        (1024, ["JPEG", "WEBP", "GIF"], True),
+    ],
+)
+def test_is_large_image_probes_only_large_stills_and_animations(clients, size, extensions, probed):
+    """Test small stills are routed without fetching their header, unlike animations."""
+    clients["s3"].get_object.return_value = {"Body": io.BytesIO(b"")}
+    metadata = dispatcher.ObjectMetadata("image/jpeg", size, '"etag"')
+
+    assert not dispatcher.is_large_image("raw-bucket", "a", metadata, extensions, ["TINY"])
+    assert clients["s3"].get_object.called is probed
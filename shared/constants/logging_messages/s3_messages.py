@@ -7,11 +7,22 @@ class S3Messages:
         INVALID_PARAM_TYPE = "Invalid parameter type"
         INVALID_URL = "Invalid URL: {url}"
         FAILED_TO_GENERATE_PRESIGNED_URL = "An error occurred generating the presigned URL: {error}"
+        INVALID_PART_SIZE = "Multipart upload parts must be at least {min_size} bytes"
+        WRITE_TO_CLOSED_UPLOAD = "Cannot write to the closed upload of {key}"
+        ABORTED_UPLOAD = "Aborted multipart upload of {key}"
+        PART_RETRY = "Retrying part {part_number} of {key} after attempt {attempt} failed: {error}"
+        RANGED_OBJECT_ALREADY_READ = "Ranged download of {key} was already read"
+        INCOMPLETE_RANGE = (
+            "Incomplete range of {key} at {start}: expected {expected} bytes, received {received}"
+        )
 
     class Info:
         OBJECT_FOUND = "Object found: {key} in bucket: {bucket}"
         GENERATED_S3_KEY = "Generated S3 key: {key} for user: {username}"
         GENERATED_PRESIGNED_URL = "Generated presigned URL for filename: {filename}"
+        STREAMED_UPLOAD = "Streamed upload of {report}"
+        RANGED_DOWNLOAD = "Downloading {key} in {ranges} byte ranges"
+        LISTED_KEYS = "Listed {count} keys under prefix: {prefix} in bucket: {bucket}"
 
     class User:
         pass
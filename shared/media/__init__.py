@@ -1,2 +1,5 @@
-from .base import *  # noqa
-from .media_factory import *  # noqa
+# Names of the submodules are re-exported lazily, so importing Extension doesn't import the
+# factory and every media class with it.
+from .lazy_exports import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, ["constants", "base", "media_factory"])
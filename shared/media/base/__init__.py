@@ -1,5 +1,5 @@
-from .base_media import *  # noqa
-from .image import *  # noqa
-from .media_format_utils import *  # noqa
-from .media_size_utils import *  # noqa
-from .video import *  # noqa
+from shared.media.lazy_exports import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(
+    __name__, ["base_media", "media_format_utils", "media_size_utils", "image", "video"]
+)
@@ -3,7 +3,13 @@ from typing import Optional, Set, Tuple
 
 from shared.constants.logging_messages import MediaMessages
 from shared.exceptions import InvalidContentTypeError, InvalidExtensionError, InvalidMediaTypeError
-from shared.media.constants import EXTENSION_ALIAS_MAP, FORMATS, Extension, MediaType
+from shared.media.constants import (
+    EXTENSION_ALIAS_MAP,
+    FORMATS,
+    OUTPUT_FORMATS,
+    Extension,
+    MediaType,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +45,18 @@ class MediaFormatUtils:
 
         return {ext for extensions in formats_dict.values() for ext in extensions.values()}
 
+    @staticmethod
+    def allowed_output_extensions(media_type: Optional[MediaType] = None) -> Set[str]:
+        """Get the extensions variants of the specified media type are generated in."""
+        if media_type and media_type not in OUTPUT_FORMATS:
+            error_msg = MediaMessages.Error.UNSUPPORTED_MEDIA_TYPE.format(media_type=media_type)
+            logger.error(error_msg)
+            raise InvalidMediaTypeError(error_msg)
+
+        formats_dict = {media_type: OUTPUT_FORMATS[media_type]} if media_type else OUTPUT_FORMATS
+
+        return {ext for extensions in formats_dict.values() for ext in extensions.values()}
+
     @staticmethod
     def is_extension_allowed(extension: str, media_type: Optional[MediaType] = None) -> bool:
         """Return whether a given extension is allowed for the specified media type."""
@@ -53,16 +71,16 @@ class MediaFormatUtils:
     @staticmethod
     def get_extension(media_type: MediaType, extension: Extension) -> str:
         """Retrieve the file extension for the specified media type and format name."""
-        if media_type not in FORMATS:
+        if media_type not in OUTPUT_FORMATS:
             error_msg = MediaMessages.Error.UNSUPPORTED_MEDIA_TYPE.format(media_type=media_type)
             logger.error(error_msg)
             raise InvalidMediaTypeError(error_msg)
-        if extension not in FORMATS[media_type]:
+        if extension not in OUTPUT_FORMATS[media_type]:
             error_msg = MediaMessages.Error.INVALID_EXTENSION.format(extension=extension)
             logger.error(error_msg)
             raise InvalidExtensionError(error_msg)
 
-        return FORMATS[media_type][extension]
+        return OUTPUT_FORMATS[media_type][extension]
 
     @staticmethod
     def get_content_type(media_type: MediaType, extension: Extension) -> str:
@@ -79,7 +97,7 @@ class MediaFormatUtils:
         """
         Map an extension to its corresponding media type. Raises ValueError for invalid extensions.
         """
-        for media_type, extensions in FORMATS.items():
+        for media_type, extensions in OUTPUT_FORMATS.items():
             if extension in extensions:
                 return media_type
 
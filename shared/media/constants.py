@@ -54,6 +54,8 @@ class Extension(Enum):
     JPEG = "jpeg"
     PNG = "png"
     GIF = "gif"
+    WEBP = "webp"
+    AVIF = "avif"
 
 
 class AspectRatio(Enum):
@@ -72,6 +74,13 @@ IMAGE_FORMATS = {
     Extension.GIF: Extension.GIF.value,
 }
 
+# Formats variants are generated and served in, which uploads aren't accepted in
+IMAGE_OUTPUT_FORMATS = {
+    **IMAGE_FORMATS,
+    Extension.WEBP: Extension.WEBP.value,
+    Extension.AVIF: Extension.AVIF.value,
+}
+
 VIDEO_FORMATS = {
     Extension.MP4: Extension.MP4.value,
     Extension.MOV: Extension.MOV.value,
@@ -83,6 +92,11 @@ FORMATS = {
     MediaType.IMAGE: IMAGE_FORMATS,
 }
 
+OUTPUT_FORMATS = {
+    MediaType.VIDEO: VIDEO_FORMATS,
+    MediaType.IMAGE: IMAGE_OUTPUT_FORMATS,
+}
+
 
 IMAGE_DIMENSIONS = {
     AspectRatio.AR_1_BY_1: {
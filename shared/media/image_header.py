@@ -0,0 +1,173 @@
+import struct
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+# Bytes of an image read to parse its header. JPEG headers follow the EXIF segment, which can
+# take up to 64 KB, and the frames of an animated GIF are counted within them.
+HEADER_PROBE_BYTES = 256 * 1024
+
+# Bytes Pillow stores a pixel of each mode in. Images with three or more bands, RGB included,
+# are padded to 4 bytes per pixel.
+MODE_PIXEL_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "LA": 4, "PA": 4}
+DEFAULT_PIXEL_BYTES = 4
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+# Bit depths by color type of the PNGs whose rows can be decoded a strip at a time
+PNG_STRIP_BIT_DEPTHS = {0: {1, 8}, 2: {8}, 3: {8}, 4: {8}, 6: {8}}
+
+JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+# Start of frame markers, the only segments holding the dimensions of a JPEG
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+GIF_IMAGE_DESCRIPTOR = 0x2C
+GIF_EXTENSION = 0x21
+
+
+@dataclass(frozen=True)
+class ImageHeader:
+    """What the header of an image tells about the pixels decoding it takes."""
+
+    width: int
+    height: int
+    mode: str
+    frames: int = 1
+    # Whether its rows can be decoded a strip at a time, without holding the whole image
+    strips: bool = False
+
+    @property
+    def pixel_bytes(self) -> int:
+        return MODE_PIXEL_BYTES.get(self.mode, DEFAULT_PIXEL_BYTES)
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+    def to_payload(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "ImageHeader":
+        return cls(**payload)
+
+
+def read_image_header(data: bytes, total_size: Optional[int] = None) -> Optional[ImageHeader]:
+    """
+    Parse the header of a PNG, GIF, JPEG or WebP image from its first bytes, without decoding
+    it, or return None for other formats and headers that don't fit in data. GIF frames past
+    the end of data are extrapolated from the total size of the image.
+    """
+    try:
+        if data.startswith(PNG_SIGNATURE):
+            return _read_png_header(data)
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return _read_gif_header(data, total_size or len(data))
+        if data.startswith(b"\xff\xd8"):
+            return _read_jpeg_header(data)
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return _read_webp_header(data, total_size or len(data))
+    except (struct.error, IndexError):
+        pass
+    return None
+
+
+def _read_png_header(data: bytes) -> ImageHeader:
+    width, height, bit_depth, color_type = struct.unpack_from(">IIBB", data, 16)
+    interlaced = data[28] != 0
+    mode = PNG_MODES.get(color_type, "RGBA")
+    if mode == "L" and bit_depth == 16:
+        mode = "I;16"
+    elif mode == "L" and bit_depth == 1:
+        mode = "1"
+
+    # Animated PNGs announce their frame count in an acTL chunk ahead of the image data
+    frames = 1
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        if chunk_type == b"acTL":
+            frames = struct.unpack_from(">I", data, offset + 8)[0]
+            break
+        if chunk_type == b"IDAT":
+            break
+        offset += length + 12
+
+    strips = bit_depth in PNG_STRIP_BIT_DEPTHS.get(color_type, ()) and not interlaced
+    return ImageHeader(width, height, mode, max(frames, 1), strips and frames <= 1)
+
+
+def _read_gif_header(data: bytes, total_size: int) -> ImageHeader:
+    width, height, flags = struct.unpack_from("<HHB", data, 6)
+    offset = 13
+    if flags & 0x80:
+        offset += 3 << ((flags & 0x07) + 1)
+
+    frames = 0
+    while offset < len(data):
+        block = data[offset]
+        if block == GIF_IMAGE_DESCRIPTOR:
+            frames += 1
+            flags = data[offset + 9]
+            offset += 10
+            if flags & 0x80:
+                offset += 3 << ((flags & 0x07) + 1)
+            offset = _skip_gif_sub_blocks(data, offset + 1)
+        elif block == GIF_EXTENSION:
+            offset = _skip_gif_sub_blocks(data, offset + 2)
+        else:
+            # The trailer, or anything else the decoder would stop at as well
+            return ImageHeader(width, height, "P", max(frames, 1))
+
+    # The frames went on past the probed bytes
+    return ImageHeader(width, height, "P", _extrapolate_frames(frames, len(data), total_size))
+
+
+def _skip_gif_sub_blocks(data: bytes, offset: int) -> int:
+    """Return the offset past the data sub-blocks starting at offset."""
+    while offset < len(data) and data[offset]:
+        offset += data[offset] + 1
+    return offset + 1
+
+
+def _read_jpeg_header(data: bytes) -> Optional[ImageHeader]:
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        length = struct.unpack_from(">H", data, offset + 2)[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width, components = struct.unpack_from(">HHB", data, offset + 5)
+            return ImageHeader(width, height, JPEG_MODES.get(components, "RGB"))
+        offset += length + 2
+    return None
+
+
+def _read_webp_header(data: bytes, total_size: int) -> Optional[ImageHeader]:
+    chunk_type = data[12:16]
+    if chunk_type == b"VP8 ":
+        width, height = struct.unpack_from("<HH", data, 26)
+        return ImageHeader(width & 0x3FFF, height & 0x3FFF, "RGB")
+    if chunk_type == b"VP8L":
+        bits = struct.unpack_from("<I", data, 21)[0]
+        alpha = bool(bits >> 28 & 1)
+        return ImageHeader(
+            (bits & 0x3FFF) + 1, (bits >> 14 & 0x3FFF) + 1, "RGBA" if alpha else "RGB"
+        )
+    if chunk_type == b"VP8X":
+        flags = data[20]
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        frames = (
+            _extrapolate_frames(data.count(b"ANMF"), len(data), total_size) if flags & 0x02 else 1
+        )
+        return ImageHeader(width, height, "RGBA" if flags & 0x10 else "RGB", max(frames, 1))
+    return None
+
+
+def _extrapolate_frames(frames: int, probed_size: int, total_size: int) -> int:
+    """Scale the frames found in the probed bytes up to the total size of the image."""
+    return max(-(-frames * total_size // probed_size), 1)
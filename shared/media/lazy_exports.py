@@ -0,0 +1,37 @@
+import importlib
+import sys
+from typing import Any, Callable, List, Sequence, Tuple
+
+
+def lazy_exports(
+    package_name: str, submodules: Sequence[str]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Return the module __getattr__ and __dir__ of a package re-exporting the names of its
+    submodules. A submodule is only imported once a name is looked up in it, so importing one
+    name doesn't import every submodule of the package. Submodules are searched in order, so the
+    cheapest and most used come first.
+    """
+    package = sys.modules[package_name]
+
+    def __getattr__(name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        if name in submodules:
+            return importlib.import_module(f"{package_name}.{name}")
+        for submodule in submodules:
+            module = importlib.import_module(f"{package_name}.{submodule}")
+            if hasattr(module, name):
+                value = getattr(module, name)
+                setattr(package, name, value)
+                return value
+        raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+
+    def __dir__() -> List[str]:
+        names = set(vars(package))
+        for submodule in submodules:
+            module = importlib.import_module(f"{package_name}.{submodule}")
+            names.update(name for name in vars(module) if not name.startswith("_"))
+        return sorted(names)
+
+    return __getattr__, __dir__
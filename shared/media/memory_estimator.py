@@ -0,0 +1,128 @@
+import os
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from shared.media.image_header import ImageHeader
+
+MB = 1024 * 1024
+
+# Memory the Python runtime takes with boto3 and Pillow imported, before any image is opened
+RUNTIME_BYTES = 100 * MB
+
+# Resized variants are RGB or RGBA, which Pillow pads to 4 bytes per pixel
+VARIANT_PIXEL_BYTES = 4
+
+# Share of the function memory an estimate may take. The rest is left to allocator
+# fragmentation, encoder buffers and whatever else the estimate doesn't count.
+MEMORY_HEADROOM = 0.8
+
+# Source rows decoded at a time when resizing in strips
+DEFAULT_STRIP_ROWS = 256
+
+# Memory assumed outside Lambda, in tests and local runs, as set for the image processing
+# function in the template
+DEFAULT_FUNCTION_MEMORY_MB = 1024
+
+
+def function_memory_bytes(default_mb: int = DEFAULT_FUNCTION_MEMORY_MB) -> int:
+    """Return the memory of the running Lambda function, set by Lambda in its environment."""
+    return int(os.getenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", default_mb)) * MB
+
+
+@dataclass(frozen=True)
+class MemoryEstimate:
+    """Peak memory of a resize job, by what takes it."""
+
+    # Encoded image held in memory
+    source_bytes: int
+    # Decoded pixels, including the full decode of images reduced right after decoding
+    decode_bytes: int
+    # Resized variants alive at once
+    variant_bytes: int
+    # Animated variants written in memory, at one byte per pixel of every frame
+    output_bytes: int
+    runtime_bytes: int = RUNTIME_BYTES
+
+    @property
+    def peak_bytes(self) -> int:
+        return (
+            self.source_bytes
+            + self.decode_bytes
+            + self.variant_bytes
+            + self.output_bytes
+            + self.runtime_bytes
+        )
+
+    def fits(self, memory_bytes: int, headroom: float = MEMORY_HEADROOM) -> bool:
+        return self.peak_bytes <= memory_bytes * headroom
+
+    def __str__(self):
+        return (
+            f"{self.peak_bytes / MB:.0f} MB (decode {self.decode_bytes / MB:.0f} MB, "
+            f"variants {self.variant_bytes / MB:.0f} MB, outputs {self.output_bytes / MB:.0f} MB)"
+        )
+
+
+def estimate_peak_memory(
+    header: ImageHeader,
+    targets: Iterable[Tuple[int, int]],
+    decoded_size: Optional[Tuple[int, int]] = None,
+    full_decode_first: bool = False,
+    concurrent_variants: int = 2,
+    source_bytes: int = 0,
+) -> MemoryEstimate:
+    """
+    Estimate the peak memory of resizing an image to the target dimensions from its header.
+
+    Still images are decoded at decoded_size, or at full size when it is not given, and
+    full_decode_first adds the full decode for images reduced right after it. The largest
+    concurrent_variants targets are counted as alive at once; the resize cascade keeps two.
+    Animations are decoded one frame at a time, so a frame and its RGBA conversion are counted
+    instead, along with every animated output.
+    """
+    targets = sorted(targets, key=lambda target: target[0] * target[1], reverse=True)
+    target_pixels = [width * height for width, height in targets]
+
+    if header.frames > 1:
+        decode_bytes = 2 * header.pixels * VARIANT_PIXEL_BYTES
+        variant_bytes = sum(target_pixels) * VARIANT_PIXEL_BYTES
+        output_bytes = sum(target_pixels) * header.frames
+    else:
+        width, height = decoded_size or (header.width, header.height)
+        decode_bytes = width * height * header.pixel_bytes
+        if full_decode_first:
+            decode_bytes += header.pixels * header.pixel_bytes
+        variant_bytes = sum(target_pixels[:concurrent_variants]) * VARIANT_PIXEL_BYTES
+        output_bytes = 0
+
+    return MemoryEstimate(source_bytes, decode_bytes, variant_bytes, output_bytes)
+
+
+def estimate_tiled_memory(
+    header: ImageHeader,
+    targets: Iterable[Tuple[int, int]],
+    decoded_size: Optional[Tuple[int, int]] = None,
+    full_decode_first: bool = False,
+    strip_rows: Optional[int] = None,
+    source_bytes: int = 0,
+) -> MemoryEstimate:
+    """
+    Estimate the peak memory of resizing a still image to the target dimensions in strips of
+    rows. With strip_rows, the source is decoded a strip at a time, and a strip is counted along
+    with its stored copy fed to the decoder; otherwise it is decoded as estimate_peak_memory
+    does. Every target holds the source rows resized to its width, counted without the
+    reduction that usually shrinks them, and its output.
+    """
+    width, height = decoded_size or (header.width, header.height)
+    if strip_rows is not None:
+        decode_bytes = 2 * width * min(strip_rows, height) * header.pixel_bytes
+    else:
+        decode_bytes = width * height * header.pixel_bytes
+        if full_decode_first:
+            decode_bytes += header.pixels * header.pixel_bytes
+
+    variant_bytes = sum(
+        target_width * (height + target_height) * VARIANT_PIXEL_BYTES
+        for target_width, target_height in targets
+    )
+    return MemoryEstimate(source_bytes, decode_bytes, variant_bytes, 0)
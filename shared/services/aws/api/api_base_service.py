@@ -1,7 +1,7 @@
 import json
 import logging
 from http import HTTPStatus
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from shared.constants.logging_messages import ApiMessages, GeneralMessages
 
@@ -31,8 +31,10 @@ class ApiBaseService:
         }
 
     @classmethod
-    def create_redirect(cls, status_code: HTTPStatus, location: str) -> Dict[str, Any]:
-        """Creates a standard HTTP redirect response."""
+    def create_redirect(
+        cls, status_code: HTTPStatus, location: str, headers: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Creates a standard HTTP redirect response, with any other headers given."""
         logger.info(
             ApiMessages.Info.REDIRECT_CREATED.format(
                 status=status_code.value,
@@ -41,5 +43,5 @@ class ApiBaseService:
         )
         return {
             "statusCode": status_code.value,
-            "headers": {"Location": str(location)},
+            "headers": {**(headers or {}), "Location": str(location)},
         }
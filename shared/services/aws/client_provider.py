@@ -0,0 +1,48 @@
+import logging
+import os
+import threading
+from typing import Any, Dict
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Connections kept open per client. botocore defaults to 10, fewer than the ranged downloads,
+# multipart uploads and upload workers of one image job run at once, and every request over the
+# limit waits for a connection or opens a new one with a fresh TLS handshake.
+MAX_POOL_CONNECTIONS = int(os.getenv("BOTO_MAX_POOL_CONNECTIONS", 50))
+RETRY_MAX_ATTEMPTS = int(os.getenv("BOTO_RETRY_MAX_ATTEMPTS", 5))
+
+# Adaptive retries also rate limit the client when AWS throttles it, instead of retrying into
+# the throttling. TCP keep-alive stops idle connections of a frozen container from being dropped
+# silently between invocations.
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    retries={"max_attempts": RETRY_MAX_ATTEMPTS, "mode": "adaptive"},
+)
+
+_clients: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name: str) -> Any:
+    """
+    Return the client of an AWS service, created once per container with CLIENT_CONFIG. Warm
+    invocations reuse it along with its open connections. Clients are thread safe, but creating
+    them is not, so creation is serialized.
+    """
+    with _lock:
+        client = _clients.get(service_name)
+        if client is None:
+            logger.info(f"Creating {service_name} client")
+            client = boto3.client(service_name, config=CLIENT_CONFIG)
+            _clients[service_name] = client
+        return client
+
+
+def clear_clients() -> None:
+    """Forget every client, so the next get_client() call creates a new one."""
+    with _lock:
+        _clients.clear()
@@ -1,11 +1,12 @@
 import json
 import logging
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from shared.constants.logging_messages import LambdaMessages
 from shared.exceptions import MediaProcessingError
 from shared.media.constants import Extension, Size
 from shared.services.aws.lambdas.lambda_invocation_service import LambdaInvoker
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 logger = logging.getLogger(__name__)
 
@@ -29,15 +30,19 @@ class ImageProcessingInvoker:
         filename: str,
         extension: Extension,
         sizes: List[Size],
+        metadata: Optional[ObjectMetadata] = None,
     ) -> dict:
         """Creates the payload for the Lambda function invocation."""
-        return {
+        payload: Dict[str, Any] = {
             "bucket": bucket,
             "key": key,
             "filename": filename,
-            "extension": extension.value,
+            "extension": extension.name,
             "sizes": [size.name for size in sizes],
         }
+        if metadata is not None:
+            payload["metadata"] = metadata.to_payload()
+        return payload
 
     def invoke_lambda_function(
         self,
@@ -46,9 +51,13 @@ class ImageProcessingInvoker:
         filename: str,
         extension: Extension,
         sizes: List[Size],
+        metadata: Optional[ObjectMetadata] = None,
     ) -> dict:
-        """Invokes the image processing Lambda function and returns its response."""
-        payload = self._create_payload(bucket, key, filename, extension, sizes)
+        """
+        Invokes the image processing Lambda function and returns its response. The metadata of
+        the raw object, when known, is passed along so the function doesn't request it again.
+        """
+        payload = self._create_payload(bucket, key, filename, extension, sizes, metadata)
         response = self.lambda_invoker.invoke(self.function_arn, payload)
         processed_response = self._extract_and_process_response(response)
         return processed_response
@@ -2,11 +2,11 @@ import json
 import logging
 from http import HTTPStatus
 
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 
 from shared.constants.logging_messages import HttpMessages, LambdaMessages
 from shared.exceptions import MediaProcessingError
+from shared.services.aws.client_provider import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ class LambdaInvoker:
     """A class to invoke AWS Lambda functions."""
 
     def __init__(self):
-        self.lambda_client = boto3.client("lambda")
+        self.lambda_client = get_client("lambda")
 
     def invoke(self, function_arn: str, payload: dict) -> dict:
         """Invokes a Lambda function and returns its response."""
@@ -1,30 +1,59 @@
 import logging
 from http import HTTPStatus
+from typing import Iterable, Optional, Set, Tuple
 
-import boto3
 from botocore.exceptions import ClientError
 
 from shared.constants.logging_messages import S3Messages
+from shared.services.aws.client_provider import get_client
+from shared.services.aws.s3.s3_key_listing import find_missing_keys
+from shared.services.aws.s3.s3_object_metadata import ObjectMetadata
 
 logger = logging.getLogger(__name__)
 
 
 class S3BaseService:
     def __init__(self):
-        self.s3_client = boto3.client("s3")
+        self.s3_client = get_client("s3")
 
     def object_exists(self, bucket: str, key: str) -> bool:
         """Check if an object exists in the S3 bucket."""
+        return self._head_object(bucket, key) is not None
+
+    def find_missing_processed_media(
+        self, bucket: str, filename: str, variants: Iterable[Tuple[str, str]]
+    ) -> Set[Tuple[str, str]]:
+        """
+        Return the (size, extension) variants of a file that are not processed yet, from a
+        single listing of its prefix instead of a HEAD per variant.
+        """
+        keys = {
+            self.construct_processed_media_key(filename, size, extension): (size, extension)
+            for size, extension in variants
+        }
+        missing = find_missing_keys(self.s3_client, bucket, f"{filename}/", keys)
+        return {keys[key] for key in missing}
+
+    def get_object_metadata(self, bucket: str, key: str) -> Optional[ObjectMetadata]:
+        """Get the metadata of an object with a single HEAD, or None if it doesn't exist."""
+        response = self._head_object(bucket, key)
+        if response is None:
+            return None
+        return ObjectMetadata.from_head_response(response)
+
+    def _head_object(self, bucket: str, key: str) -> Optional[dict]:
+        """Return the HEAD response of an object, or None if it doesn't exist."""
         try:
-            self.s3_client.head_object(Bucket=bucket, Key=key)
+            response = self.s3_client.head_object(Bucket=bucket, Key=key)
             logger.info(S3Messages.Info.OBJECT_FOUND.format(key=key, bucket=bucket))
-            return True
+            return response
         except ClientError as e:
             error_code = e.response["Error"]["Code"]
 
-            if error_code == HTTPStatus.NOT_FOUND:
+            # botocore reports HEAD errors by status code, as a string
+            if str(error_code) == str(HTTPStatus.NOT_FOUND.value):
                 logger.warning(S3Messages.Error.OBJECT_NOT_FOUND.format(key=key, bucket=bucket))
-                return False
+                return None
             else:
                 logger.error(
                     S3Messages.Error.UNEXPECTED_ERROR.format(
@@ -0,0 +1,27 @@
+import logging
+from typing import Any, Iterable, Set
+
+from shared.constants.logging_messages import S3Messages
+
+logger = logging.getLogger(__name__)
+
+
+def list_keys(s3_client: Any, bucket: str, prefix: str) -> Set[str]:
+    """
+    List every key under a prefix with ListObjectsV2, one request per 1000 keys. A single listing
+    answers for all the objects under the prefix, where a HEAD is needed per object.
+    """
+    keys: Set[str] = set()
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.update(item["Key"] for item in page.get("Contents", []))
+    logger.info(S3Messages.Info.LISTED_KEYS.format(count=len(keys), prefix=prefix, bucket=bucket))
+    return keys
+
+
+def find_missing_keys(s3_client: Any, bucket: str, prefix: str, keys: Iterable[str]) -> Set[str]:
+    """Return the keys that don't exist, from a single listing of the prefix they share."""
+    keys = set(keys)
+    if not all(key.startswith(prefix) for key in keys):
+        raise ValueError(f"Every key must start with the listed prefix: {prefix}")
+    return keys - list_keys(s3_client, bucket, prefix)
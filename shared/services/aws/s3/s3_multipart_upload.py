@@ -0,0 +1,246 @@
+import concurrent.futures
+import io
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+from shared.constants.logging_messages import S3Messages
+
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+
+# S3 rejects parts smaller than 5 MiB, except for the last part of an upload
+MIN_PART_SIZE = 5 * MIB
+PART_SIZE = max(int(os.getenv("MULTIPART_PART_SIZE", 8 * MIB)), MIN_PART_SIZE)
+MAX_CONCURRENCY = int(os.getenv("MULTIPART_MAX_CONCURRENCY", 4))
+
+# Attempts at every part, on top of the retries of the client. A streamed object can't be
+# uploaded again as a whole, its encoder output isn't kept, so a part failing for good fails it.
+# A part can be, as the writer holds its bytes and uploading a part number again replaces it.
+PART_ATTEMPTS = int(os.getenv("MULTIPART_PART_ATTEMPTS", 3))
+PART_RETRY_BACKOFF_SECONDS = 1.0
+RETRYABLE_ERROR_CODES = {"SlowDown", "RequestTimeout", "InternalError", "ServiceUnavailable"}
+
+# Shared by every upload_file/upload_fileobj call, so managed transfers split objects into the
+# same parts as MultipartUploadWriter.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=PART_SIZE,
+    multipart_chunksize=PART_SIZE,
+    max_concurrency=MAX_CONCURRENCY,
+)
+
+
+@dataclass(frozen=True)
+class PartTiming:
+    part_number: int
+    size: int
+    seconds: float
+
+
+@dataclass
+class UploadReport:
+    """Timings of a streamed upload, one entry per part."""
+
+    key: str
+    parts: List[PartTiming] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def size(self) -> int:
+        return sum(part.size for part in self.parts)
+
+    def __str__(self):
+        slowest = max((part.seconds for part in self.parts), default=0.0)
+        return (
+            f"{self.key}: {self.size} bytes in {len(self.parts)} parts, "
+            f"{self.seconds:.3f}s total, slowest part {slowest:.3f}s"
+        )
+
+
+class MultipartUploadWriter(io.RawIOBase):
+    """
+    Writable file object uploading what is written to it as an S3 multipart upload. Each part is
+    uploaded in the background as soon as part_size bytes were written, so an encoder writing
+    into it overlaps with the upload. Objects smaller than one part are sent with a single
+    put_object on close.
+
+    At most max_concurrency parts upload at once, and writing blocks while as many more are
+    waiting, which bounds the memory held to about (2 * max_concurrency + 1) * part_size. Parts
+    failing with a transient error are uploaded again, up to PART_ATTEMPTS times.
+    """
+
+    def __init__(
+        self,
+        s3_client: Any,
+        bucket: str,
+        key: str,
+        content_type: str,
+        part_size: int = PART_SIZE,
+        max_concurrency: int = MAX_CONCURRENCY,
+        metadata: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__()
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(S3Messages.Error.INVALID_PART_SIZE.format(min_size=MIN_PART_SIZE))
+
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.metadata = metadata
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.report = UploadReport(key)
+
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="upload-part"
+        )
+        self._parts: List[concurrent.futures.Future] = []
+        self._slots = threading.BoundedSemaphore(2 * max_concurrency)
+        self._started = time.perf_counter()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError(S3Messages.Error.WRITE_TO_CLOSED_UPLOAD.format(key=self.key))
+
+        view = memoryview(data)
+        self._buffer += view
+        while len(self._buffer) >= self.part_size:
+            self._submit_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return view.nbytes
+
+    def close(self) -> None:
+        """Upload the remaining bytes and complete the upload, aborting it on failure."""
+        if self.closed:
+            return
+
+        try:
+            if self._upload_id is None:
+                self._put_object()
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                self._complete()
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self._buffer = bytearray()
+            super().close()
+
+        self.report.seconds = time.perf_counter() - self._started
+        logger.info(S3Messages.Info.STREAMED_UPLOAD.format(report=self.report))
+
+    def abort(self) -> None:
+        """Abort the multipart upload, discarding every part uploaded so far."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+        if self._upload_id is not None:
+            logger.warning(S3Messages.Error.ABORTED_UPLOAD.format(key=self.key))
+            self.s3_client.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id
+            )
+            self._upload_id = None
+
+        self._buffer = bytearray()
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # IOBase closes files when they are collected, which must never complete a partial upload
+        executor = getattr(self, "_executor", None)
+        if executor is not None and not self.closed:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_part(self, data: bytes) -> None:
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, **self._object_args()
+            )
+            self._upload_id = response["UploadId"]
+
+        # Stop producing parts as soon as one of them failed
+        for part in self._parts:
+            if part.done() and part.exception() is not None:
+                part.result()
+
+        self._slots.acquire()
+        part = self._executor.submit(self._upload_part, len(self._parts) + 1, data)
+        part.add_done_callback(lambda _: self._slots.release())
+        self._parts.append(part)
+
+    def _upload_part(self, part_number: int, data: bytes) -> Tuple[dict, PartTiming]:
+        started = time.perf_counter()
+        for attempt in range(1, PART_ATTEMPTS + 1):
+            try:
+                response = self.s3_client.upload_part(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    PartNumber=part_number,
+                    Body=data,
+                )
+                break
+            except (BotoCoreError, ClientError) as e:
+                if attempt == PART_ATTEMPTS or not self._is_retryable(e):
+                    raise
+                logger.warning(
+                    S3Messages.Error.PART_RETRY.format(
+                        part_number=part_number, key=self.key, attempt=attempt, error=e
+                    )
+                )
+                time.sleep(PART_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        timing = PartTiming(part_number, len(data), time.perf_counter() - started)
+        return {"PartNumber": part_number, "ETag": response["ETag"]}, timing
+
+    def _complete(self) -> None:
+        results = [part.result() for part in self._parts]
+        self._executor.shutdown(wait=True)
+
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": [uploaded for uploaded, _ in results]},
+        )
+        self.report.parts.extend(timing for _, timing in results)
+        self._upload_id = None
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, ClientError):
+            return error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+        return True
+
+    def _object_args(self) -> Dict[str, Any]:
+        """Return the arguments describing the object, given when it is created."""
+        args: Dict[str, Any] = {"ContentType": self.content_type}
+        if self.metadata:
+            args["Metadata"] = self.metadata
+        return args
+
+    def _put_object(self) -> None:
+        started = time.perf_counter()
+        data = bytes(self._buffer)
+        self.s3_client.put_object(
+            Bucket=self.bucket, Key=self.key, Body=data, **self._object_args()
+        )
+        self.report.parts.append(PartTiming(1, len(data), time.perf_counter() - started))
@@ -0,0 +1,50 @@
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+# User metadata key of the placeholder (a BlurHash) stored with every processed variant
+PLACEHOLDER_METADATA_KEY = "placeholder"
+
+
+@dataclass(frozen=True)
+class ObjectMetadata:
+    """
+    Metadata of an S3 object captured by a single HEAD request, so it can be carried in
+    invocation payloads instead of being requested again by every consumer.
+    """
+
+    content_type: str
+    size: int
+    etag: str
+    last_modified: Optional[str] = None
+    placeholder: Optional[str] = None
+
+    @classmethod
+    def from_head_response(cls, response: dict) -> "ObjectMetadata":
+        """Create the metadata from a head_object (or get_object) response."""
+        last_modified = response.get("LastModified")
+        if isinstance(last_modified, datetime):
+            last_modified = last_modified.isoformat()
+
+        return cls(
+            content_type=response["ContentType"],
+            size=response["ContentLength"],
+            etag=response["ETag"],
+            last_modified=last_modified,
+            placeholder=response.get("Metadata", {}).get(PLACEHOLDER_METADATA_KEY),
+        )
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "ObjectMetadata":
+        """Create the metadata from its invocation payload representation."""
+        return cls(
+            content_type=str(payload["content_type"]),
+            size=int(payload["size"]),
+            etag=str(payload["etag"]),
+            last_modified=payload.get("last_modified"),
+            placeholder=payload.get("placeholder"),
+        )
+
+    def to_payload(self) -> dict:
+        """Return a JSON serializable representation for invocation payloads."""
+        return asdict(self)
@@ -0,0 +1,153 @@
+import concurrent.futures
+import logging
+import os
+import re
+from typing import Any, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from shared.constants.logging_messages import S3Messages
+
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+
+RANGE_SIZE = int(os.getenv("RANGED_DOWNLOAD_RANGE_SIZE", 8 * MIB))
+MAX_CONCURRENCY = int(os.getenv("RANGED_DOWNLOAD_MAX_CONCURRENCY", 8))
+
+READ_CHUNK_SIZE = MIB
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class RangedObject:
+    """
+    An S3 object being downloaded in byte ranges. The first range has already been requested, so
+    the object size and ETag are known before the destination buffer is allocated.
+    """
+
+    def __init__(self, downloader: "RangedDownloader", bucket: str, key: str, response: dict):
+        self.downloader = downloader
+        self.bucket = bucket
+        self.key = key
+        self.etag: Optional[str] = response.get("ETag")
+        self.size = self._get_size(response)
+        self._first_response: Optional[dict] = response
+
+    def read_into(self, buffer) -> int:
+        """
+        Download the whole object into a writable buffer of at least `size` bytes (a bytearray,
+        memoryview or mmap). Every range but the first is fetched in parallel, pinned to the
+        ETag of the first response so all ranges come from the same object version.
+        """
+        view = memoryview(buffer).cast("B")
+        response, self._first_response = self._first_response, None
+        if response is None:
+            raise ValueError(S3Messages.Error.RANGED_OBJECT_ALREADY_READ.format(key=self.key))
+
+        first_end = self._read_range(response, view, 0)
+        ranges = self.downloader.split(first_end, self.size)
+        if not ranges:
+            return self.size
+
+        logger.info(S3Messages.Info.RANGED_DOWNLOAD.format(key=self.key, ranges=len(ranges) + 1))
+        workers = min(self.downloader.max_concurrency, len(ranges))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._download_range, view, *byte_range) for byte_range in ranges
+            ]
+            for future in futures:
+                future.result()
+        return self.size
+
+    def close(self) -> None:
+        if self._first_response is not None:
+            self._first_response["Body"].close()
+            self._first_response = None
+
+    def __enter__(self) -> "RangedObject":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _download_range(self, view: memoryview, start: int, end: int) -> None:
+        response = self.downloader.s3_client.get_object(
+            Bucket=self.bucket,
+            Key=self.key,
+            Range=f"bytes={start}-{end}",
+            **({"IfMatch": self.etag} if self.etag else {}),
+        )
+        self._read_range(response, view, start)
+
+    def _read_range(self, response: dict, view: memoryview, start: int) -> int:
+        """Copy a response body into the buffer at start, returning the offset it ends at."""
+        body = response["Body"]
+        expected = response["ContentLength"]
+        offset = start
+        try:
+            while offset - start < expected:
+                chunk = body.read(min(READ_CHUNK_SIZE, expected - (offset - start)))
+                if not chunk:
+                    break
+                end = offset + len(chunk)
+                view[offset:end] = chunk
+                offset = end
+        finally:
+            body.close()
+
+        if offset - start != expected:
+            raise OSError(
+                S3Messages.Error.INCOMPLETE_RANGE.format(
+                    key=self.key, start=start, expected=expected, received=offset - start
+                )
+            )
+        return offset
+
+    @staticmethod
+    def _get_size(response: dict) -> int:
+        """Read the object size from the Content-Range header, or ContentLength without one."""
+        match = CONTENT_RANGE_PATTERN.match(response.get("ContentRange", ""))
+        if match:
+            return int(match.group(3))
+        return response["ContentLength"]
+
+
+class RangedDownloader:
+    """
+    Downloads S3 objects as parallel byte-range GETs. Objects no larger than range_size are
+    fetched with the first GET alone, so small objects cost a single request.
+    """
+
+    def __init__(
+        self,
+        s3_client: Any,
+        range_size: int = RANGE_SIZE,
+        max_concurrency: int = MAX_CONCURRENCY,
+    ):
+        self.s3_client = s3_client
+        self.range_size = range_size
+        self.max_concurrency = max_concurrency
+
+    def open(self, bucket: str, key: str, etag: Optional[str] = None) -> RangedObject:
+        """
+        Request the first range of the object, which also gives its size and ETag. When an ETag
+        is given, S3 fails the request with PreconditionFailed if the object no longer matches.
+        """
+        conditions = {"IfMatch": etag} if etag else {}
+        try:
+            response = self.s3_client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes=0-{self.range_size - 1}", **conditions
+            )
+        except ClientError as e:
+            # Empty objects have no satisfiable range
+            if e.response["Error"]["Code"] != "InvalidRange":
+                raise
+            response = self.s3_client.get_object(Bucket=bucket, Key=key, **conditions)
+        return RangedObject(self, bucket, key, response)
+
+    def split(self, start: int, size: int) -> List[Tuple[int, int]]:
+        """Split the bytes from start to the end of the object into inclusive ranges."""
+        return [
+            (offset, min(offset + self.range_size, size) - 1)
+            for offset in range(start, size, self.range_size)
+        ]
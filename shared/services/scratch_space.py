@@ -0,0 +1,142 @@
+import errno
+import io
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Lambda gives every execution environment 512 MB of /tmp by default, and keeps it across the
+# invocations of a warm container
+SCRATCH_DIR = Path(os.getenv("SCRATCH_DIR", "/tmp"))
+
+# Jobs keep their files in directories with this prefix, so sweeping them leaves other files in
+# SCRATCH_DIR, such as the content index, alone
+SCRATCH_PREFIX = "scratch-"
+
+# Bytes a single job may keep in scratch files at once
+SCRATCH_BUDGET_BYTES = int(os.getenv("SCRATCH_BUDGET_BYTES", 384 * 1024 * 1024))
+
+# Free space left on the volume for everything else, such as the files of concurrent jobs
+# being written
+SCRATCH_HEADROOM_BYTES = int(os.getenv("SCRATCH_HEADROOM_BYTES", 16 * 1024 * 1024))
+
+ScratchBody = Union[io.BytesIO, Path]
+
+
+class ScratchSpace:
+    """
+    The scratch files of one job, kept in a directory of their own that is removed with
+    everything left in it when the job is over. The bytes expected in a file are reserved
+    before it is written, so a job that would run out of space fails up front instead of
+    filling the volume for the jobs after it.
+    """
+
+    class BudgetExceeded(OSError):
+        """Raised when a file would take the job over its budget or the volume out of space."""
+
+    def __init__(
+        self,
+        budget_bytes: int = SCRATCH_BUDGET_BYTES,
+        root: Path = SCRATCH_DIR,
+        headroom_bytes: int = SCRATCH_HEADROOM_BYTES,
+    ):
+        self.budget_bytes = budget_bytes
+        self.root = root
+        self.headroom_bytes = headroom_bytes
+        self.directory = root / f"{SCRATCH_PREFIX}{uuid.uuid4()}"
+        self._reserved: Dict[Path, int] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ScratchSpace":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @property
+    def bytes_in_use(self) -> int:
+        with self._lock:
+            return self._get_bytes_in_use()
+
+    def reserve(self, name: str, expected_bytes: int = 0) -> Path:
+        """
+        Create an empty file in the scratch directory, reserving the bytes expected to be
+        written to it. Deleting the file releases them.
+
+        :raises ScratchSpace.BudgetExceeded: If the bytes don't fit in the budget of the job or
+          in the free space of the volume.
+        """
+        with self._lock:
+            in_use = self._get_bytes_in_use()
+            if in_use + expected_bytes > self.budget_bytes:
+                raise self.BudgetExceeded(
+                    errno.ENOSPC,
+                    f"Reserving {expected_bytes} bytes for {name} exceeds the scratch budget of "
+                    f"{self.budget_bytes} bytes, {in_use} bytes are in use",
+                )
+            free = shutil.disk_usage(self.root).free - self.headroom_bytes
+            if expected_bytes > free:
+                raise self.BudgetExceeded(
+                    errno.ENOSPC,
+                    f"Reserving {expected_bytes} bytes for {name} exceeds the {free} bytes "
+                    f"free in {self.root}",
+                )
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{uuid.uuid4().hex[:8]}_{name.replace('/', '_')}"
+            path.touch()
+            self._reserved[path] = expected_bytes
+            return path
+
+    def allocate(
+        self, name: str, expected_bytes: int, memory_max_bytes: Optional[int]
+    ) -> ScratchBody:
+        """
+        Return an in-memory buffer when the expected bytes fit in memory_max_bytes, and a
+        reserved file otherwise. A memory_max_bytes of None always gives a file.
+        """
+        if memory_max_bytes is not None and expected_bytes <= memory_max_bytes:
+            return io.BytesIO()
+        return self.reserve(name, expected_bytes)
+
+    def close(self) -> None:
+        """Remove the scratch directory and every file left in it."""
+        with self._lock:
+            leftovers = len([path for path in self._reserved if path.exists()])
+            self._reserved.clear()
+        if leftovers:
+            logger.info(f"Removing {leftovers} scratch files left in {self.directory}")
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _get_bytes_in_use(self) -> int:
+        """
+        Return the bytes reserved by the files of the job, or written to them when they outgrew
+        their reservation. Files deleted by their consumer take none.
+        """
+        in_use = 0
+        for path, reserved in list(self._reserved.items()):
+            try:
+                in_use += max(reserved, path.stat().st_size)
+            except FileNotFoundError:
+                del self._reserved[path]
+        return in_use
+
+
+def sweep_scratch_space(root: Path = SCRATCH_DIR) -> int:
+    """
+    Remove the scratch directories left in root by earlier invocations, returning the bytes
+    freed. A warm container keeps /tmp, so files of jobs that timed out or crashed would add up
+    until it is full. Only call it when no job is running, at the start of a handler.
+    """
+    freed = 0
+    for entry in root.glob(f"{SCRATCH_PREFIX}*"):
+        freed += sum(path.stat().st_size for path in entry.rglob("*") if path.is_file())
+        shutil.rmtree(entry, ignore_errors=True)
+    if freed:
+        logger.warning(f"Swept {freed} bytes of scratch files left by earlier invocations")
+    return freed